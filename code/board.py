@@ -23,6 +23,10 @@ I2C_FRQ        = const(400000)
 TX             = const(17)
 RX             = const(16)
 
+# Command server (`main.py`); -1=USB serial, otherwise UART at TX/RX
+CMD_UART       = const(-1)
+CMD_BAUD       = const(921600)
+
 # Servos
 SERVO_PAN      = const(27)
 PAN_RANGE_US   = [1010, 1931]
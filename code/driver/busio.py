@@ -10,13 +10,15 @@
 # 2019-12-21, v1.1 - hardware I2C bus possible
 # 2020-08-09, v1.2 - `UART` is inherited from `machine`
 # 2020-10-09, v1.3 - `I2CBus` use with `with`-statement
+# 2026-10-19, v1.4 - `I2CBus` w/o copies (`memoryview`, preallocated command
+#                    buffer, `readfrom_mem_into`); `RegisterBlock` added
 # ----------------------------------------------------------------------------
 from os import uname
 from machine import SPI, Pin, I2C
 from micropython import const
 from machine import UART
 
-__version__ = "0.1.2.0"
+__version__ = "0.1.4.0"
 
 # ----------------------------------------------------------------------------
 class SPIBus(object):
@@ -48,6 +50,7 @@ class I2CBus(object):
 
   def __init__(self, _freq, scl, sda, code=-1):
     self._i2cDevList = []
+    self._cmd = bytearray(1)
     if not code in [-1,0,1] or float(uname()[2][:4]) < 1.12:
       # Defaults to software implementation of I2C
       self._i2c = I2C(scl=Pin(scl), sda=Pin(sda), freq=_freq)
@@ -63,6 +66,7 @@ class I2CBus(object):
     self._i2cDevList = self._i2c.scan()
     print("... {0} device(s) found ({1})"
           .format(len(self._i2cDevList), self._i2cDevList))
+    self._hasMem = hasattr(self._i2c, "readfrom_mem_into")
 
   def deinit(self):
     self._i2c = None
@@ -99,12 +103,39 @@ class I2CBus(object):
   def readfrom_into(self, addr, buf):
     self._i2c.readfrom_into(addr, buf)
 
+  def readfrom_mem_into(self, addr, reg, buf):
+    """ Read registers starting at `reg` into `buf` (a `bytearray` or a
+        `memoryview` of one) in a single transaction, if the port supports
+        it, otherwise by writing the register address first
+    """
+    if self._hasMem:
+      self._i2c.readfrom_mem_into(addr, reg, buf)
+    else:
+      self._cmd[0] = reg & 0xff
+      self._i2c.writeto(addr, self._cmd, False)
+      self._i2c.readfrom_into(addr, buf)
+
+  def writeto_mem(self, addr, reg, buf):
+    """ Write `buf` to the registers starting at `reg`
+    """
+    if self._hasMem:
+      self._i2c.writeto_mem(addr, reg, buf)
+    else:
+      self._cmd[0] = reg & 0xff
+      self._i2c.writevto(addr, (self._cmd, buf))
+
   def write_then_readinto(self, addr, bufo, bufi, out_start=0, out_end=None,
                           in_start=0, in_end=None, stop_=True):
-    self._i2c.writeto(addr, bufo[out_start:out_end], stop_)
-    buf = bytearray(bufi[in_start:in_end])
-    self._i2c.readfrom_into(addr, buf)
-    bufi[in_start:in_end] = buf
+    """ Write `bufo[out_start:out_end]` and then read into
+        `bufi[in_start:in_end]`; the slices are `memoryview`s, hence no data
+        is copied (and nothing allocated if the full buffers are used)
+    """
+    if out_start != 0 or out_end is not None:
+      bufo = memoryview(bufo)[out_start:out_end]
+    if in_start != 0 or in_end is not None:
+      bufi = memoryview(bufi)[in_start:in_end]
+    self._i2c.writeto(addr, bufo, stop_)
+    self._i2c.readfrom_into(addr, bufi)
 
   def __enter__(self):
     return self
@@ -113,3 +144,33 @@ class I2CBus(object):
     return False
 
 # ----------------------------------------------------------------------------
+class RegisterBlock(object):
+  """Block of `n` consecutive device registers starting at `reg`, which is
+     read in a single I2C transaction into a preallocated buffer."""
+
+  def __init__(self, i2c, addr, reg, n):
+    """ Requires already initialized `I2CBus` instance
+    """
+    self._i2c = i2c
+    self._addr = addr
+    self._reg = reg
+    self._buf = bytearray(n)
+    self._mv = memoryview(self._buf)
+
+  def read(self):
+    """ Read all registers of the block
+    """
+    self._i2c.readfrom_mem_into(self._addr, self._reg, self._buf)
+
+  def view(self, reg, n=1):
+    """ Returns a `memoryview` on the `n` bytes starting at register `reg`;
+        create views once and keep them, they reflect every `read`
+    """
+    i = reg -self._reg
+    return self._mv[i:i +n]
+
+  @property
+  def buffer(self):
+    return self._buf
+
+# ----------------------------------------------------------------------------
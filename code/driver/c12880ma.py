@@ -5,17 +5,25 @@
 # The MIT License (MIT)
 # Copyright (c) 2020 Thomas Euler
 # 2020-11-07, v1
+# 2026-10-19, v1.1 - lock-in (illumination on/off) acquisition
+# 2026-10-19, v1.2 - callback during integration window
+# 2026-10-19, v1.3 - spectrum as `array("H")`, can be sent w/o conversion
+# 2026-10-19, v1.4 - `readInto` an external buffer
+# 2026-10-19, v1.5 - free-running ("video") acquisition into a frame ring
 # ----------------------------------------------------------------------------
 import array
 from micropython import const
 from machine import Pin, ADC
 from time import sleep_us, ticks_us, ticks_diff
 
-__version__ = "0.1.0.0"
+__version__ = "0.1.5.0"
 CHIP_NAME   = "C12880MA"
 CHAN_COUNT  = const(288)
 DELAY_US    = const(1)
 
+LIGHT_LED   = const(0)
+LIGHT_LASER = const(1)
+
 # ----------------------------------------------------------------------------
 class C12880MA(object):
   """Driver for for C12880MA spectrometer (Hamamatsu) breakout."""
@@ -26,13 +34,16 @@ class C12880MA(object):
     # Initialize variables
     self._min_integ_us = 0
     self._integ_s = 0.
+    self._onInteg = None
+    self._onIntegPeriod_us = 0
+    self._onIntegDur_us = 0
 
     # Initialize pins
     self._pinTrg = Pin(trg, Pin.OUT)
     self._pinSt = Pin(st, Pin.OUT)
     self._pinClk = Pin(clk, Pin.OUT)
-    self._pinLED = Pin(led, Pin.OUT) if led else None
-    self._pinLaser = Pin(laser, Pin.OUT) if laser else None
+    self._pinLED = Pin(led, Pin.OUT, value=0) if led else None
+    self._pinLaser = Pin(laser, Pin.OUT, value=0) if laser else None
 
     # AIn for video input
     self._pinVideo = ADC(Pin(video))
@@ -44,9 +55,16 @@ class C12880MA(object):
 
     # Array for spectral data
     self._nChan = CHAN_COUNT
-    self._data = array.array("i", [0]*CHAN_COUNT)
+    self._data = array.array("H", [0]*CHAN_COUNT)
     self._tmgs = array.array("i", [0]*5)
 
+    # Arrays for lock-in acquisition (dark readout and accumulated difference)
+    self._dark = array.array("H", [0]*CHAN_COUNT)
+    self._diff = array.array("i", [0]*CHAN_COUNT)
+    self._nLockIn = 0
+    self._isVideo = False
+    self._isVideoDone = True
+
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
   def begin(self):
     """ Start
@@ -59,13 +77,92 @@ class C12880MA(object):
   def setIntegrationTime_s(self, t_s):
     self._integ_s = max(t_s, 0.)
 
+  def setIntegrationCallback(self, func, period_us=0):
+    """ Set a function `func()` that is called repeatedly (at most every
+        `period_us`) while the sensor integrates, that is when the CPU would
+        otherwise only wait; e.g. to sample other sensors. `func` is only
+        called if the remaining integration time is longer than its last
+        duration, hence it does not prolong the exposure (except for the
+        very first call). `None` removes the callback.
+    """
+    self._onInteg = func
+    self._onIntegPeriod_us = max(period_us, 0)
+    self._onIntegDur_us = 0
+
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
   def read(self):
     """ Read spectrometer data
     """
+    self._acquire(self._data)
+
+  def readInto(self, buf):
+    """ Read spectrometer data into `buf` (`array("H")` of length `channels`)
+        instead of `spectrum`
+    """
+    self._acquire(buf)
+
+  def startVideo(self, ring, n_frames=0):
+    """ Starts free-running acquisition in a separate thread: reads spectra
+        back-to-back into `ring` (`pipeline.FrameRing`), time-stamped with
+        the start of integration, until `stopVideo` is called or `n_frames`
+        (if > 0) were taken
+    """
+    import _thread
+    self._isVideo = True
+    self._isVideoDone = False
+    _thread.start_new_thread(self._runVideo, (ring, n_frames))
+
+  def stopVideo(self):
+    self._isVideo = False
+
+  @property
+  def isVideo(self):
+    """ True while the acquisition thread is running
+    """
+    return not self._isVideoDone
+
+  def _runVideo(self, ring, n_frames):
+    n = 0
+    try:
+      while self._isVideo and (n_frames <= 0 or n < n_frames):
+        self._acquire(ring.slot())
+        ring.commit(self._tmgs[0])
+        n += 1
+    finally:
+      self._isVideo = False
+      self._isVideoDone = True
+
+  def readLockIn(self, n_cycles=1, light=LIGHT_LED):
+    """ Lock-in (differential) acquisition: Alternates readouts with the
+        illumination `light` (`LIGHT_LED` or `LIGHT_LASER`) on and off and
+        accumulates the difference (on - off) over `n_cycles` cycles. The
+        light source is only switched on during the integration window of
+        the "on" readout. The order of the two readouts is swapped in every
+        other cycle, which cancels out linear drifts of the ambient light.
+        The result is available via `lockIn`.
+    """
+    pin = self._pinLaser if light == LIGHT_LASER else self._pinLED
+    assert pin is not None, "No pin defined for light source"
+    diff = self._diff
+    for i in range(CHAN_COUNT):
+      diff[i] = 0
+    for j in range(n_cycles):
+      if j % 2 == 0:
+        self._acquire(self._data, pin)
+        self._acquire(self._dark)
+      else:
+        self._acquire(self._dark)
+        self._acquire(self._data, pin)
+      self._accumulateDiff(diff, self._data, self._dark)
+    self._nLockIn = n_cycles
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _acquire(self, data, light=None):
+    """ Acquire one spectrum into `data`; if a `light` pin is given, the
+        light source is switched on for the integration window
+    """
     # Calculate integration time
-    tmgs = array.array("i", [0]*5)
-    data = array.array("i", [0]*CHAN_COUNT)
+    tmgs = self._tmgs
     d_us = int(max(self._integ_s *1E6 -self._min_integ_us, 0))
 
     # Start clock cycle and set start pulse to signal start
@@ -77,6 +174,8 @@ class C12880MA(object):
 
     # Pixel integration starts after three clock pulses
     self._pulseClock(3)
+    if light:
+      light.value(1)
     tmgs[0] = ticks_us()
 
     # Integrate pixels for a while
@@ -89,6 +188,8 @@ class C12880MA(object):
     # Sample for a period of time; integration stops at pulse 48-th pulse
     # after ST went low
     self._pulseClock(48)
+    if light:
+      light.value(0)
     tmgs[2] = ticks_us()
 
     # Pixel output is ready after last pulse #88 after ST went low
@@ -101,9 +202,10 @@ class C12880MA(object):
       self._pulseClock(1)
     tmgs[4] = ticks_us()
 
-    # Save data
-    self._data = array.array("i", data)
-    self._tmgs = array.array("i", tmgs)
+  @micropython.native
+  def _accumulateDiff(self, diff, on, off):
+    for i in range(CHAN_COUNT):
+      diff[i] += on[i] -off[i]
 
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
   @property
@@ -114,6 +216,16 @@ class C12880MA(object):
   def spectrum(self):
     return self._data
 
+  @property
+  def lockIn(self):
+    """ Accumulated difference spectrum of the last lock-in acquisition
+    """
+    return self._diff
+
+  @property
+  def lockInCycles(self):
+    return self._nLockIn
+
   @property
   def wavelengths(self):
     A0 = 3.152446842e+2
@@ -136,15 +248,25 @@ class C12880MA(object):
       self._pinClk.value(0)
       sleep_us(DELAY_US)
 
-  def _pulseClockTimed(self, dur_ms):
-    """ Pulse clock for `dur_ms` milliseconds
+  def _pulseClockTimed(self, dur_us):
+    """ Pulse clock for `dur_us` microseconds; calls the integration callback,
+        if any, in between clock pulses
     """
+    f = self._onInteg
     start = ticks_us()
-    while ticks_diff(ticks_us(), start) < dur_ms:
+    next_us = 0
+    dt = 0
+    while dt < dur_us:
+      if f and dt >= next_us and dur_us -dt > self._onIntegDur_us:
+        t = ticks_us()
+        f()
+        self._onIntegDur_us = ticks_diff(ticks_us(), t)
+        next_us = dt +self._onIntegPeriod_us
       self._pinClk.value(1)
       sleep_us(DELAY_US)
       self._pinClk.value(0)
       sleep_us(DELAY_US)
+      dt = ticks_diff(ticks_us(), start)
 
   def _measureMinIntegTime(self):
     start = ticks_us()
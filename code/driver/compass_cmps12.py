@@ -10,16 +10,19 @@
 #             position 1 to be compatible with the data format returned
 #             by `getHeading3D`
 # 2019-12-21, native code generation added (requires MicroPython >=1.12)
+# 2026-10-19, all registers are read in a single burst into a preallocated
+#             buffer and decoded into a reusable record (see `update`);
+#             `getHeading` returned 8-bit bearing for `hires=True`
+# 2026-10-19, background sampling of heading, pitch and roll
+# 2026-10-19, uses `busio.RegisterBlock`, no allocations in `_read_bytes`
 # ----------------------------------------------------------------------------
-try:
-  import struct
-except ImportError:
-  import ustruct as struct
-from math import radians
+import array
+from math import radians as _radians
 from micropython import const
 from driver.sensor_base import SensorBase
+from driver.busio import RegisterBlock
 
-__version__ = "0.1.1.0"
+__version__ = "0.1.4.0"
 CHIP_NAME   = "CMPS12"
 
 # pylint: disable=bad-whitespace
@@ -60,6 +63,18 @@ _REG_BEARING_16BIT_BNO_LB  = const(0x1B)
 _REG_PITCH_16BIT_ANGLE_HB  = const(0x1C) # 16bit signed int, +/- 180°, w/next
 _REG_PITCH_16BIT_ANGLE_LB  = const(0x1D)
 _REG_CALIB_STATE           = const(0x1E) # Calibration state, 0=not, 3=fully
+_BLOCK_LEN                 = const(30)   # 0x01-0x1E
+
+# Orientation record entries (see `Compass.record`)
+REC_HEADING                = const(0)    # 0-3599, in 1/10 °
+REC_PITCH                  = const(1)    # +/- 90°
+REC_ROLL                   = const(2)    # +/- 90°
+REC_MAG_X                  = const(3)    # raw, followed by y, z
+REC_ACCEL_X                = const(6)    # raw, followed by y, z
+REC_GYRO_X                 = const(9)    # raw, followed by y, z
+REC_TEMP                   = const(12)   # in °
+REC_CALIB                  = const(13)   # calibration state byte
+REC_LEN                    = const(14)
 
 # ----------------------------------------------------------------------------
 class Compass(SensorBase):
@@ -72,6 +87,12 @@ class Compass(SensorBase):
     self._i2c = i2c
     self._isReady = False
     self._type = "Compass w/ tilt-compensation"
+    self._block = RegisterBlock(i2c, _ADDRESS_CMPS12, _REG_BEARING_8BIT,
+                                _BLOCK_LEN)
+    self._buf = self._block.buffer
+    self._rec = array.array("h", [0]*REC_LEN)
+    self._nSampleVals = 3
+    self._headUnwr = None
 
     addrList = self._i2c.deviceAddrList
     if (_ADDRESS_CMPS12 in addrList):
@@ -79,9 +100,6 @@ class Compass(SensorBase):
       buf = bytearray(1)
       self._read_bytes(_ADDRESS_CMPS12, _REG_CMD, buf)
       self._version = buf[0]
-      self._heading = 0.0
-      self._pitch = 0.0
-      self._roll = 0.0
       self._isReady = True
 
     cn =  "{0}_v{1}".format(CHIP_NAME, self._version)
@@ -90,6 +108,17 @@ class Compass(SensorBase):
                   "ok" if self._isReady else "FAILED"))
 
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def update(self):
+    """ Reads the register block 0x01-0x1E in a single I2C transaction into
+        a preallocated buffer and decodes it into the orientation record
+        (see `record`); does not allocate memory.
+    """
+    if not self._isReady:
+      return ERR_DEVICE_NOT_READY
+    self._block.read()
+    self._decode()
+    return OK
+
   #@timed_function
   @micropython.native
   def getHeading(self, tilt=False, calib=False, hires=True):
@@ -100,18 +129,12 @@ class Compass(SensorBase):
         compatibility reasons and have no effect. With "hires"=True, the
         precision is 3599/360°, otherwise 255/360°.
     """
-    if not self._isReady:
+    if self.update() != OK:
       return ERR_DEVICE_NOT_READY
-    hd = self._heading
     if hires:
-      buf = bytearray(1)
-      self._read_bytes(_ADDRESS_CMPS12, _REG_BEARING_8BIT, buf)
-      hd  = buf[0]/255 *360
+      return self._rec[REC_HEADING] /10
     else:
-      buf = bytearray(2)
-      self._read_bytes(_ADDRESS_CMPS12, _REG_BEARING_16BIT_HB, buf)
-      hd  = ((buf[0] << 8) | buf[1]) /10
-    return hd
+      return self._buf[0] /255 *360
 
 
   #@timed_function
@@ -123,16 +146,10 @@ class Compass(SensorBase):
         ted, therefore the parameter "calib" exists only for compatibility
         reasons and has no effect.
     """
-    if not self._isReady:
+    if self.update() != OK:
       return (ERR_DEVICE_NOT_READY, 0, 0, 0)
-    hd  = self._heading
-    pit = self._pitch
-    rol = self._roll
-    buf = bytearray(4)
-    self._read_bytes(_ADDRESS_CMPS12, _REG_BEARING_16BIT_HB, buf)
-    hd, pit, rol = struct.unpack_from('>Hbb', buf[0:4])
-    hd /= 10
-    return (OK, hd, pit, rol)
+    r = self._rec
+    return (OK, r[REC_HEADING] /10, r[REC_PITCH], r[REC_ROLL])
 
 
   #@timed_function
@@ -140,18 +157,21 @@ class Compass(SensorBase):
   def getPitchRoll(self, radians=False):
     """ Returns error code, pitch and roll in [°] as a tuple
     """
-    if not self._isReady:
+    if self.update() != OK:
       return  (ERR_DEVICE_NOT_READY, 0, 0)
-    pit = self._pitch
-    rol = self._roll
-    buf = bytearray(2)
-    self._read_bytes(_ADDRESS_CMPS12, _REG_PITCH_8BIT_ANGLE, buf)
-    pit, rol = struct.unpack_from('>bb', buf[0:2])
+    pit = self._rec[REC_PITCH]
+    rol = self._rec[REC_ROLL]
     if radians:
-      return (OK, -1, radians(pit), radians(rol))
+      return (OK, -1, _radians(pit), _radians(rol))
     else:
       return (OK, -1, pit, rol)
 
+  @property
+  def record(self):
+    """ Orientation record of the last `update`, an `array("h")` with the
+        entries `REC_xxx`
+    """
+    return self._rec
 
   @property
   def isReady(self):
@@ -162,10 +182,45 @@ class Compass(SensorBase):
     return CHAN_COUNT
 
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _sample(self, buf):
+    """ Background sample: heading (in 1/10°), pitch and roll (in °); the
+        heading is unwrapped (continuous across 0/360°) such that it can be
+        averaged, use `% 3600` on the mean
+    """
+    if self.update() != OK:
+      return False
+    h = self._rec[REC_HEADING]
+    if self._headUnwr is None:
+      self._headUnwr = h
+    else:
+      d = h -self._headUnwr % 3600
+      if d > 1800:
+        d -= 3600
+      elif d < -1800:
+        d += 3600
+      self._headUnwr += d
+    buf[0] = self._headUnwr
+    buf[1] = self._rec[REC_PITCH]
+    buf[2] = self._rec[REC_ROLL]
+    return True
+
+  @micropython.native
+  def _decode(self):
+    """ Decode register block (big-endian) into the orientation record;
+        `self._buf[i]` holds register `i+1`
+    """
+    b = self._buf
+    r = self._rec
+    r[REC_HEADING] = (b[1] << 8) | b[2]
+    r[REC_PITCH] = b[3] -256 if b[3] > 127 else b[3]
+    r[REC_ROLL] = b[4] -256 if b[4] > 127 else b[4]
+    for i in range(10):
+      # Magnetometer, accelerometer, gyro (x,y,z each) and temperature
+      v = (b[5 +2*i] << 8) | b[6 +2*i]
+      r[REC_MAG_X +i] = v -65536 if v > 32767 else v
+    r[REC_CALIB] = b[29]
+
   def _read_bytes(self, i2cAddr, regAddr, buf):
-    cmd    = bytearray(1)
-    cmd[0] = regAddr & 0xff
-    self._i2c.bus.writeto(i2cAddr, cmd, False)
-    self._i2c.bus.readfrom_into(i2cAddr, buf)
+    self._i2c.readfrom_mem_into(i2cAddr, regAddr, buf)
 
 # ----------------------------------------------------------------------------
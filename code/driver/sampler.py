@@ -0,0 +1,214 @@
+# ----------------------------------------------------------------------------
+# sampler.py
+# Timer-driven background sampling of sensors into ring buffers
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import array
+import micropython
+from machine import Timer
+from micropython import const
+from time import ticks_ms, ticks_diff, ticks_add
+
+__version__ = "0.1.0.0"
+TIMER_ID    = const(1)    # `Timer(0)` is used by `ServoManager`
+DEF_DEPTH   = const(64)
+
+_sampler    = None
+
+# ----------------------------------------------------------------------------
+def getSampler():
+  """ Returns the shared sampler instance (created on first use)
+  """
+  global _sampler
+  if _sampler is None:
+    _sampler = Sampler()
+  return _sampler
+
+def _wrap32(v):
+  # Wrap into the int32 range, to keep running sums in `array("i")`
+  v &= 0xFFFFFFFF
+  return v -0x100000000 if v > 0x7FFFFFFF else v
+
+def _gcd(a, b):
+  while b:
+    a, b = b, a % b
+  return a
+
+# ----------------------------------------------------------------------------
+class SampleRing(object):
+  """Fixed-size ring buffer of time-stamped integer samples with running
+     sums, such that the latest sample and the mean over a time window can
+     be retrieved in O(1)."""
+
+  def __init__(self, n_vals, depth=DEF_DEPTH, period_ms=0):
+    """ Ring for `depth` samples of `n_vals` values each, expected to be
+        taken every `period_ms` ms
+    """
+    self._nVals = n_vals
+    self._depth = max(2, depth)
+    self._period_ms = max(1, period_ms)
+    self._t = array.array("i", [0]*self._depth)
+    self._v = array.array("i", [0]*(self._depth *n_vals))
+    self._s = array.array("i", [0]*(self._depth *n_vals))
+    self._acc = array.array("i", [0]*n_vals)
+    self._n = 0
+
+  def put(self, t_ms, vals):
+    """ Add sample `vals` (`n_vals` integers) taken at `t_ms` (`ticks_ms()`)
+    """
+    nv = self._nVals
+    i0 = (self._n % self._depth) *nv
+    self._t[self._n % self._depth] = t_ms
+    for k in range(nv):
+      self._acc[k] = _wrap32(self._acc[k] +vals[k])
+      self._v[i0 +k] = vals[k]
+      self._s[i0 +k] = self._acc[k]
+    self._n += 1
+
+  def latest(self, out):
+    """ Copies the latest sample into `out` and returns its time stamp, or
+        -1 if there is no sample yet
+    """
+    if self._n == 0:
+      return -1
+    nv = self._nVals
+    j = (self._n -1) % self._depth
+    for k in range(nv):
+      out[k] = self._v[j *nv +k]
+    return self._t[j]
+
+  def mean(self, t0_ms, t1_ms, out):
+    """ Writes the mean of all buffered samples taken within [`t0_ms`,
+        `t1_ms`] into `out` and returns the number of samples averaged
+        (0, if none, `out` is not changed then)
+    """
+    i = self._find(t0_ms, True)
+    j = self._find(t1_ms, False)
+    if i < 0 or j < 0 or j < i:
+      return 0
+    nv = self._nVals
+    n = j -i +1
+    si = (i % self._depth) *nv
+    sj = (j % self._depth) *nv
+    for k in range(nv):
+      # Sum over [i..j] = S[j] -S[i] +v[i], modulo 2^32
+      out[k] = _wrap32(self._s[sj +k] -self._s[si +k] +self._v[si +k]) /n
+    return n
+
+  @property
+  def count(self):
+    """ Number of samples currently buffered
+    """
+    return min(self._n, self._depth)
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _find(self, t_ms, first):
+    """ Returns the absolute index of the first sample at or after `t_ms`
+        (`first`=True) or of the last sample at or before `t_ms`, or -1;
+        the position is estimated from the sampling period and then
+        corrected for jitter, which usually takes a step or two
+    """
+    if self._n == 0:
+      return -1
+    lo = max(0, self._n -self._depth)
+    hi = self._n -1
+    d = self._depth
+    t = self._t
+    k = hi -ticks_diff(t[hi % d], t_ms) //self._period_ms
+    k = min(hi, max(lo, k))
+    if first:
+      while k > lo and ticks_diff(t[(k -1) % d], t_ms) >= 0:
+        k -= 1
+      while k <= hi and ticks_diff(t[k % d], t_ms) < 0:
+        k += 1
+      return k if k <= hi else -1
+    else:
+      while k < hi and ticks_diff(t[(k +1) % d], t_ms) <= 0:
+        k += 1
+      while k >= lo and ticks_diff(t[k % d], t_ms) > 0:
+        k -= 1
+      return k if k >= lo else -1
+
+# ----------------------------------------------------------------------------
+class Sampler(object):
+  """Samples registered sensors in the background, using a shared hardware
+     timer; the actual sensor reads are deferred via `micropython.schedule`
+     and therefore do not run in interrupt context."""
+
+  def __init__(self, timer_id=TIMER_ID):
+    self._sensors = []
+    self._periods = []
+    self._due = []
+    self._tick_ms = 0
+    self._nOverruns = 0
+    self._timer = Timer(timer_id)
+    self._runRef = self._run
+    self._cbRef = self._cb
+
+  def add(self, sensor, period_ms):
+    """ Register `sensor` (derived from `SensorBase`) to be sampled every
+        `period_ms` ms
+    """
+    if sensor in self._sensors:
+      self.remove(sensor)
+    self._sensors.append(sensor)
+    self._periods.append(max(1, int(period_ms)))
+    self._due.append(ticks_ms())
+    self._restart()
+
+  def remove(self, sensor):
+    """ Stop sampling `sensor`
+    """
+    if sensor in self._sensors:
+      i = self._sensors.index(sensor)
+      del self._sensors[i]
+      del self._periods[i]
+      del self._due[i]
+      self._restart()
+
+  def deinit(self):
+    self._timer.deinit()
+    self._sensors = []
+    self._periods = []
+    self._due = []
+
+  @property
+  def overruns(self):
+    """ Number of timer ticks that could not be scheduled
+    """
+    return self._nOverruns
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _restart(self):
+    # Timer runs at the greatest common divisor of all sampling periods
+    self._timer.deinit()
+    if len(self._periods) == 0:
+      self._tick_ms = 0
+      return
+    p = self._periods[0]
+    for q in self._periods:
+      p = _gcd(p, q)
+    self._tick_ms = p
+    self._timer.init(mode=Timer.PERIODIC, period=p, callback=self._cbRef)
+
+  def _cb(self, timer):
+    try:
+      micropython.schedule(self._runRef, 0)
+    except RuntimeError:
+      # Schedule queue is full
+      self._nOverruns += 1
+
+  def _run(self, _):
+    t = ticks_ms()
+    for i, sensor in enumerate(self._sensors):
+      if ticks_diff(t, self._due[i]) >= 0:
+        sensor._sampleNow(t)
+        self._due[i] = ticks_add(self._due[i], self._periods[i])
+        if ticks_diff(t, self._due[i]) >= 0:
+          # Fell behind, do not try to catch up
+          self._due[i] = ticks_add(t, self._periods[i])
+
+# ----------------------------------------------------------------------------
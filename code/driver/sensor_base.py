@@ -6,8 +6,12 @@
 # Copyright (c) 2018 Thomas Euler
 # 2018-09-23, v1
 # 2019-08-01, class `CameraBase` added
+# 2026-10-19, background sampling (`autoUpdate`) into ring buffers
 # ----------------------------------------------------------------------------
-__version__ = "0.1.0.0"
+import array
+
+__version__ = "0.1.1.0"
+DEF_PERIOD_MS = 100
 
 # ----------------------------------------------------------------------------
 class SensorBase(object):
@@ -22,6 +26,10 @@ class SensorBase(object):
     self._type = "n/a"
     self._version = 0
     self._autoUpdate = False
+    self._period_ms = DEF_PERIOD_MS
+    self._nSampleVals = 0
+    self._sampleBuf = None
+    self._ring = None
 
   @property
   def autoUpdate(self):
@@ -29,12 +37,67 @@ class SensorBase(object):
 
   @autoUpdate.setter
   def autoUpdate(self, value):
-    self._autoUpdate = value
+    """ If True, the sensor is sampled in the background every
+        `samplePeriod_ms` (see `startSampling`)
+    """
+    if value and not self._autoUpdate:
+      self.startSampling(self._period_ms)
+    elif not value and self._autoUpdate:
+      self.stopSampling()
+
+  @property
+  def samplePeriod_ms(self):
+    return self._period_ms
 
   @property
   def name(self):
     return self._type
 
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def startSampling(self, period_ms, depth=64):
+    """ Start sampling the sensor in the background every `period_ms` into a
+        ring buffer of `depth` samples; requires the derived class to set
+        `_nSampleVals` and to implement `_sample`
+    """
+    from driver.sampler import getSampler, SampleRing
+    assert self._nSampleVals > 0, "Sensor does not support sampling"
+    self._period_ms = period_ms
+    self._sampleBuf = array.array("i", [0]*self._nSampleVals)
+    self._ring = SampleRing(self._nSampleVals, depth, period_ms)
+    getSampler().add(self, period_ms)
+    self._autoUpdate = True
+
+  def stopSampling(self):
+    """ Stop background sampling (the ring buffer is kept)
+    """
+    from driver.sampler import getSampler
+    getSampler().remove(self)
+    self._autoUpdate = False
+
+  def latest(self, out):
+    """ Copies the latest background sample into `out` and returns its time
+        stamp (`ticks_ms`) or -1, if none is available
+    """
+    return self._ring.latest(out) if self._ring else -1
+
+  def mean(self, t0_ms, t1_ms, out):
+    """ Writes the mean of the background samples taken between `t0_ms` and
+        `t1_ms` (`ticks_ms`) into `out` and returns the number of samples
+    """
+    return self._ring.mean(t0_ms, t1_ms, out) if self._ring else 0
+
+  def _sampleNow(self, t_ms):
+    # Called by the sampler
+    if self._sample(self._sampleBuf):
+      self._ring.put(t_ms, self._sampleBuf)
+
+  def _sample(self, buf):
+    """ Reads the sensor, writes `_nSampleVals` integers into `buf` and
+        returns True if successful; derived classes that support sampling
+        override this, the default yields no samples
+    """
+    return False
+
 # ----------------------------------------------------------------------------
 class CameraBase(SensorBase):
   """Base class for cameras."""
@@ -99,7 +99,8 @@ class ServoManager(object):
         If `dt_ms` > 0, then it will be attempted that all servos reach the
         position at the same time (that is after `dt_ms` ms)
     """
-    print('target pos {}'.format(pos))
+    if self._isVerbose:
+      print('target pos {}'.format(pos))
     # print(servos) # JD debugging
     if self._isMoving:
       # Stop ongoing move
@@ -1,40 +1,246 @@
 # ----------------------------------------------------------------------------
 # main.py
-# Runs a simple interface to interact with the scanner via USB
+# Runs a command server to interact with the scanner via USB or UART, using
+# a binary framed protocol (see `protocol.py`)
 #
 # The MIT License (MIT)
 # Copyright (c) 2020 Thomas Euler
 # 2020-11-21, v1
+# 2026-10-19, v2 - binary command server
+# 2026-10-19, v2.1 - video mode (free-running spectrometer)
 # ----------------------------------------------------------------------------
+import gc
 import time
+import struct
+import micropython
+import board
+import protocol as pr
+from micropython import const
 from machine import UART
 
+SERVER_VERSION = const(2)
+
 # ----------------------------------------------------------------------------
-def main():
+class Server(object):
+  """Executes the requests received via a `protocol.Link`."""
+
+  def __init__(self, link, compass=False):
+    self._link = link
+    self._compass = compass
+    self._sc = None
+    self._isScanReady = False
+    self._ring = None
+    self._isVideo = False
+    self._vidSeq = 0
+    self._vidSent = 0
+    self._vidT0 = 0
+
+  def handle(self):
+    """ Handle the request that was just received; returns False if the
+        server is to be stopped
+    """
+    link = self._link
+    op = link.op
+    try:
+      if self.isVideo and op not in (pr.OP_STATUS, pr.OP_VIDEO_STOP):
+        link.sendError(link.seq, pr.ERR_NOT_READY, "video running")
+      elif op == pr.OP_STATUS:
+        self._status()
+      elif op == pr.OP_SETUP_SCAN:
+        self._setupScan()
+      elif op == pr.OP_SCAN_ALL:
+        self._scanAll()
+      elif op == pr.OP_READ_SPECTRUM:
+        self._readSpectrum()
+      elif op == pr.OP_MOVE:
+        self._move()
+      elif op == pr.OP_WAVELENGTHS:
+        self._wavelengths()
+      elif op == pr.OP_VIDEO_START:
+        self._videoStart()
+      elif op == pr.OP_VIDEO_STOP:
+        self._videoStop()
+      elif op == pr.OP_QUIT:
+        link.reply()
+        return False
+      else:
+        link.sendError(link.seq, pr.ERR_UNKNOWN_OP)
+    except ValueError as e:
+      link.sendError(link.seq, pr.ERR_BAD_PAYLOAD, str(e))
+    except Exception as e:
+      link.sendError(link.seq, pr.ERR_EXCEPTION, repr(e))
+    return True
+
+  def service(self):
+    """ Sends the next video frame, if any; returns False if there is
+        nothing to do
+    """
+    if not self._isVideo:
+      return False
+    ring = self._ring
+    isDone = not self._sc.SP.isVideo
+    f = ring.get()
+    if f is None:
+      if isDone:
+        # Acquisition stopped by itself (`n_frames` reached)
+        self._videoStop(reply=False)
+      return False
+    seq, t_us, spect = f
+    struct.pack_into(pr.FMT_FRAME, self._link.txData, 0, seq, t_us,
+                     ring.nDropped)
+    self._link.send(pr.OP_FRAME, self._vidSeq, pr.FRAME_HDR_LEN, spect,
+                    len(spect) *2)
+    ring.release()
+    self._vidSent += 1
+    return True
+
+  @property
+  def isVideo(self):
+    return self._isVideo
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _scanner(self):
+    if self._sc is None:
+      from scanner import Scanner
+      self._sc = Scanner(verbose=False, compass=self._compass)
+    return self._sc
+
+  def _status(self):
+    sc = self._sc
+    flags = 0
+    iPix = 0
+    nPix = 0
+    if sc:
+      flags |= pr.ST_SCANNER
+      flags |= pr.ST_COMPASS if sc.CP else 0
+      flags |= pr.ST_VIDEO if self.isVideo else 0
+      if self._isScanReady:
+        flags |= pr.ST_SCAN_READY
+        iPix = sc.pixelIndex
+        nPix = sc.SI.nPix
+    struct.pack_into("<BBIII", self._link.txData, 0, SERVER_VERSION, flags,
+                     iPix, nPix, gc.mem_free())
+    self._link.reply(14)
+
+  def _setupScan(self):
+    link = self._link
+    dx, dy, sx, sy, t_s, path = struct.unpack("<HHfffB", link.data)
+    sc = self._scanner()
+    # Text output of the spectral image is not needed, data is sent as frames
+    sc.setupScan("", (dx, dy), (sx, sy), t_s, path, sinks=[])
+    self._isScanReady = True
+    struct.pack_into("<HHfffBHH", link.txData, 0, dx, dy, sx, sy, t_s, path,
+                     sc.SI.nPix, sc.SP.channels)
+    link.reply(21)
+
+  def _scanAll(self):
+    link = self._link
+    if not self._isScanReady:
+      link.sendError(link.seq, pr.ERR_NOT_READY, "no scan set up")
+      return
+    sc = self._sc
+    seq = link.seq
+    nBytes = sc.SP.channels *2
+    d = link.txData
+    n = 0
+    while sc.scanNext():
+      i, x, y, head, pitch, roll = sc.lastPixel
+      struct.pack_into(pr.FMT_PIXEL, d, 0, i, x, y, head, pitch, roll)
+      link.send(pr.OP_PIXEL, seq, pr.PIXEL_HDR_LEN, sc.SP.spectrum, nBytes)
+      n += 1
+    self._isScanReady = False
+    struct.pack_into("<I", d, 0, n)
+    link.reply(4)
+
+  def _readSpectrum(self):
+    link = self._link
+    sp = self._scanner().SP
+    if len(link.data) >= 4:
+      t_s = struct.unpack_from("<f", link.data, 0)[0]
+      if t_s > 0:
+        sp.setIntegrationTime_s(t_s)
+    sp.read()
+    link.reply(0, sp.spectrum, sp.channels *2)
+
+  def _move(self):
+    link = self._link
+    pan, tlt, dt_ms = struct.unpack("<ffH", link.data)
+    self._scanner().moveTo([pan, tlt], dt_ms)
+    link.reply()
+
+  def _videoStart(self):
+    link = self._link
+    t_s, nFr, nSlots = struct.unpack("<fIB", link.data)
+    sp = self._scanner().SP
+    if t_s > 0:
+      sp.setIntegrationTime_s(t_s)
+    # `FrameRing` has at least 3 slots; compare with what it would allocate
+    if self._ring is None or self._ring.nSlots != max(3, nSlots):
+      from pipeline import FrameRing
+      self._ring = FrameRing(sp.channels, nSlots)
+    self._ring.reset()
+    self._isVideo = True
+    self._vidSeq = link.seq
+    self._vidSent = 0
+    self._vidT0 = time.ticks_ms()
+    struct.pack_into("<H", link.txData, 0, sp.channels)
+    link.reply(2)
+    sp.startVideo(self._ring, nFr)
+
+  def _videoStop(self, reply=True):
+    link = self._link
+    ring = self._ring
+    if not self._isVideo:
+      link.sendError(link.seq, pr.ERR_NOT_READY, "no video running")
+      return
+    sp = self._sc.SP
+    sp.stopVideo()
+    while sp.isVideo:
+      time.sleep_ms(1)
+    dt_ms = time.ticks_diff(time.ticks_ms(), self._vidT0)
+    struct.pack_into("<IIII", link.txData, 0, ring.nFrames, ring.nDropped,
+                     self._vidSent, dt_ms)
+    if reply:
+      link.reply(16)
+    else:
+      link.send(pr.OP_VIDEO_STOP | pr.OP_REPLY, self._vidSeq, 16)
+    self._isVideo = False
+
+  def _wavelengths(self):
+    link = self._link
+    nm = self._scanner().SP.wavelengths
+    link.reply(0, nm, len(nm) *4)
+
+# ----------------------------------------------------------------------------
+def main(uart_id=board.CMD_UART, baud=board.CMD_BAUD, compass=False):
+  """ Runs the command server on the USB serial (REPL) port (`uart_id` < 0)
+      or on a hardware UART at `board.TX`, `board.RX` with `baud`
+  """
+  if uart_id < 0:
+    port = pr.StdioPort()
+    micropython.kbd_intr(-1)
+  else:
+    port = UART(uart_id, baud, tx=board.TX, rx=board.RX)
+  link = pr.Link(port)
+  server = Server(link, compass)
 
-  uart = UART(0, 9600)
   # Loop ...
   print("Entering loop ...")
   try:
     try:
-      round = 0
-
       while True:
-        try:
-          if uart.any():
-            ln = uart.readline()
-            print(round, ln)
-
-        finally:
-          # ...
-          time.sleep_ms(200)
-          round += 1
+        if link.poll():
+          if not server.handle():
+            break
+        elif not server.service():
+          time.sleep_ms(1)
 
     except KeyboardInterrupt:
       print("Loop stopped.")
 
   finally:
     # ...
+    micropython.kbd_intr(3)
     print("Done")
 
 # ----------------------------------------------------------------------------
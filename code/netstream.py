@@ -0,0 +1,267 @@
+# ----------------------------------------------------------------------------
+# netstream.py
+# Streams the pixels of a scan via WLAN (TCP or UDP) to a host receiver
+# (`host/scanhost/receiver.py`), using the frames of `protocol.py`
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - `Link`, the connection handling, also used by
+#                    `sinks.SocketSink`
+# 2026-10-19, v1.2 - `NetSink.end`, ends the stream but keeps the connection
+# ----------------------------------------------------------------------------
+import time
+import errno
+import struct
+import socket
+import protocol as pr
+from micropython import const
+
+__version__      = "0.1.2.0"
+
+DEF_PORT         = const(5005)
+DEF_N_BUF        = const(8)      # frames buffered on the device
+DEF_BLOCK_MS     = const(100)    # max. wait for buffer space, then drop
+DEF_RECONNECT_MS = const(2000)
+HDR_EVERY        = const(64)     # UDP: repeat stream header every n pixels
+
+_CONNECT_TO_S    = 0.5
+_STREAM_HDR_LEN  = const(4)      # stream sequence number
+_TRANSIENT       = (errno.EAGAIN, errno.ENOMEM) # lwIP buffers full, retry
+
+# ----------------------------------------------------------------------------
+class Link(object):
+  """Non-blocking socket to `host`:`port` (TCP, or UDP if `udp` is True);
+     `open` tries to (re)connect at most once per `reconnect_ms`, and the
+     socket is closed on errors other than full buffers."""
+
+  def __init__(self, host, port, udp=False, reconnect_ms=DEF_RECONNECT_MS):
+    self._addr = socket.getaddrinfo(host, port)[0][-1]
+    self._isUDP = udp
+    self._reconnect_ms = reconnect_ms
+    self._tRetry = time.ticks_ms()
+    self._sock = None
+
+  @property
+  def isConnected(self):
+    return self._sock is not None
+
+  def open(self):
+    """ Tries to connect, unless the last attempt is less than
+        `reconnect_ms` ago; returns True if a new connection was made
+    """
+    t = time.ticks_ms()
+    if time.ticks_diff(t, self._tRetry) < 0:
+      return False
+    self._tRetry = time.ticks_add(t, self._reconnect_ms)
+    try:
+      if self._isUDP:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+      else:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.settimeout(_CONNECT_TO_S)
+        s.connect(self._addr)
+      s.setblocking(False)
+    except OSError:
+      return False
+    self._sock = s
+    return True
+
+  def send(self, buf):
+    """ Sends (part of) `buf`; returns the number of bytes sent (a datagram
+        is sent whole), which is 0 if the buffers are full or the
+        connection was lost
+    """
+    try:
+      if self._isUDP:
+        self._sock.sendto(buf, self._addr)
+        return len(buf)
+      k = self._sock.send(buf)
+    except OSError as e:
+      if e.args[0] not in _TRANSIENT:
+        self.close()
+      return 0
+    return k if k else 0
+
+  def close(self, retry=False):
+    """ Closes the connection; with `retry`, `open` connects right away
+    """
+    if self._sock:
+      try:
+        self._sock.close()
+      except OSError:
+        pass
+    self._sock = None
+    if retry:
+      self._tRetry = time.ticks_ms()
+
+# ----------------------------------------------------------------------------
+class NetSink(object):
+  """Sends pixel records to `host`:`port`; the records are framed into a
+     small ring of preallocated buffers and sent without blocking. With
+     TCP, the connection is re-established if lost and buffered records are
+     resent; with UDP, the sequence number in each record lets the receiver
+     detect losses."""
+
+  def __init__(self, host, port=DEF_PORT, udp=False, n_buf=DEF_N_BUF,
+               block_ms=DEF_BLOCK_MS, reconnect_ms=DEF_RECONNECT_MS):
+    self._link = Link(host, port, udp, reconnect_ms)
+    self._isUDP = udp
+    self._nBuf = max(2, n_buf)
+    self._block_ms = block_ms
+    self._slots = []
+    self._lens = [0] *self._nBuf
+    self._tx = None
+    self._ctl = bytearray(32)
+    self._ctlOut = memoryview(bytearray(48))
+    self._nCtl = 0
+    self._nPix = 0
+    self._nSpect = 0
+    self._reset()
+
+  def begin(self, n_pix, n_spect):
+    """ Starts a new stream of `n_pix` pixels with `n_spect` channels each;
+        frame buffers are (re)allocated only if they are too small
+    """
+    m = 2 +_STREAM_HDR_LEN +pr.PIXEL_HDR_LEN +n_spect *2 +4
+    size = m +m//254 +3
+    if len(self._slots) == 0 or len(self._slots[0]) < size:
+      self._slots = [memoryview(bytearray(size)) for _ in range(self._nBuf)]
+      self._tx = bytearray(m)
+    self._nPix = n_pix
+    self._nSpect = n_spect
+    self._reset()
+    self._queueCtl(pr.OP_STREAM_HDR)
+    self.service()
+
+  def putPixel(self, i, x, y, head, pitch, roll, spect):
+    """ Queues the pixel record and sends what can be sent without blocking;
+        if the buffer stays full for `block_ms`, the record is dropped
+    """
+    if self._nQueued == self._nBuf:
+      t0 = time.ticks_ms()
+      while (self._nQueued == self._nBuf and
+             time.ticks_diff(time.ticks_ms(), t0) < self._block_ms):
+        self.service()
+        time.sleep_ms(1)
+      if self._nQueued == self._nBuf:
+        self.nDropped += 1
+        self._seq += 1
+        return
+    tx = self._tx
+    seq = self._seq
+    tx[0] = pr.OP_STREAM_PIX
+    tx[1] = seq & 0xFF
+    struct.pack_into("<I", tx, 2, seq)
+    struct.pack_into(pr.FMT_PIXEL, tx, 2 +_STREAM_HDR_LEN, i, x, y, head,
+                     pitch, roll)
+    m = pr.copyBytes(tx, 2 +_STREAM_HDR_LEN +pr.PIXEL_HDR_LEN, spect,
+                     self._nSpect *2)
+    j = (self._head +self._nQueued) % self._nBuf
+    self._lens[j] = pr.packFrame(tx, m, self._slots[j])
+    self._nQueued += 1
+    self._seq += 1
+    if self._isUDP and self._seq % HDR_EVERY == 0:
+      self._queueCtl(pr.OP_STREAM_HDR)
+    self.service()
+
+  def service(self):
+    """ Sends buffered frames as far as possible without blocking; returns
+        the number of frames still buffered
+    """
+    if self._link.isConnected or self._connect():
+      while True:
+        if self._nCtl and (self._off == 0 or self._isCtlSending):
+          # Control frame goes first, but not into a partially sent record
+          self._isCtlSending = True
+          if not self._sendSome(self._ctlOut, self._nCtl):
+            break
+          self._isCtlSending = False
+          self._nCtl = 0
+        elif self._nQueued:
+          j = self._head
+          if not self._sendSome(self._slots[j], self._lens[j]):
+            break
+          self._head = (j +1) % self._nBuf
+          self._nQueued -= 1
+          self.nSent += 1
+        else:
+          break
+    return self._nQueued +(1 if self._nCtl else 0)
+
+  def flush(self, timeout_ms=1000):
+    """ Tries for up to `timeout_ms` to send all buffered frames; returns
+        True if successful
+    """
+    t0 = time.ticks_ms()
+    while self.service() > 0:
+      if time.ticks_diff(time.ticks_ms(), t0) > timeout_ms:
+        return False
+      time.sleep_ms(1)
+    return True
+
+  def end(self, timeout_ms=1000):
+    """ Sends the remaining frames and the end-of-stream frame; the
+        connection stays open for the next stream. Returns True if all
+        was sent
+    """
+    self.flush(timeout_ms)
+    self._queueCtl(pr.OP_STREAM_END)
+    return self.flush(timeout_ms)
+
+  def close(self, timeout_ms=1000):
+    """ Ends the stream (see `end`), then closes the connection
+    """
+    self.end(timeout_ms)
+    self._link.close(retry=True)
+    self._off = 0
+
+  @property
+  def isConnected(self):
+    return self._link.isConnected
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _reset(self):
+    self._head = 0
+    self._nQueued = 0
+    self._nCtl = 0
+    self._isCtlSending = False
+    self._off = 0
+    self._seq = 0
+    self.nSent = 0
+    self.nDropped = 0
+
+  def _queueCtl(self, op):
+    # Control frames (stream header/end) are sent before buffered records
+    c = self._ctl
+    c[0] = op
+    c[1] = 0
+    if op == pr.OP_STREAM_HDR:
+      struct.pack_into("<IH", c, 2, self._nPix, self._nSpect)
+      n = 8
+    else:
+      struct.pack_into("<II", c, 2, self.nSent, self.nDropped)
+      n = 10
+    self._nCtl = pr.packFrame(c, n, self._ctlOut)
+
+  def _sendSome(self, buf, n):
+    """ Sends (the rest of) the frame `buf[:n]`; returns True when the frame
+        is complete
+    """
+    self._off += self._link.send(buf[self._off:n])
+    if self._off < n:
+      return False
+    self._off = 0
+    return True
+
+  def _connect(self):
+    if not self._link.open():
+      return False
+    self._off = 0
+    self._isCtlSending = False
+    if not self._isUDP and self._nPix > 0 and self._nCtl == 0:
+      # New connection, receiver needs to know the stream dimensions again
+      self._queueCtl(pr.OP_STREAM_HDR)
+    return True
+
+# ----------------------------------------------------------------------------
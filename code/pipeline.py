@@ -0,0 +1,169 @@
+# ----------------------------------------------------------------------------
+# pipeline.py
+# Hand-off of acquired pixels from a producer thread (servos, spectrometer)
+# to a consumer thread (formatting, file, UART, socket)
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - `FrameRing` for free-running acquisition
+# ----------------------------------------------------------------------------
+import array
+import _thread
+from micropython import const
+
+__version__      = "0.1.1.0"
+
+DEF_SLOTS        = const(4)
+N_INFO           = const(5)    # x, y, head, pitch, roll
+
+# ----------------------------------------------------------------------------
+class PixelRing(object):
+  """Ring of preallocated spectrum buffers with position and orientation
+     per slot, for exactly one producer and one consumer. No locks are
+     needed: the producer only advances `_wr`, the consumer only `_rd`, and
+     a slot is filled before `_wr` is advanced past it."""
+
+  def __init__(self, n_spect, n_slots=DEF_SLOTS):
+    self._nSlots = max(2, n_slots)
+    self._spect = [array.array("H", [0]*n_spect) for _ in range(self._nSlots)]
+    self._info = array.array("f", [0]*(self._nSlots *N_INFO))
+    self._iPix = array.array("i", [0]*self._nSlots)
+    self._wr = 0
+    self._rd = 0
+
+  # Producer side
+  def free(self):
+    """ Returns True if a slot can be filled
+    """
+    return self._wr -self._rd < self._nSlots
+
+  def spectrum(self):
+    """ Returns the spectrum buffer of the slot to be filled next
+    """
+    return self._spect[self._wr % self._nSlots]
+
+  def commit(self, i_pix, x, y, head, pitch, roll):
+    """ Completes the slot (spectrum already filled) and hands it over
+    """
+    j = self._wr % self._nSlots
+    self._iPix[j] = i_pix
+    k = j *N_INFO
+    info = self._info
+    info[k] = x
+    info[k +1] = y
+    info[k +2] = head
+    info[k +3] = pitch
+    info[k +4] = roll
+    self._wr += 1
+
+  # Consumer side
+  def available(self):
+    """ Number of filled slots
+    """
+    return self._wr -self._rd
+
+  def get(self):
+    """ Returns `(i_pix, x, y, head, pitch, roll, spectrum)` of the oldest
+        filled slot; the slot stays valid until `release` is called
+    """
+    j = self._rd % self._nSlots
+    k = j *N_INFO
+    info = self._info
+    return (self._iPix[j], info[k], info[k +1], info[k +2], info[k +3],
+            info[k +4], self._spect[j])
+
+  def release(self):
+    self._rd += 1
+
+# ----------------------------------------------------------------------------
+class FrameRing(object):
+  """Ring of preallocated spectrum buffers for free-running acquisition:
+     the producer never waits; if all buffers are in use, it overwrites the
+     oldest frame that has not been taken yet (which counts as dropped).
+     The buffer the consumer currently holds is never overwritten. Only the
+     bookkeeping of the slots is protected by a lock, not the copying."""
+
+  def __init__(self, n_spect, n_slots=DEF_SLOTS):
+    n = max(3, n_slots)
+    self._n = n
+    self._spect = [array.array("H", [0]*n_spect) for _ in range(n)]
+    self._seq = array.array("i", [0]*n)
+    self._t = array.array("i", [0]*n)
+    # Slot indices
+    self._queue = array.array("H", [0]*n)
+    self._free = array.array("H", range(n))
+    self._lock = _thread.allocate_lock()
+    self.reset()
+
+  def reset(self):
+    """ Empties the ring and resets the counters
+    """
+    self._qHead = 0
+    self._qLen = 0
+    for i in range(self._n):
+      self._free[i] = i
+    self._nFree = self._n
+    self._fill = -1
+    self._hold = -1
+    self.nFrames = 0
+    self.nDropped = 0
+
+  # Producer side
+  def slot(self):
+    """ Returns the buffer to acquire the next frame into
+    """
+    with self._lock:
+      if self._nFree > 0:
+        self._nFree -= 1
+        j = self._free[self._nFree]
+      else:
+        # Drop the oldest frame in the queue
+        j = self._queue[self._qHead]
+        self._qHead = (self._qHead +1) % self._n
+        self._qLen -= 1
+        self.nDropped += 1
+      self._fill = j
+    return self._spect[j]
+
+  def commit(self, t_us):
+    """ Queues the frame that was just acquired (at `t_us`)
+    """
+    with self._lock:
+      j = self._fill
+      self._seq[j] = self.nFrames
+      self._t[j] = t_us
+      self._queue[(self._qHead +self._qLen) % self._n] = j
+      self._qLen += 1
+      self._fill = -1
+      self.nFrames += 1
+
+  # Consumer side
+  def available(self):
+    return self._qLen
+
+  @property
+  def nSlots(self):
+    return self._n
+
+  def get(self):
+    """ Takes the oldest frame and returns `(seq, t_us, spectrum)`, or None
+        if there is none; the buffer is valid until `release` is called
+    """
+    with self._lock:
+      if self._qLen == 0:
+        return None
+      j = self._queue[self._qHead]
+      self._qHead = (self._qHead +1) % self._n
+      self._qLen -= 1
+      self._hold = j
+    return self._seq[j], self._t[j], self._spect[j]
+
+  def release(self):
+    with self._lock:
+      if self._hold >= 0:
+        self._free[self._nFree] = self._hold
+        self._nFree += 1
+        self._hold = -1
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,265 @@
+# ----------------------------------------------------------------------------
+# protocol.py
+# Binary framed protocol used by the command server (`main.py`)
+#
+# A frame is the COBS-encoded message `op (u8), seq (u8), data, crc32 (u32)`
+# with the CRC32 over `op`, `seq` and `data`, all little-endian, delimited
+# by 0x00 before and after (the leading delimiter separates frames from any
+# text that was printed in between).
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - stream frames (`netstream.py`), `packFrame`
+# 2026-10-19, v1.2 - video mode
+# ----------------------------------------------------------------------------
+import sys
+import select
+import struct
+from micropython import const
+from binascii import crc32
+
+__version__      = "0.1.2.0"
+
+# Requests (the reply to a request has the opcode `op | OP_REPLY`)
+OP_STATUS        = const(0x01) # -> <BBIII> version, flags, i_pix, n_pix, free
+OP_SETUP_SCAN    = const(0x02) # <HHfffB> size_xy, step_xy_deg, t_int_s, path
+                               # -> <HHfffBHH> same, n_pix, n_spect
+OP_SCAN_ALL      = const(0x03) # -> OP_PIXEL frames, then <I> n_pix
+OP_READ_SPECTRUM = const(0x04) # <f> t_int_s (0=unchanged) -> n_spect * <H>
+OP_MOVE          = const(0x05) # <ffH> pan, tilt [°], dt_ms
+OP_WAVELENGTHS   = const(0x06) # -> n_spect * <f> [nm]
+OP_VIDEO_START   = const(0x07) # <fIB> t_int_s, n_frames (0=until stopped),
+                               #   n_slots -> <H> n_spect, then OP_FRAMEs
+OP_VIDEO_STOP    = const(0x08) # -> <IIII> n_frames, n_dropped, n_sent, dt_ms
+OP_QUIT          = const(0x0F) # stop server (and return to the REPL)
+OP_PIXEL         = const(0x10) # <I5f> i_pix, x, y, head, pitch, roll
+                               #   followed by n_spect * <H>
+OP_STREAM_HDR    = const(0x11) # <IH> n_pix, n_spect (start of a stream)
+OP_STREAM_PIX    = const(0x12) # <I> stream seq, followed by an OP_PIXEL record
+OP_STREAM_END    = const(0x13) # <II> n_sent, n_dropped
+OP_FRAME         = const(0x14) # <III> seq, t_us, n_dropped, n_spect * <H>
+OP_ERROR         = const(0x7F) # <B> error code, followed by message
+OP_REPLY         = const(0x80)
+
+# Status flags
+ST_SCANNER       = const(0x01) # scanner initialized
+ST_SCAN_READY    = const(0x02) # scan set up
+ST_COMPASS       = const(0x04) # compass available
+ST_VIDEO         = const(0x08) # video mode running
+
+# Error codes
+ERR_CRC          = const(1)
+ERR_UNKNOWN_OP   = const(2)
+ERR_BAD_PAYLOAD  = const(3)
+ERR_NOT_READY    = const(4)
+ERR_EXCEPTION    = const(5)
+
+FMT_PIXEL        = "<I5f"
+PIXEL_HDR_LEN    = const(24)
+FMT_FRAME        = "<III"
+FRAME_HDR_LEN    = const(12)
+MAX_DATA         = const(2048)
+_OVERHEAD        = const(6)    # op, seq, crc32
+
+# ----------------------------------------------------------------------------
+@micropython.viper
+def cobsEncode(src, n:int, dst) -> int:
+  """ COBS-encodes `src[:n]` into `dst` (requires `n +n//254 +2` bytes),
+      appends the 0x00 delimiter and returns the encoded length
+  """
+  s = ptr8(src)
+  d = ptr8(dst)
+  ci = 0
+  code = 1
+  j = 1
+  for i in range(n):
+    b = s[i]
+    if b == 0:
+      d[ci] = code
+      ci = j
+      j += 1
+      code = 1
+    else:
+      d[j] = b
+      j += 1
+      code += 1
+      if code == 0xFF:
+        d[ci] = code
+        ci = j
+        j += 1
+        code = 1
+  d[ci] = code
+  d[j] = 0
+  return j +1
+
+@micropython.viper
+def cobsDecode(src, n:int, dst) -> int:
+  """ Decodes the COBS-encoded `src[:n]` (w/o delimiter) into `dst` and
+      returns the decoded length, or -1 if `src` is malformed
+  """
+  s = ptr8(src)
+  d = ptr8(dst)
+  i = 0
+  j = 0
+  while i < n:
+    code = s[i]
+    i += 1
+    if code == 0 or i +code -1 > n:
+      return -1
+    for k in range(code -1):
+      d[j] = s[i]
+      i += 1
+      j += 1
+    if code < 0xFF and i < n:
+      d[j] = 0
+      j += 1
+  return j
+
+def packFrame(msg, n, out):
+  """ Appends the CRC32 to the message `msg[:n]` (requires 4 more bytes) and
+      writes the frame, including both delimiters, into the memoryview `out`;
+      returns the frame length
+  """
+  struct.pack_into("<I", msg, n, crc32(memoryview(msg)[:n]) & 0xFFFFFFFF)
+  out[0] = 0
+  return cobsEncode(msg, n +4, out[1:]) +1
+
+@micropython.viper
+def copyBytes(dst, off:int, src, n:int) -> int:
+  """ Copies the first `n` bytes of any buffer `src` (e.g. an `array`) into
+      `dst` at `off`; returns `off +n`
+  """
+  d = ptr8(dst)
+  s = ptr8(src)
+  for i in range(n):
+    d[off +i] = s[i]
+  return off +n
+
+# ----------------------------------------------------------------------------
+class StdioPort(object):
+  """USB (REPL) serial port as a binary stream; keyboard interrupts need to
+     be disabled (`micropython.kbd_intr(-1)`) while it is used."""
+
+  def __init__(self):
+    self._in = sys.stdin.buffer
+    self._out = sys.stdout.buffer
+    self._poll = select.poll()
+    self._poll.register(sys.stdin, select.POLLIN)
+
+  def any(self):
+    return 1 if self._poll.poll(0) else 0
+
+  def readinto(self, buf):
+    return self._in.readinto(buf)
+
+  def write(self, buf):
+    return self._out.write(buf)
+
+# ----------------------------------------------------------------------------
+class Link(object):
+  """Sends and receives frames over a port (`machine.UART` or `StdioPort`),
+     using only preallocated buffers."""
+
+  def __init__(self, port, max_data=MAX_DATA):
+    n = max_data +_OVERHEAD
+    self._port = port
+    self._one = bytearray(1)
+    self._rx = bytearray(n +n//254 +2)
+    self._nRx = 0
+    self._msg = bytearray(n)
+    self._msgMv = memoryview(self._msg)
+    self._tx = bytearray(n)
+    self._txMv = memoryview(self._tx)
+    self._out = bytearray(n +n//254 +3)
+    self._outMv = memoryview(self._out)
+    self._maxData = max_data
+    self._op = 0
+    self._seq = 0
+    self._nData = 0
+    self.nErrors = 0
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def poll(self):
+    """ Reads the available bytes and returns True if a complete frame was
+        received (see `op`, `seq` and `data`); frames with a bad CRC are
+        answered with `OP_ERROR`
+    """
+    port = self._port
+    one = self._one
+    while port.any():
+      port.readinto(one)
+      b = one[0]
+      if b != 0:
+        if self._nRx < len(self._rx):
+          self._rx[self._nRx] = b
+        self._nRx += 1
+        continue
+      n = self._nRx
+      self._nRx = 0
+      if n == 0 or n > len(self._rx):
+        # Empty frame (leading delimiter) or overflow
+        continue
+      m = cobsDecode(self._rx, n, self._msg)
+      if m < _OVERHEAD:
+        self.nErrors += 1
+        continue
+      crc = struct.unpack_from("<I", self._msg, m -4)[0]
+      if crc32(self._msgMv[:m -4]) & 0xFFFFFFFF != crc:
+        self.nErrors += 1
+        self.sendError(self._msg[1], ERR_CRC)
+        continue
+      self._op = self._msg[0]
+      self._seq = self._msg[1]
+      self._nData = m -_OVERHEAD
+      return True
+    return False
+
+  @property
+  def op(self):
+    return self._op
+
+  @property
+  def seq(self):
+    return self._seq
+
+  @property
+  def data(self):
+    """ Payload of the last received frame (valid until the next `poll`)
+    """
+    return self._msgMv[2:2 +self._nData]
+
+  @property
+  def txData(self):
+    """ Buffer to assemble the payload of the next frame in
+    """
+    return self._txMv[2:2 +self._maxData]
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def send(self, op, seq, n=0, extra=None, n_extra=0):
+    """ Sends a frame with the first `n` bytes of `txData` as payload,
+        followed by the first `n_extra` bytes of the buffer `extra`, if
+        given (e.g. a spectrum `array`, which is not copied beforehand)
+    """
+    tx = self._tx
+    tx[0] = op
+    tx[1] = seq
+    m = 2 +n
+    if extra is not None:
+      m = copyBytes(tx, m, extra, n_extra)
+    k = packFrame(tx, m, self._outMv)
+    self._port.write(self._outMv[:k])
+
+  def reply(self, n=0, extra=None, n_extra=0):
+    """ Replies to the last received request
+    """
+    self.send(self._op | OP_REPLY, self._seq, n, extra, n_extra)
+
+  def sendError(self, seq, code, msg=""):
+    d = self.txData
+    d[0] = code
+    b = msg.encode()[:self._maxData -1]
+    d[1:1 +len(b)] = b
+    self.send(OP_ERROR, seq, 1 +len(b))
+
+# ----------------------------------------------------------------------------
@@ -5,40 +5,58 @@
 # The MIT License (MIT)
 # Copyright (c) 2020 Thomas Euler
 # 2020-11-21, v1
+# 2026-10-19, v1.1 - orientation (compass) recorded per pixel
+# 2026-10-19, v1.2 - optional background sampling of the compass
+# 2026-10-19, v1.3 - pixels can be passed on to a sink (e.g. WLAN stream)
+# 2026-10-19, v1.4 - output via any number of sinks (see `sinks.py`)
+# 2026-10-19, v1.5 - sinks are notified of pixels, rows and idle times
+# 2026-10-19, v1.6 - `scanThreaded`, acquisition and output in two threads
 # ----------------------------------------------------------------------------
 import time
 import board
 import array
 import ulab as np
-import os
 from machine import RTC
 from micropython import const
 from driver.servo import Servo
 from driver.servo_manager import ServoManager
 from driver.c12880ma import C12880MA
+from driver.busio import I2CBus
+import driver.compass_cmps12 as cmps12
+from sinks import FileSink, CallbackSink, PrintSink
+from sinks import EV_PIXEL, EV_ROW, EV_IDLE
+from pipeline import PixelRing, DEF_SLOTS
 
-__version__      = "0.1.0.0"
+__version__      = "0.1.6.0"
 __file_version__ = const(1)
 
 PATH_R_SPIRAL    = const(0)
 PATH_LR_ZIGZAG   = const(1)
 SERVO_MOVE_MS    = const(0)
+ORIENT_PERIOD_US = const(2000)
 
 # ----------------------------------------------------------------------------
 class SpectImg(object):
   """Container class of a spectral image with all meta information
   """
-  def __init__(self, size_xy, step_xy, int_s, n_spect, fname, overwrite=True):
+  def __init__(self, size_xy, step_xy, int_s, n_spect, fname, overwrite=True,
+               to_serial=None, sinks=None, file_kw=None):
     """ Create image of dimensions `size_xy` steps, with each pixel a spectrum
         of `n_spect` data points. Note that for simplicity, all image
         elements are kept as linear arrays (lines concatenated). Because of
         the limited RAM, the picture is kept in a file on the flash.
+        `to_serial` is called with each line of output (see `onToSerial`).
+        Additional outputs can be given as list of `sinks` (see `sinks.py`);
+        if there is neither a file nor any other output, the lines are
+        printed. `file_kw` are passed to the `FileSink` (e.g. the flush
+        policy).
     """
     self.dXY = size_xy # the abs range of x, y e.g.(30,30)-> x:-15,15(deg), y(-15,15)
     self.stepXY = step_xy
     
     # numPix should depend on the stepsizes
     self.nPix = (self.dXY[0]//self.stepXY[0]+1) * (self.dXY[1]//self.stepXY[1]+1)
+    self._nRow = self.dXY[0]//self.stepXY[0]+1
     self.xyPath = np.zeros((self.nPix, 2))
     
     self.nSpect = n_spect
@@ -52,19 +70,25 @@ class SpectImg(object):
     self._toSerial = None
     self._nPixStored = 0
     self._verbose = False
+    self._sinks = []
+    self._ownSinks = []
+    self._hdr = []
 
     # Check if file exists and recreate it, if needed
     if len(self._fname) > 0:
-      try:
-        os.stat(self._fname)
-        if not self._doOverwr:
-          toLog("ERROR: `{0}` already exists and `overwrite=False`", True)
-          return
-        os.remove(self._fname)
-      except OSError:
-        pass
+      self._file = FileSink(self._fname, self._doOverwr, **(file_kw or {}))
+      if not self._file.isReady:
+        toLog("ERROR: `{0}` already exists and `overwrite=False`"
+              .format(self._fname), True)
+        self._file = None
+        return
       toLog("Opening file `{0}`".format(self._fname), True)
-      self._file = open(self._fname, "w")
+      self._addOwnSink(self._file)
+    self.onToSerial = to_serial
+    if sinks:
+      self._sinks += sinks
+    if not self._sinks and sinks is None:
+      self._addOwnSink(PrintSink())
 
     # Write header
     d = {"file_version": __file_version__}
@@ -81,8 +105,34 @@ class SpectImg(object):
 
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
   @property
+  def onToSerial(self):
+    return self._toSerial.func if self._toSerial else None
+
+  @onToSerial.setter
   def onToSerial(self, f):
-    self._toSerial = f
+    if self._toSerial:
+      self.removeSink(self._toSerial)
+      self._ownSinks.remove(self._toSerial)
+      self._toSerial = None
+    if f:
+      self._toSerial = CallbackSink(f)
+      self._addOwnSink(self._toSerial)
+
+  def addSink(self, sink):
+    """ Attaches another output; the header lines written so far are
+        replayed into it
+    """
+    for _, rec in self._hdr:
+      sink.put(rec)
+    self._sinks.append(sink)
+
+  def removeSink(self, sink):
+    if sink in self._sinks:
+      self._sinks.remove(sink)
+
+  @property
+  def sinks(self):
+    return self._sinks
 
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
   def generateScanPath(self, pathType):# =PATH_R_SPIRAL):
@@ -126,18 +176,32 @@ class SpectImg(object):
       else:
         assert False, "Error: Unknown scan path type"
     finally:
-      toLog("Scan path generated.", True)
-      print(self.xyPath)
+      toLog("Scan path generated.", self._verbose)
+      if self._verbose:
+        print(self.xyPath)
 
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
   def storePixel(self, xy, head, pitch, roll, spect):
     """ Store a pixel
     """
+    if not self._sinks:
+      # Nothing to write to (e.g. pixels only streamed); skip formatting
+      self._nPixStored += 1
+      return
     pre = "p,{0}".format(self._nPixStored)
     d = {"xy": list(xy), "head_deg": head, "pitch_deg": pitch, "roll_deg": roll,
          "spect_au": list(spect)}
     self._writeline(pre, str(d))
     self._nPixStored += 1
+    self._event(EV_PIXEL)
+    if self._nPixStored % self._nRow == 0:
+      self._event(EV_ROW)
+
+  def idle(self):
+    """ To be called when the scanner is waiting (e.g. for the servos), such
+        that sinks can do slow work (e.g. write to the flash)
+    """
+    self._event(EV_IDLE)
 
   def storeWavelengths(self, nm):
     """ Store wavelengths for a spectrum
@@ -148,24 +212,45 @@ class SpectImg(object):
 
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
   def finalize(self):
-    """ Scan is done, close file etc.
+    """ Scan is done, close file etc.; sinks that were passed in are only
+        flushed
     """
+    for sink in self._sinks:
+      if sink in self._ownSinks:
+        sink.close()
+      else:
+        sink.flush()
     if self._file:
       toLog("Closing file `{0}`".format(self._fname), True)
-      self._file.close()
       self._file = None
 
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _event(self, ev):
+    for sink in self._sinks:
+      sink.onEvent(ev)
+
+  def _addOwnSink(self, sink):
+    self._ownSinks.append(sink)
+    self.addSink(sink)
+
   def _writeline(self, prefix, ln, verbose=False):
-    s = "{0}|{1}".format(prefix, ln)
-    if self._file:
-      self._file.write(s +self._lf)
-    if self._toSerial:
-      self._toSerial(s +self._lf)
-    if not self._file and not self._toSerial:
-      print(s)
-    else:
-      toLog("`{0}`".format(s), verbose)
+    # Encode the line once; all sinks share the same record. Header records
+    # are kept for sinks added later, one per prefix
+    isPix = prefix[0] == "p"
+    if isPix and not self._sinks and not verbose:
+      return
+    rec = "{0}|{1}{2}".format(prefix, ln, self._lf).encode()
+    if not isPix:
+      for i, (pre, _) in enumerate(self._hdr):
+        if pre == prefix:
+          self._hdr[i] = (prefix, rec)
+          break
+      else:
+        self._hdr.append((prefix, rec))
+    for sink in self._sinks:
+      sink.put(rec)
+    if verbose:
+      toLog("`{0}`".format(rec.decode().rstrip()), True)
 
 # ----------------------------------------------------------------------------
 class Scanner(object):
@@ -174,8 +259,13 @@ class Scanner(object):
   SRV_PAN          = const(0)
   SRV_TLT          = const(1)
 
-  def __init__(self, verbose=False):
-    """ Acquires all necessary resources.
+  def __init__(self, verbose=False, compass=False, sample_ms=0):
+    """ Acquires all necessary resources. If `compass` is True, an I2C bus
+        and the compass are initialized, and the orientation of the scanner
+        is recorded for each pixel. By default, the compass is read while
+        the spectrometer integrates; with `sample_ms` > 0, it is instead
+        sampled in the background with this period, and the samples taken
+        during a pixel's exposure are averaged.
     """
     self._verbose = verbose
     self._nSrv = 2
@@ -194,23 +284,51 @@ class Scanner(object):
     self.SM.add_servo(SRV_TLT, self._Servos[SRV_TLT])
     toLog("Servo manager ready", True)
 
-    # Create spectrometer instance
+    # Create spectrometer instance; a spectral image is created per scan
+    self.SI = None
+    self._stream = None
+    self._iPix = 0
+    self._isThreaded = False
+    self._isProducing = False
+    self._isConsuming = False
     self.SP = C12880MA(trg=board.TRG, st=board.STA, clk=board.CLK, video=board.VID)
     self.SP.begin()
     self.SP.setIntegrationTime_s(0.01)
     time.sleep_ms(200)
     toLog("Spectrometer ready", True)
 
+    # Create compass instance, if requested; the orientation is sampled while
+    # the spectrometer integrates (`_sampleOrientation`) and averaged
+    self.CP = None
+    self._ori = array.array('i', [0]*5)
+    self._oriMean = array.array('f', [0]*3)
+    self._tExp = array.array('i', [0]*2)
+    if compass:
+      self._I2C = I2CBus(board.I2C_FRQ, board.SCL, board.SDA, code=0)
+      cp = cmps12.Compass(self._I2C)
+      if cp.isReady:
+        self.CP = cp
+        if sample_ms > 0:
+          self.CP.startSampling(sample_ms)
+        else:
+          self.SP.setIntegrationCallback(self._sampleOrientation,
+                                         ORIENT_PERIOD_US)
+        toLog("Compass ready", True)
+
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-  def setupScan(self, fname, size_xy, step_xy_deg, int_s, path):
+  def setupScan(self, fname, size_xy, step_xy_deg, int_s, path,
+                to_serial=None, sinks=None, stream=None, file_kw=None):
     """ Sets up a scan named `fname` with `path` the scan pattern type,
         `size_xy` the scan dimensions in steps, `step_xy_deg` the step sizes
-        in [°], and `int_s` the integration time in [s]. If `fname` is empty,
-        the output is send to the REPL.
+        in [°], and `int_s` the integration time in [s]. If `fname` is empty
+        and neither a `to_serial` function nor `sinks` are given, the output
+        is send to the REPL. If given, each pixel is also passed to `stream`
+        (e.g. a `netstream.NetSink`). `file_kw` configures the file output
+        (e.g. `{"flush": sinks.FLUSH_ROW}`, see `sinks.FileSink`).
     """
-    print(PATH_R_SPIRAL) # debugging
     # Create data structure
-    self.SI = SpectImg(size_xy, step_xy_deg, int_s, self.SP.channels, fname)
+    self.SI = SpectImg(size_xy, step_xy_deg, int_s, self.SP.channels, fname,
+                       to_serial=to_serial, sinks=sinks, file_kw=file_kw)
     self.SI.storeWavelengths(self.SP.wavelengths)
 
     # Set integration time and move to origin
@@ -222,6 +340,10 @@ class Scanner(object):
 
     # Ready to scan
     self._iPix = 0
+    self._lastPix = None
+    self._stream = stream
+    if stream:
+      stream.begin(self.SI.nPix, self.SP.channels)
 
 
   def scanNext(self):
@@ -233,17 +355,160 @@ class Scanner(object):
       self.moveTo((x,y), dt_ms=SERVO_MOVE_MS)
 
       # Measure spectrum and 3D position and store it
+      self._ori[0] = 0
+      self._tExp[0] = time.ticks_ms()
       self.SP.read()
-      self.SI.storePixel((x,y), 0,0,0, self.SP.spectrum)
+      self._tExp[1] = time.ticks_ms()
+      head, pitch, roll = self._getOrientation()
+      self.SI.storePixel((x,y), head, pitch, roll, self.SP.spectrum)
+      self._lastPix = (self._iPix, x, y, head, pitch, roll)
+      if self._stream:
+        self._stream.putPixel(self._iPix, x, y, head, pitch, roll,
+                              self.SP.spectrum)
 
       self._iPix += 1
       return True
     else:
-      # Close file, if needed and move back to origin
+      # Close file, end the stream, if any, and move back to origin
       self.SI.finalize()
+      if self._stream:
+        self._stream.end()
+        self._stream = None
       self.moveTo()
       return False
 
+  def scanThreaded(self, n_slots=DEF_SLOTS):
+    """ Scans all remaining pixels in two threads: this one moves the servos
+        and acquires the spectra into a ring of `n_slots` preallocated
+        buffers, while a second thread formats, stores and sends them (see
+        `_consume`). Returns the mean time per pixel in [ms].
+        Note that on the ESP32 port, Python threads share a global lock; the
+        threads overlap where one of them waits (e.g. for the servos).
+    """
+    import _thread
+    ring = PixelRing(self.SP.channels, n_slots)
+    self._isProducing = True
+    self._isConsuming = True
+    self._isThreaded = True
+    _thread.start_new_thread(self._consume, (ring,))
+    t0 = time.ticks_ms()
+    n = 0
+    try:
+      while self._iPix < self.SI.nPix:
+        x,y = self.SI.xyPath[self._iPix]
+        self.moveTo((x,y), dt_ms=SERVO_MOVE_MS)
+        while not ring.free():
+          if not self._isConsuming:
+            raise RuntimeError("Consumer thread has stopped")
+          time.sleep_ms(1)
+        self._ori[0] = 0
+        self._tExp[0] = time.ticks_ms()
+        self.SP.readInto(ring.spectrum())
+        self._tExp[1] = time.ticks_ms()
+        head, pitch, roll = self._getOrientation()
+        ring.commit(self._iPix, x, y, head, pitch, roll)
+        self._lastPix = (self._iPix, x, y, head, pitch, roll)
+        self._iPix += 1
+        n += 1
+    finally:
+      self._isProducing = False
+      while self._isConsuming:
+        time.sleep_ms(1)
+      self._isThreaded = False
+    dt_ms = time.ticks_diff(time.ticks_ms(), t0)
+    toLog("{0} pixels in {1} ms".format(n, dt_ms), self._verbose)
+
+    # All pixels done, close file etc.
+    self.scanNext()
+    return dt_ms /n if n > 0 else 0
+
+  def _consume(self, ring):
+    """ Consumer thread of `scanThreaded`: stores the acquired pixels and
+        passes them on to the stream, if any; when there is nothing to do,
+        the sinks get the chance to write their buffers
+    """
+    si = self.SI
+    st = self._stream
+    try:
+      while True:
+        if ring.available():
+          i, x, y, head, pitch, roll, spect = ring.get()
+          si.storePixel((x,y), head, pitch, roll, spect)
+          if st:
+            st.putPixel(i, x, y, head, pitch, roll, spect)
+          ring.release()
+        elif self._isProducing:
+          si.idle()
+          time.sleep_ms(1)
+        else:
+          break
+    finally:
+      self._isConsuming = False
+
+  @property
+  def pixelIndex(self):
+    """ Index of the next pixel to scan
+    """
+    return self._iPix
+
+  @property
+  def lastPixel(self):
+    """ Index, position and orientation of the last scanned pixel as tuple
+        `(i, x, y, head, pitch, roll)`; its spectrum is `SP.spectrum`
+    """
+    return self._lastPix
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  @micropython.native
+  def _sampleOrientation(self):
+    """ Add a compass sample to the orientation accumulator `_ori`, with
+        [0] number of samples, [1] sum of heading relative to the first
+        sample (in 1/10°, wrapped to +/-180°), [2] sum of pitch, [3] sum of
+        roll, and [4] the heading of the first sample
+    """
+    if self.CP.update() != cmps12.OK:
+      return
+    r = self.CP.record
+    o = self._ori
+    h = r[cmps12.REC_HEADING]
+    if o[0] == 0:
+      o[1] = 0
+      o[2] = 0
+      o[3] = 0
+      o[4] = h
+    d = h -o[4]
+    if d > 1800:
+      d -= 3600
+    elif d < -1800:
+      d += 3600
+    o[0] += 1
+    o[1] += d
+    o[2] += r[cmps12.REC_PITCH]
+    o[3] += r[cmps12.REC_ROLL]
+
+  def _getOrientation(self):
+    """ Returns heading, pitch and roll in [°] averaged over the samples
+        taken during the last exposure; if the integration window was too
+        short for a sample, a single sample is taken now (or, if sampled in
+        the background, the latest sample is used)
+    """
+    if not self.CP:
+      return 0, 0, 0
+    if self.CP.autoUpdate:
+      m = self._oriMean
+      if self.CP.mean(self._tExp[0], self._tExp[1], m) == 0:
+        if self.CP.latest(m) < 0:
+          return 0, 0, 0
+      return (m[0] % 3600) /10, m[1], m[2]
+    o = self._ori
+    if o[0] == 0:
+      self._sampleOrientation()
+      if o[0] == 0:
+        return 0, 0, 0
+    n = o[0]
+    head = ((o[4] +o[1] /n) % 3600) /10
+    return head, o[2] /n, o[3] /n
+
   # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
   def moveTo(self, pos=[0,0], dt_ms=1000):
     """ Move both servos to positon `pos` in [°]
@@ -251,8 +516,15 @@ class Scanner(object):
     toLog("Moving to  ...", self._verbose)
     self.SM.move(self._SIDs, pos,dt_ms)
     # print(pos,dt_ms)
+    si = None if self._isThreaded else self.SI
     while self.SM.is_moving:
-      pass
+      if si:
+        # Servos take time, use it e.g. to write data to the flash
+        si.idle()
+        si = None
+      elif self._isThreaded:
+        # Let the consumer thread run while waiting
+        time.sleep_ms(1)
     toLog("... done.", self._verbose)
 
 # ----------------------------------------------------------------------------
@@ -0,0 +1,307 @@
+# ----------------------------------------------------------------------------
+# sinks.py
+# Output sinks for the records of a spectral image (`scanner.SpectImg`)
+#
+# A record is one encoded line (`bytes`); it is created once and shared by
+# reference between all sinks. Each sink queues records in a bounded buffer
+# and, if the buffer is full, either drops the new record (`POLICY_DROP`)
+# or blocks until there is space again (`POLICY_BLOCK`).
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - write-behind, block-aligned `FileSink`; sink events
+# 2026-10-19, v1.2 - `SocketSink` uses `netstream.Link`; `Sink._write`
+#                    discards by default
+# ----------------------------------------------------------------------------
+import os
+import time
+from micropython import const
+
+__version__      = "0.1.2.0"
+
+POLICY_DROP      = const(0)
+POLICY_BLOCK     = const(1)
+DEF_DEPTH        = const(16)
+DEF_RECONNECT_MS = const(2000)
+
+# Events passed to the sinks by `SpectImg` (`Sink.onEvent`)
+EV_PIXEL         = const(0)  # pixel stored
+EV_ROW           = const(1)  # row of pixels stored
+EV_IDLE          = const(2)  # scanner is idle (e.g. servos are moving)
+
+# When `FileSink` writes buffered blocks to the flash (flags); the buffer is
+# always written when full and when the file is closed (`FLUSH_END`)
+FLUSH_END        = const(0)
+FLUSH_PIXELS     = const(1)  # every `flush_n` pixels
+FLUSH_ROW        = const(2)  # after each row
+FLUSH_IDLE       = const(4)  # while the scanner is idle
+BLOCK_SIZE       = const(4096) # flash erase block
+DEF_N_BLOCKS     = const(2)
+
+# ----------------------------------------------------------------------------
+class Sink(object):
+  """Base class of all sinks; derived classes override `_write` (and
+     `_close`, if needed). The base class discards all records."""
+
+  def __init__(self, depth=DEF_DEPTH, policy=POLICY_DROP):
+    self._q = [None] *max(1, depth)
+    self._head = 0
+    self._n = 0
+    self._off = 0
+    self._policy = policy
+    self.nWritten = 0
+    self.nDropped = 0
+
+  def put(self, rec):
+    """ Queues record `rec` and writes as much as possible; returns False if
+        the record was dropped
+    """
+    d = len(self._q)
+    if self._n == d and self.service() == d:
+      if self._policy == POLICY_DROP:
+        self.nDropped += 1
+        return False
+      while self.service() == d:
+        time.sleep_ms(1)
+    self._q[(self._head +self._n) % d] = rec
+    self._n += 1
+    self.service()
+    return True
+
+  def service(self):
+    """ Writes queued records until done or the output would block; returns
+        the number of records still queued
+    """
+    q = self._q
+    while self._n:
+      rec = q[self._head]
+      off = self._off
+      k = self._write(rec if off == 0 else memoryview(rec)[off:])
+      if k <= 0:
+        break
+      self._off = off +k
+      if self._off < len(rec):
+        break
+      q[self._head] = None
+      self._head = (self._head +1) % len(q)
+      self._n -= 1
+      self._off = 0
+      self.nWritten += 1
+    return self._n
+
+  def flush(self, timeout_ms=1000):
+    """ Tries for up to `timeout_ms` to write all queued records; returns
+        True if successful
+    """
+    t0 = time.ticks_ms()
+    while self.service() > 0:
+      if time.ticks_diff(time.ticks_ms(), t0) > timeout_ms:
+        return False
+      time.sleep_ms(1)
+    return True
+
+  def close(self):
+    self.flush()
+    self._close()
+
+  def onEvent(self, ev):
+    """ Called by the spectral image on `EV_xxx` events
+    """
+    pass
+
+  @property
+  def pending(self):
+    """ Number of queued records
+    """
+    return self._n
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _write(self, buf):
+    """ Writes (part of) `buf`; returns the number of bytes written, which
+        is 0 if the output is busy
+    """
+    return len(buf)
+
+  def _close(self):
+    pass
+
+# ----------------------------------------------------------------------------
+class FileSink(Sink):
+  """Writes records into file `fname` on the flash; if the file exists and
+     `overwrite` is False, `isReady` is False and nothing is written.
+     Records are collected in a preallocated buffer of `n_blocks` blocks of
+     `block_size` bytes, and only whole blocks are written, at the times
+     given by the `flush` flags (`FLUSH_xxx`)."""
+
+  def __init__(self, fname, overwrite=True, depth=DEF_DEPTH,
+               policy=POLICY_BLOCK, block_size=BLOCK_SIZE,
+               n_blocks=DEF_N_BLOCKS, flush=FLUSH_IDLE, flush_n=0):
+    super().__init__(depth, policy)
+    self.fname = fname
+    self._file = None
+    self._bs = block_size
+    self._buf = bytearray(block_size *max(1, n_blocks))
+    self._bufMv = memoryview(self._buf)
+    self._nBuf = 0
+    self._flush = flush
+    self._flushN = flush_n
+    self._nPix = 0
+    self.nBlocks = 0
+    try:
+      os.stat(fname)
+      if not overwrite:
+        return
+      os.remove(fname)
+    except OSError:
+      pass
+    self._file = open(fname, "wb")
+
+  @property
+  def isReady(self):
+    return self._file is not None
+
+  def onEvent(self, ev):
+    f = self._flush
+    if ev == EV_PIXEL:
+      self._nPix += 1
+      if f & FLUSH_PIXELS and self._flushN > 0 and self._nPix >= self._flushN:
+        self._nPix = 0
+        self.writeBlocks()
+    elif ((ev == EV_ROW and f & FLUSH_ROW) or
+          (ev == EV_IDLE and f & FLUSH_IDLE)):
+      self.writeBlocks()
+
+  def writeBlocks(self, partial=False):
+    """ Writes all complete blocks (and the rest, if `partial` is True) from
+        the buffer to the file
+    """
+    n = self._nBuf if partial else (self._nBuf //self._bs) *self._bs
+    if n == 0 or not self._file:
+      return
+    self._file.write(self._bufMv[:n])
+    self.nBlocks += n //self._bs
+    rest = self._nBuf -n
+    if rest > 0:
+      # Keep the incomplete block; `rest` < `n`, hence no overlap
+      self._bufMv[:rest] = self._bufMv[n:n +rest]
+    self._nBuf = rest
+
+  def _write(self, buf):
+    if not self._file:
+      return len(buf)
+    mv = memoryview(buf)
+    n = len(mv)
+    i = 0
+    while i < n:
+      if self._nBuf == len(self._buf):
+        # Buffer full, cannot wait for the next flush event
+        self.writeBlocks()
+      k = min(n -i, len(self._buf) -self._nBuf)
+      self._bufMv[self._nBuf:self._nBuf +k] = mv[i:i +k]
+      self._nBuf += k
+      i += k
+    return n
+
+  def _close(self):
+    if self._file:
+      self.writeBlocks(partial=True)
+      self._file.close()
+      self._file = None
+
+# ----------------------------------------------------------------------------
+class StreamSink(Sink):
+  """Writes records to any stream with a `write` method that returns the
+     number of bytes written (e.g. `machine.UART`)."""
+
+  def __init__(self, stream, depth=DEF_DEPTH, policy=POLICY_DROP):
+    super().__init__(depth, policy)
+    self._stream = stream
+
+  def _write(self, buf):
+    k = self._stream.write(buf)
+    return k if k else 0
+
+# ----------------------------------------------------------------------------
+class SocketSink(Sink):
+  """Sends records via a non-blocking TCP connection to `host`:`port`
+     (`netstream.Link`); if the connection is lost, it is re-established
+     after `reconnect_ms` (a partially sent record is then sent again)."""
+
+  def __init__(self, host, port, depth=DEF_DEPTH, policy=POLICY_DROP,
+               reconnect_ms=DEF_RECONNECT_MS):
+    super().__init__(depth, policy)
+    from netstream import Link
+    self._link = Link(host, port, reconnect_ms=reconnect_ms)
+
+  @property
+  def isConnected(self):
+    return self._link.isConnected
+
+  def _write(self, buf):
+    if not self._link.isConnected and not self._link.open():
+      return 0
+    k = self._link.send(buf)
+    if not self._link.isConnected:
+      # Connection lost, the record is sent again on the next one
+      self._off = 0
+    return k
+
+  def _close(self):
+    self._link.close()
+    self._off = 0
+
+# ----------------------------------------------------------------------------
+class RingSink(Sink):
+  """Keeps the latest `depth` records in RAM (e.g. for a live view); never
+     blocks, the oldest record is replaced when full."""
+
+  def put(self, rec):
+    d = len(self._q)
+    if self._n == d:
+      self._head = (self._head +1) % d
+      self._n -= 1
+    self._q[(self._head +self._n) % d] = rec
+    self._n += 1
+    self.nWritten += 1
+    return True
+
+  def service(self):
+    return 0
+
+  def records(self):
+    """ Returns the buffered records, oldest first
+    """
+    d = len(self._q)
+    return [self._q[(self._head +i) % d] for i in range(self._n)]
+
+  def clear(self):
+    for i in range(len(self._q)):
+      self._q[i] = None
+    self._head = 0
+    self._n = 0
+
+# ----------------------------------------------------------------------------
+class CallbackSink(Sink):
+  """Passes each record as `str` to function `func` (e.g. to send it via
+     the REPL)."""
+
+  def __init__(self, func, depth=1, policy=POLICY_BLOCK):
+    super().__init__(depth, policy)
+    self.func = func
+
+  def _write(self, buf):
+    self.func(bytes(buf).decode())
+    return len(buf)
+
+class PrintSink(Sink):
+  """Prints the records (w/o line feed)."""
+
+  def __init__(self, depth=1, policy=POLICY_BLOCK):
+    super().__init__(depth, policy)
+
+  def _write(self, buf):
+    print(bytes(buf).decode().rstrip())
+    return len(buf)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,22 @@
+# ----------------------------------------------------------------------------
+# scanhost
+# Host-side tools for the spectral scanner
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - `ScanClient`; installable package (`pip install -e host`)
+# 2026-10-19, v1.2 - `textlog`, parser for the text format of `SpectImg`
+# 2026-10-19, v1.3 - `store`, append-only chunked store for time-lapses
+# 2026-10-19, v1.4 - `catalog`, SQLite index of recordings
+# 2026-10-19, v1.5 - `convert`, parallel converter for legacy recordings
+# 2026-10-19, v1.6 - `grid`, path-aware reassembly of scans into cubes
+# 2026-10-19, v1.7 - `conecatch`, cached opsin projection
+# 2026-10-19, v1.8 - `cache`, content-addressed cache of image products
+# 2026-10-19, v1.9 - `pyramid` and `tileserver`, tiled viewing of large cubes
+# 2026-10-19, v1.10 - `analytics`, chunked PCA, NMF unmixing and spectral angles
+# 2026-10-19, v1.11 - `specindex`, nearest-neighbour search in spectral libraries
+# ----------------------------------------------------------------------------
+__version__ = "0.1.11.0"
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,237 @@
+# ----------------------------------------------------------------------------
+# analytics.py
+# Out-of-core spectral analytics over whole archives: PCA (from a running
+# covariance), NMF endmember unmixing (mini-batch) and spectral angles
+#
+# Sources are arrays (... x n_spect, e.g. memory-mapped `.npy` cubes),
+# `store.Recording`s or lists of those; they are read in chunks of about
+# `chunk` spectra, which are processed in a thread pool (NumPy releases the
+# GIL in the matrix operations). Only one chunk per thread is in memory.
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - Blocks of a `Recording` do not span chunk files
+# ----------------------------------------------------------------------------
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+DEF_CHUNK     = 16384   # spectra per chunk
+EPS           = 1e-12
+
+# ----------------------------------------------------------------------------
+def blocks(src, chunk=DEF_CHUNK):
+  """ Returns `(shape, n_spect, blocks)` of `src`: `shape` of the result
+      per spectrum (w/o channels) and a list of `(start, stop, block)` with
+      lazy (memory-mapped) blocks of up to about `chunk` spectra
+  """
+  if isinstance(src, (list, tuple)):
+    parts = [blocks(s, chunk) for s in src]
+    nSpect = parts[0][1]
+    if any(p[1] != nSpect for p in parts):
+      raise ValueError("Sources differ in the number of channels")
+    res = []
+    n = 0
+    for shape, _, bl in parts:
+      res += [(n +a, n +b, x) for a, b, x in bl]
+      n += int(np.prod(shape))
+    return (n,), nSpect, res
+  if hasattr(src, "slice"):
+    # `Recording`; whole frames per block, with the number of frames a
+    # divisor of the chunk length, so that no block spans two chunk files
+    # and all blocks are views of the memory-mapped chunks
+    want = max(1, chunk //src.n_pix)
+    step = max(d for d in range(1, min(want, src.chunk_len) +1)
+               if src.chunk_len % d == 0)
+    res = []
+    for i in range(0, len(src), step):
+      j = min(len(src), i +step)
+      res.append((i *src.n_pix, j *src.n_pix,
+                  src.slice(i, j).reshape(-1, src.n_spect)))
+    return (len(src), src.n_pix), src.n_spect, res
+  a = np.asarray(src)
+  flat = a.reshape(-1, a.shape[-1])
+  res = [(i, min(len(flat), i +chunk), flat[i:i +chunk])
+         for i in range(0, len(flat), chunk)]
+  return a.shape[:-1], a.shape[-1], res
+
+def _pmap(func, bl, n_jobs):
+  # Yields `(start, stop, func(block))` in order, with at most two blocks
+  # per thread in flight
+  n_jobs = n_jobs or os.cpu_count() or 1
+  with ThreadPoolExecutor(n_jobs) as ex:
+    pending = []
+    for a, b, x in bl:
+      pending.append((a, b, ex.submit(func, x)))
+      if len(pending) >= 2 *n_jobs:
+        a0, b0, f = pending.pop(0)
+        yield a0, b0, f.result()
+    for a, b, f in pending:
+      yield a, b, f.result()
+
+def map_blocks(func, src, n_out, dtype=np.float32, chunk=DEF_CHUNK,
+               n_jobs=None, out=None):
+  """ Returns `func` applied chunk by chunk to the spectra of `src`; `func`
+      maps a block (n x n_spect, `float64`) to (n x n_out). The result has
+      the shape of `src` with `n_out` instead of the channels; `out` may be
+      given (e.g. a memory-mapped array)
+  """
+  shape, _, bl = blocks(src, chunk)
+  n = int(np.prod(shape))
+  if out is None:
+    out = np.empty((n, n_out), dtype=dtype)
+  flat = out.reshape(n, n_out)
+  f = lambda x: func(np.asarray(x, dtype=np.float64))
+  for a, b, y in _pmap(f, bl, n_jobs):
+    flat[a:b] = y
+  return out.reshape(tuple(shape) +(n_out,))
+
+# ----------------------------------------------------------------------------
+class PCA(object):
+  """Principal components of all spectra of a source, from the mean and
+     covariance accumulated chunk by chunk (in `float64`, relative to the
+     mean of the first chunk, for accuracy)."""
+
+  def __init__(self, n_components=None):
+    self.n_components = n_components
+    self.n = 0
+    self.mean = None
+    self.cov = None
+    self.components = None
+    self.explained_variance = None
+
+  def fit(self, src, chunk=DEF_CHUNK, n_jobs=None):
+    """ Computes the components of the spectra in `src`; returns `self`
+    """
+    _, nSpect, bl = blocks(src, chunk)
+    if not bl:
+      raise ValueError("No spectra")
+    shift = np.asarray(bl[0][2], dtype=np.float64).mean(axis=0)
+
+    def moments(x):
+      x = np.asarray(x, dtype=np.float64) -shift
+      return len(x), x.sum(axis=0), x.T @ x
+
+    n = 0
+    s1 = np.zeros(nSpect)
+    s2 = np.zeros((nSpect, nSpect))
+    for _, _, (m, a, b) in _pmap(moments, bl, n_jobs):
+      n += m
+      s1 += a
+      s2 += b
+    d = s1 /n
+    self.n = n
+    self.mean = shift +d
+    self.cov = (s2 -n *np.outer(d, d)) /max(1, n -1)
+    val, vec = np.linalg.eigh(self.cov)
+    k = self.n_components or nSpect
+    order = np.argsort(val)[::-1][:k]
+    self.explained_variance = val[order]
+    self.components = vec[:, order].T
+    return self
+
+  @property
+  def explained_variance_ratio(self):
+    return self.explained_variance /np.trace(self.cov)
+
+  def transform(self, src, chunk=DEF_CHUNK, n_jobs=None, out=None):
+    """ Returns the scores (... x n_components) of the spectra in `src`
+    """
+    c = self.components.T
+    return map_blocks(lambda x: (x -self.mean) @ c, src, c.shape[1],
+                      chunk=chunk, n_jobs=n_jobs, out=out)
+
+  def inverse_transform(self, scores):
+    return np.asarray(scores) @ self.components +self.mean
+
+# ----------------------------------------------------------------------------
+def _solveW(x, h, w=None, n_iter=30):
+  # Multiplicative updates of the abundances `w` (n x k) for fixed
+  # endmembers `h` (k x n_spect)
+  xh = x @ h.T
+  hh = h @ h.T
+  if w is None:
+    w = np.full((len(x), len(h)), max(x.mean(), EPS) /max(h.sum(axis=1).mean(), EPS))
+  for _ in range(n_iter):
+    w *= xh /(w @ hh +EPS)
+  return w
+
+def nmf(src, n_components, n_epochs=2, batch=DEF_CHUNK, n_iter=30, forget=0.7,
+        seed=0, n_jobs=None):
+  """ Returns `n_components` endmember spectra (n_components x n_spect,
+      each with a maximum of 1) of the non-negative spectra in `src`, by
+      online NMF (mini-batches of `batch` spectra; `forget` weighs the
+      statistics of earlier rounds). Use `unmix` for the abundances
+  """
+  _, nSpect, bl = blocks(src, batch)
+  if not bl:
+    raise ValueError("No spectra")
+  rng = np.random.default_rng(seed)
+  n_jobs = n_jobs or os.cpu_count() or 1
+  x0 = np.clip(np.asarray(bl[0][2], dtype=np.float64), 0, None)
+  h = x0[rng.choice(len(x0), n_components, replace=len(x0) < n_components)]
+  h = h +x0.mean() *0.1 *rng.random(h.shape)
+  a = np.zeros((n_components, nSpect))
+  b = np.zeros((n_components, n_components))
+
+  def stats(x):
+    x = np.clip(np.asarray(x, dtype=np.float64), 0, None)
+    w = _solveW(x, h, n_iter=n_iter)
+    return w.T @ x, w.T @ w
+
+  with ThreadPoolExecutor(n_jobs) as ex:
+    for _ in range(n_epochs):
+      order = rng.permutation(len(bl))
+      # One round is one batch per thread, all with the same endmembers
+      for r in range(0, len(order), n_jobs):
+        res = list(ex.map(stats, [bl[i][2] for i in order[r:r +n_jobs]]))
+        a = forget *a +sum(v[0] for v in res)
+        b = forget *b +sum(v[1] for v in res)
+        for _ in range(n_iter):
+          h = h *(a /(b @ h +EPS))
+  h /= np.maximum(h.max(axis=1, keepdims=True), EPS)
+  return h
+
+def unmix(src, endmembers, n_iter=200, chunk=DEF_CHUNK, n_jobs=None, out=None):
+  """ Returns the non-negative abundances (... x n_endmembers) of the
+      `endmembers` (n x n_spect) in the spectra of `src`
+  """
+  h = np.asarray(endmembers, dtype=np.float64)
+  return map_blocks(lambda x: _solveW(np.clip(x, 0, None), h, n_iter=n_iter),
+                    src, len(h), chunk=chunk, n_jobs=n_jobs, out=out)
+
+# ----------------------------------------------------------------------------
+def _unit(a):
+  n = np.linalg.norm(a, axis=-1, keepdims=True)
+  with np.errstate(invalid="ignore", divide="ignore"):
+    return a /n
+
+def spectral_angles(src, refs, chunk=DEF_CHUNK, n_jobs=None, out=None):
+  """ Returns the angles [rad] (... x n_refs) between the spectra of `src`
+      and the reference spectra `refs` (n_refs x n_spect); NaN for spectra
+      that are all zero
+  """
+  r = _unit(np.asarray(refs, dtype=np.float64)).T
+  return map_blocks(lambda x: np.arccos(np.clip(_unit(x) @ r, -1, 1)),
+                    src, r.shape[1], chunk=chunk, n_jobs=n_jobs, out=out)
+
+def sam_classify(src, refs, max_angle=None, chunk=DEF_CHUNK, n_jobs=None):
+  """ Returns the index of the reference with the smallest spectral angle
+      for each spectrum of `src` (`int16`), or -1 if that angle exceeds
+      `max_angle` [rad] or is undefined
+  """
+  r = _unit(np.asarray(refs, dtype=np.float64)).T
+
+  def classify(x):
+    ang = np.arccos(np.clip(_unit(x) @ r, -1, 1))
+    ang[np.isnan(ang)] = np.inf
+    lbl = ang.argmin(axis=1)
+    best = ang[np.arange(len(x)), lbl]
+    lim = np.inf if max_angle is None else max_angle
+    lbl[~(best <= lim) | np.isinf(best)] = -1
+    return lbl[:, None]
+
+  return map_blocks(classify, src, 1, np.int16, chunk, n_jobs)[..., 0]
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,282 @@
+# ----------------------------------------------------------------------------
+# cache.py
+# Content-addressed cache for derived image products (mono images, opsin
+# catches, RGB renderings, ...)
+#
+# A product is identified by a key that hashes the data it is computed
+# from and its recipe (e.g. opsin set, normalisation, wavelength range).
+# Products are kept in RAM (LRU, bounded) and as `.npy` files on disk
+# (bounded; the least recently used files are deleted first).
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from scanhost import conecatch, grid
+
+DEF_DIR       = os.path.join(os.path.expanduser("~"), ".cache", "scanhost")
+DEF_MAX_DISK  = 1 << 30
+DEF_MAX_MEM   = 256 << 20
+
+# Part of every key; increase to invalidate products after changes of the
+# code that computes them
+RECIPE_VER    = 1
+
+_default      = None
+
+# ----------------------------------------------------------------------------
+def make_key(*parts):
+  """ Returns a hex digest of `parts` (arrays, bytes, str, numbers, dicts,
+      lists); arrays are hashed by content, dtype and shape
+  """
+  h = hashlib.blake2b(digest_size=20)
+  for p in parts:
+    if isinstance(p, np.ndarray):
+      h.update(str((p.dtype.str, p.shape)).encode())
+      h.update(np.ascontiguousarray(p).data)
+    elif isinstance(p, (bytes, bytearray, memoryview)):
+      h.update(p)
+    else:
+      h.update(json.dumps(p, sort_keys=True, default=_jsonDefault).encode())
+    h.update(b"\x00")
+  return h.hexdigest()
+
+def data_key(obj):
+  """ Returns the key of the data in `obj`: a `ScanResult`, an array, or a
+      tuple `(Recording, i_frame)` (frames of a store never change, hence
+      its path and index entry suffice)
+  """
+  if isinstance(obj, tuple):
+    rec, i = obj
+    if i < 0:
+      i += len(rec)
+    return make_key("frame", os.path.abspath(rec.path), rec.index[i])
+  if hasattr(obj, "cube"):
+    return make_key("scan", obj.cube, obj.header)
+  return make_key("array", np.asarray(obj))
+
+def _jsonDefault(v):
+  if isinstance(v, np.generic):
+    return v.item()
+  if isinstance(v, np.ndarray):
+    return v.tolist()
+  return str(v)
+
+# ----------------------------------------------------------------------------
+class ProductCache(object):
+  """Two-level cache: up to `max_mem` bytes of arrays in RAM and up to
+     `max_disk` bytes of `.npy` files in `path`. Safe to use from several
+     threads; several processes may share `path`."""
+
+  def __init__(self, path=DEF_DIR, max_disk=DEF_MAX_DISK, max_mem=DEF_MAX_MEM):
+    self.path = path
+    self.max_disk = max_disk
+    self.max_mem = max_mem
+    self.n_hits_mem = 0
+    self.n_hits_disk = 0
+    self.n_misses = 0
+    self._mem = OrderedDict()
+    self._nMem = 0
+    self._lock = threading.Lock()
+    os.makedirs(path, exist_ok=True)
+    # Files on disk, least recently used first
+    files = []
+    for dirpath, _, names in os.walk(path):
+      for n in names:
+        if n.endswith(".npy"):
+          fn = os.path.join(dirpath, n)
+          st = os.stat(fn)
+          files.append((st.st_mtime, n[:-4], st.st_size))
+    files.sort()
+    self._disk = OrderedDict((k, s) for _, k, s in files)
+    self._nDisk = sum(self._disk.values())
+
+  def get(self, key):
+    """ Returns the product `key` (read-only), or None
+    """
+    with self._lock:
+      a = self._mem.get(key)
+      if a is not None:
+        self._mem.move_to_end(key)
+        self.n_hits_mem += 1
+        return a
+    fn = self._fname(key)
+    try:
+      a = np.load(fn)
+      os.utime(fn)
+    except (OSError, ValueError):
+      with self._lock:
+        self.n_misses += 1
+      return None
+    a.setflags(write=False)
+    with self._lock:
+      self.n_hits_disk += 1
+      if key in self._disk:
+        self._disk.move_to_end(key)
+    self._toMem(key, a)
+    return a
+
+  def put(self, key, a):
+    """ Stores a copy of array `a` as product `key`; returns the copy
+        (read-only)
+    """
+    a = np.array(a)
+    a.setflags(write=False)
+    self._toMem(key, a)
+    if a.nbytes > self.max_disk:
+      return a
+    fn = self._fname(key)
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    tmp = "{0}.{1}.tmp".format(fn, threading.get_ident())
+    with open(tmp, "wb") as f:
+      np.save(f, a)
+    os.replace(tmp, fn)
+    size = os.path.getsize(fn)
+    with self._lock:
+      self._nDisk += size -self._disk.pop(key, 0)
+      self._disk[key] = size
+      self._evictDisk()
+    return a
+
+  def get_or_compute(self, key, func, *args, **kwargs):
+    """ Returns product `key`; if it is not cached, it is computed by
+        `func(*args, **kwargs)` and stored
+    """
+    a = self.get(key)
+    if a is None:
+      a = self.put(key, func(*args, **kwargs))
+    return a
+
+  def clear(self, disk=True):
+    with self._lock:
+      self._mem.clear()
+      self._nMem = 0
+      if disk:
+        for key in list(self._disk):
+          self._remove(key)
+
+  @property
+  def n_bytes(self):
+    """ Bytes used in RAM and on disk
+    """
+    return self._nMem, self._nDisk
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _fname(self, key):
+    return os.path.join(self.path, key[:2], key +".npy")
+
+  def _toMem(self, key, a):
+    if a.nbytes > self.max_mem:
+      return
+    with self._lock:
+      old = self._mem.pop(key, None)
+      if old is not None:
+        self._nMem -= old.nbytes
+      self._mem[key] = a
+      self._nMem += a.nbytes
+      while self._nMem > self.max_mem:
+        _, b = self._mem.popitem(last=False)
+        self._nMem -= b.nbytes
+
+  def _evictDisk(self):
+    while self._nDisk > self.max_disk and self._disk:
+      self._remove(next(iter(self._disk)))
+
+  def _remove(self, key):
+    self._nDisk -= self._disk.pop(key, 0)
+    try:
+      os.remove(self._fname(key))
+    except OSError:
+      pass
+
+def default_cache():
+  """ Returns the cache in `DEF_DIR` (or `$SCANHOST_CACHE`)
+  """
+  global _default
+  if _default is None:
+    _default = ProductCache(os.environ.get("SCANHOST_CACHE", DEF_DIR))
+  return _default
+
+# ----------------------------------------------------------------------------
+# Products; `src` is anything `data_key` accepts, `cache=False` computes
+# without caching
+def get_cube(src):
+  """ Returns `(cube, wavelengths_nm)` of `src` (rows x cols x n_spect, if
+      the geometry is known); frames of a store are placed into the grid, if
+      their index entry has the scan geometry
+  """
+  if isinstance(src, tuple):
+    rec, i = src
+    flat, e = rec[i], rec.index[i]
+    if "size_xy" in e and "step_xy_deg" in e:
+      flat = grid.to_grid(flat, grid.index_for(e, rec.pix(i)[:, :2]))
+    return flat, rec.wavelengths_nm
+  if hasattr(src, "cube"):
+    return src.to_grid(), src.wavelengths_nm
+  return np.asarray(src), None
+
+def _run(src, recipe, func, cache):
+  if cache is False:
+    return func()
+  cache = cache or default_cache()
+  key = make_key(RECIPE_VER, data_key(src), recipe)
+  return cache.get_or_compute(key, func)
+
+def _opsinsKey(opsins):
+  ops = conecatch.get_set(opsins)
+  return [ops.name, make_key(ops.nm, ops.curves)]
+
+def mono(src, range_nm=None, normalize=True, wavelengths_nm=None, cache=None):
+  """ Returns the mono image (integral over wavelength, or over the channel
+      index if the wavelengths are unknown, divided by its maximum if
+      `normalize` is True) of `src`
+  """
+  def compute():
+    cube, nm = get_cube(src)
+    nm = nm if wavelengths_nm is None else wavelengths_nm
+    nm = np.arange(cube.shape[-1]) if nm is None else np.asarray(nm)
+    w = conecatch.trapezoid_weights(nm)
+    if range_nm is not None:
+      w = w *((nm >= range_nm[0]) & (nm <= range_nm[1]))
+    w = w.astype(np.float32)
+    img = cube.reshape(-1, cube.shape[-1]).astype(np.float32) @ w
+    img = img.reshape(cube.shape[:-1])
+    if normalize and img.max() > 0:
+      img /= img.max()
+    return img
+  recipe = {"product": "mono", "range_nm": range_nm, "normalize": normalize,
+            "nm": wavelengths_nm}
+  return _run(src, recipe, compute, cache)
+
+def catches(src, opsins=conecatch.DEF_SET, range_nm=None, dark=None,
+            wavelengths_nm=None, cache=None):
+  """ Returns the opsin catches of `src` (see `conecatch.project`)
+  """
+  def compute():
+    cube, nm = get_cube(src)
+    nm = nm if wavelengths_nm is None else wavelengths_nm
+    return conecatch.project(cube, nm, opsins, range_nm, dark)
+  recipe = {"product": "catches", "opsins": _opsinsKey(opsins),
+            "range_nm": range_nm, "dark": dark, "nm": wavelengths_nm}
+  return _run(src, recipe, compute, cache)
+
+def rgb(src, opsins=conecatch.DEF_SET, range_nm=None, dark=None, gain=None,
+        wavelengths_nm=None, cache=None):
+  """ Returns the RGB rendering of the opsin catches of `src` (see
+      `conecatch.to_rgb`); the catches are cached as well
+  """
+  def compute():
+    c = catches(src, opsins, range_nm, dark, wavelengths_nm, cache)
+    return conecatch.to_rgb(c, gain)
+  recipe = {"product": "rgb", "opsins": _opsinsKey(opsins),
+            "range_nm": range_nm, "dark": dark, "gain": gain,
+            "nm": wavelengths_nm}
+  return _run(src, recipe, compute, cache)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,275 @@
+# ----------------------------------------------------------------------------
+# catalog.py
+# SQLite catalog of recordings (pickled frames of `loop_telescope.ipynb`,
+# `.npy` files of `run_spectrometer.save`, `.npz` files of `ScanResult.save`,
+# text files of `SpectImg` and stores of `store.Recording`), to find frames
+# by time, exposure or scan size without loading them. `.npy` files w/o
+# header (e.g. of pyramids or `receiver.CubeWriter`) are no recordings and
+# are skipped.
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - `.npy` and `.sim` files; sort order checked
+# ----------------------------------------------------------------------------
+import os
+import re
+import time
+import sqlite3
+import numpy as np
+from scanhost import store
+
+DEF_DB        = "catalog.sqlite"
+SATURATED     = 4095    # 12-bit ADC
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+  path TEXT PRIMARY KEY, kind TEXT, mtime REAL, size INTEGER,
+  n_frames INTEGER
+);
+CREATE TABLE IF NOT EXISTS frames (
+  id INTEGER PRIMARY KEY, path TEXT, i_frame INTEGER, device TEXT,
+  t REAL, tod_s INTEGER, t_int_s REAL,
+  size_x REAL, size_y REAL, step_x REAL, step_y REAL,
+  n_pix INTEGER, n_spect INTEGER,
+  mean REAL, min INTEGER, max INTEGER, frac_sat REAL,
+  UNIQUE (path, i_frame)
+);
+CREATE INDEX IF NOT EXISTS frames_t ON frames (t);
+CREATE INDEX IF NOT EXISTS frames_tod ON frames (tod_s);
+CREATE INDEX IF NOT EXISTS frames_t_int ON frames (t_int_s);
+"""
+
+# Columns `query` can sort by
+_ORDER_COLS   = ("path", "i_frame", "device", "t", "tod_s", "t_int_s", "size_x",
+                 "size_y", "step_x", "step_y", "n_pix", "n_spect", "mean",
+                 "min", "max", "frac_sat")
+
+# Time in file names like `header&SpecImg_2024-5-31_10:50:4.pkl`
+_RE_FNAME_T   = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})_(\d{1,2})[:_-](\d{1,2})[:_-](\d{1,2})")
+
+# ----------------------------------------------------------------------------
+class Catalog(object):
+  """Index of the frames of all recordings below one or more directories;
+     `update` only reads files that are new or have changed since the last
+     call (or, for a `Recording`, only the frames appended since)."""
+
+  def __init__(self, db=DEF_DB):
+    self.db = db
+    self._con = sqlite3.connect(db)
+    self._con.row_factory = sqlite3.Row
+    self._con.executescript(_SCHEMA)
+
+  def close(self):
+    self._con.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def __len__(self):
+    return self._con.execute("SELECT COUNT(*) FROM frames").fetchone()[0]
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def update(self, root, device=None, verbose=False):
+    """ Adds new and changed recordings below `root`; frames are tagged
+        with `device` (default: name of `root`). Returns the number of
+        frames added
+    """
+    device = device or os.path.basename(os.path.abspath(root))
+    known = {r["path"]: r for r in self._con.execute("SELECT * FROM files")}
+    nAdded = 0
+    for dirpath, dirnames, fnames in os.walk(root):
+      if store.META_FILE in fnames:
+        # A `Recording`; do not descend further
+        dirnames[:] = []
+        fnames = [store.INDEX_FILE]
+        kind = "store"
+      else:
+        kind = None
+      for fn in fnames:
+        path = os.path.abspath(os.path.join(dirpath, fn))
+        k = kind or _kind(fn)
+        if not k:
+          continue
+        try:
+          st = os.stat(path)
+        except OSError:
+          continue
+        old = known.get(path)
+        if old and old["mtime"] == st.st_mtime and old["size"] == st.st_size:
+          continue
+        try:
+          n = self._add(path, k, st, device, old)
+        except Exception as e:
+          if verbose:
+            print("WARNING: Skipped `{0}` ({1})".format(path, e))
+          continue
+        nAdded += n
+        if verbose:
+          print("{0} frame(s) from `{1}`".format(n, path))
+    self._con.commit()
+    return nAdded
+
+  def query(self, t0=None, t1=None, tod=None, t_int_min=None, t_int_max=None,
+            size_xy=None, step_xy_deg=None, device=None, order="t"):
+    """ Returns the frames (`sqlite3.Row` with `path`, `i_frame`, `t`, ...)
+        taken between `t0` and `t1` (epoch [s] or `time.struct_time`), in
+        the time-of-day window `tod` (`(start, end)` in hours, e.g. `(21, 6)`
+        for the night), with integration time within `t_int_min` and
+        `t_int_max` [s] and the given scan size, step size and device;
+        `order` are column names, each optionally followed by `DESC` (e.g.
+        `"t_int_s DESC, t"`)
+    """
+    where = []
+    args = []
+    if t0 is not None:
+      where.append("t >= ?")
+      args.append(_epoch(t0))
+    if t1 is not None:
+      where.append("t < ?")
+      args.append(_epoch(t1))
+    if tod is not None:
+      a, b = int(tod[0] *3600), int(tod[1] *3600)
+      where.append("(tod_s >= ? AND tod_s < ?)" if a <= b else
+                   "(tod_s >= ? OR tod_s < ?)")
+      args += [a, b]
+    if t_int_min is not None:
+      # Integration times are floats sent by the device; allow for rounding
+      where.append("t_int_s >= ?")
+      args.append(t_int_min *(1 -1e-6))
+    if t_int_max is not None:
+      where.append("t_int_s <= ?")
+      args.append(t_int_max *(1 +1e-6))
+    if size_xy is not None:
+      where.append("size_x = ? AND size_y = ?")
+      args += list(size_xy)
+    if step_xy_deg is not None:
+      where.append("step_x = ? AND step_y = ?")
+      args += list(step_xy_deg)
+    if device is not None:
+      where.append("device = ?")
+      args.append(device)
+    sql = "SELECT * FROM frames"
+    if where:
+      sql += " WHERE " +" AND ".join(where)
+    if order:
+      sql += " ORDER BY " +_orderBy(order)
+    return self._con.execute(sql, args).fetchall()
+
+  def load(self, row):
+    """ Returns the spectra of the frame of a query result (`n_pix` x
+        `n_spect`)
+    """
+    path, kind = row["path"], _kind(row["path"])
+    if os.path.basename(path) == store.INDEX_FILE:
+      return np.asarray(store.Recording(os.path.dirname(path),
+                                        readonly=True)[row["i_frame"]])
+    return _loadFile(path, kind)[1]
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _add(self, path, kind, st, device, old):
+    con = self._con
+    if kind == "store":
+      rec = store.Recording(os.path.dirname(path), readonly=True)
+      i0 = old["n_frames"] if old else 0
+      if i0 > len(rec):
+        # Store was replaced; start over
+        con.execute("DELETE FROM frames WHERE path = ?", (path,))
+        i0 = 0
+      rows = []
+      for i in range(i0, len(rec)):
+        e = rec.index[i]
+        hdr = {"t_int_s": e.get("t_int_s"), "size_xy": e.get("size_xy"),
+               "step_xy_deg": e.get("step_xy_deg")}
+        rows.append(_row(path, i, device, e["t"], hdr, rec[i]))
+      n = len(rec)
+    else:
+      hdr, cube = _loadFile(path, kind)
+      t = _fileTime(path, hdr, st)
+      con.execute("DELETE FROM frames WHERE path = ?", (path,))
+      rows = [_row(path, 0, device, t, hdr, cube)]
+      n = 1
+    con.executemany("INSERT OR REPLACE INTO frames (path, i_frame, device, t, "
+                    "tod_s, t_int_s, size_x, size_y, step_x, step_y, n_pix, "
+                    "n_spect, mean, min, max, frac_sat) VALUES "
+                    "(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+    con.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?)",
+                (path, kind, st.st_mtime, st.st_size, n))
+    return len(rows)
+
+# ----------------------------------------------------------------------------
+def _kind(fname):
+  ext = os.path.splitext(fname)[1].lower()
+  return {".pkl": "pickle", ".npy": "npy", ".npz": "npz", ".txt": "text",
+          ".sim": "text"}.get(ext)
+
+def _orderBy(order):
+  # `ORDER BY` clause of `order`, only with known columns
+  terms = []
+  for term in order.split(","):
+    w = term.split()
+    if (not 1 <= len(w) <= 2 or w[0] not in _ORDER_COLS or
+        (len(w) == 2 and w[1].upper() not in ("ASC", "DESC"))):
+      raise ValueError("Cannot sort by `{0}`".format(term.strip()))
+    terms.append(" ".join(w))
+  return ", ".join(terms)
+
+def _loadFile(path, kind):
+  # Returns `(header, cube)` of a single-frame file
+  if kind == "pickle":
+    import pickle
+    with open(path, "rb") as f:
+      d = pickle.load(f)
+    return d, np.asarray(d["SpectImg"])
+  if kind == "npy":
+    # Only with the header of `run_spectrometer.save` in front of the image;
+    # checked w/o loading the array
+    with open(path, "rb") as f:
+      v = np.lib.format.read_magic(f)
+      if v == (1, 0):
+        dt = np.lib.format.read_array_header_1_0(f)[2]
+      elif v == (2, 0):
+        dt = np.lib.format.read_array_header_2_0(f)[2]
+      else:
+        dt = None
+    if dt != object:
+      raise ValueError("no header")
+    from scanhost import convert
+    return convert.load_legacy(path)[:2]
+  if kind == "npz":
+    from scanhost.client import ScanResult
+    res = ScanResult.load(path)
+    return res.header, res.cube
+  from scanhost import textlog
+  res = textlog.parse_file(path)
+  if res is None:
+    raise ValueError("no pixels")
+  return res.header, res.cube
+
+def _fileTime(path, hdr, st):
+  if "date_yyyymmdd" in hdr and "time_hhmmss" in hdr:
+    return store.header_time(hdr)
+  m = _RE_FNAME_T.search(os.path.basename(path))
+  if m:
+    v = [int(x) for x in m.groups()]
+    return time.mktime((v[0], v[1], v[2], v[3], v[4], v[5], 0, 0, -1))
+  return st.st_mtime
+
+def _row(path, i, device, t, hdr, cube):
+  cube = np.asarray(cube)
+  lt = time.localtime(t)
+  sx, sy = hdr.get("size_xy") or (None, None)
+  tx, ty = hdr.get("step_xy_deg") or (None, None)
+  n_spect = cube.shape[-1]
+  return (path, i, device, t, lt.tm_hour *3600 +lt.tm_min *60 +lt.tm_sec,
+          hdr.get("t_int_s"), sx, sy, tx, ty, cube.size //n_spect, n_spect,
+          float(cube.mean()), int(cube.min()), int(cube.max()),
+          float(np.count_nonzero(cube >= SATURATED)) /cube.size)
+
+def _epoch(t):
+  return time.mktime(t) if isinstance(t, time.struct_time) else float(t)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,293 @@
+# ----------------------------------------------------------------------------
+# client.py
+# Scan client: connects to the scanner, starts its command server (`main.py`)
+# via the REPL and returns scans as NumPy cubes
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import sys
+import time
+import queue
+import threading
+import numpy as np
+from scanhost import link as ln
+
+DEF_BAUD      = 115200
+DEF_QUEUE_LEN = 256
+# USB vendor IDs of the USB-serial bridges found on ESP32 boards (Silicon
+# Labs CP210x, WCH CH340, FTDI, Espressif native USB)
+USB_VIDS      = (0x10C4, 0x1A86, 0x0403, 0x303A)
+
+# ----------------------------------------------------------------------------
+def find_ports():
+  """ Returns the names of the serial ports that look like an ESP32 board
+  """
+  from serial.tools import list_ports
+  ports = list_ports.comports()
+  names = [p.device for p in ports if p.vid in USB_VIDS]
+  if not names:
+    pre = ("/dev/ttyUSB", "/dev/ttyACM", "/dev/cu.usbserial", "COM")
+    names = [p.device for p in ports if p.device.startswith(pre)]
+  return sorted(names)
+
+def find_port():
+  """ Returns the first port found by `find_ports`
+  """
+  names = find_ports()
+  if not names:
+    raise ln.LinkError("No scanner found; is it connected via USB?")
+  return names[0]
+
+# ----------------------------------------------------------------------------
+class ScanResult(object):
+  """A scan as `cube` (n_pix x n_spect, `uint16`), `pix` (n_pix x 5,
+     `float32`; x, y, head, pitch, roll), `wavelengths_nm` and `header`
+     (dict, keys as in the text format of `SpectImg`)."""
+
+  PIX_COLS = ("x", "y", "head_deg", "pitch_deg", "roll_deg")
+
+  def __init__(self, header, wavelengths_nm):
+    self.header = header
+    self.wavelengths_nm = wavelengths_nm
+    n = header["n_pix"]
+    self.cube = np.zeros((n, header["n_spect"]), dtype=np.uint16)
+    self.pix = np.full((n, len(self.PIX_COLS)), np.nan, dtype=np.float32)
+    self.received = np.zeros(n, dtype=bool)
+
+  @property
+  def n_received(self):
+    return int(self.received.sum())
+
+  @property
+  def shape_xy(self):
+    """ Number of pixels in x and y
+    """
+    dx, dy = self.header["size_xy"]
+    sx, sy = self.header["step_xy_deg"]
+    return int(dx //sx +1), int(dy //sy +1)
+
+  def to_grid(self, fill=0):
+    """ Returns the spectra as image cube (rows x cols x n_spect), placed by
+        the pixel positions, or by the path type for pixels w/o position;
+        pixels not received are `fill` (see `grid.to_grid`)
+    """
+    from scanhost import grid
+    hdr = self.header
+    if hdr.get("order") == "grid":
+      nx, ny = self.shape_xy
+      return self.cube.reshape(ny, nx, -1)
+    gi = grid.index_for(hdr, self.pix[:, :2])
+    return grid.to_grid(self.cube, gi, self.received, fill)
+
+  def save(self, fname, compressed=False):
+    """ Saves the scan as `.npz` file (`compressed` with zlib, if True)
+    """
+    f = np.savez_compressed if compressed else np.savez
+    f(fname, cube=self.cube, pix=self.pix, received=self.received,
+      wavelengths_nm=self.wavelengths_nm, header=np.array(self.header))
+
+  @classmethod
+  def load(cls, fname):
+    d = np.load(fname, allow_pickle=True)
+    res = cls.__new__(cls)
+    res.header = d["header"].item()
+    res.wavelengths_nm = d["wavelengths_nm"]
+    res.cube = d["cube"]
+    res.pix = d["pix"]
+    res.received = d["received"]
+    return res
+
+# ----------------------------------------------------------------------------
+class ScanJob(object):
+  """A running scan: a background thread receives and parses the pixel
+     frames into a bounded queue, from which `wait` (or iterating over the
+     job) fills the cube of the `ScanResult`."""
+
+  def __init__(self, link, result, queue_len=DEF_QUEUE_LEN):
+    self.result = result
+    self.error = None
+    self._q = queue.Queue(maxsize=queue_len)
+    self._t0 = time.monotonic()
+    self._t1 = None
+    self._thread = threading.Thread(target=self._receive, args=(link,),
+                                    daemon=True)
+    self._thread.start()
+
+  def __iter__(self):
+    """ Yields the pixels `(i_pix, x, y, head, pitch, roll, spectrum)` as
+        they arrive, after storing them in the cube
+    """
+    res = self.result
+    while True:
+      rec = self._q.get()
+      if rec is None:
+        break
+      i = rec[0]
+      res.cube[i] = rec[6]
+      res.pix[i] = rec[1:6]
+      res.received[i] = True
+      yield rec
+    self._t1 = time.monotonic()
+    if self.error:
+      raise self.error
+
+  def wait(self, progress=None):
+    """ Waits for the scan to finish and returns the `ScanResult`;
+        `progress(job)` is called after each pixel, if given
+    """
+    for _ in self:
+      if progress:
+        progress(self)
+    return self.result
+
+  @property
+  def n_done(self):
+    return self.result.n_received
+
+  @property
+  def n_pix(self):
+    return len(self.result.received)
+
+  @property
+  def elapsed_s(self):
+    return (self._t1 or time.monotonic()) -self._t0
+
+  @property
+  def eta_s(self):
+    """ Estimated time in [s] until the scan is complete
+    """
+    n = self.n_done
+    if n == 0:
+      return float("nan")
+    return self.elapsed_s /n *(self.n_pix -n)
+
+  def __repr__(self):
+    return "<ScanJob {0}/{1} pixels, {2:.0f} s, ETA {3:.0f} s>".format(
+      self.n_done, self.n_pix, self.elapsed_s, self.eta_s)
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _receive(self, link):
+    try:
+      for rec in link.scan_all():
+        # Copy, the frame buffer is reused
+        self._q.put(rec[:6] +(rec[6].copy(),))
+    except Exception as e:
+      self.error = e
+    finally:
+      self._q.put(None)
+
+# ----------------------------------------------------------------------------
+class ScanClient(object):
+  """Owns the connection to the scanner: opens the serial device `port`
+     (found automatically, if None), starts the command server on the device
+     via the REPL and stops it again on `close`. `port` can also be an open
+     port object for `ScanLink` with the server already running (e.g. from
+     `sim.socket_pair`)."""
+
+  def __init__(self, port=None, baud=DEF_BAUD, compass=False,
+               timeout_s=ln.DEF_TIMEOUT_S, start_server=True):
+    self._pb = None
+    self._isServer = False
+    if port is None or isinstance(port, str):
+      from scanhost import pyboard
+      self.port = port or find_port()
+      self._pb = pyboard.Pyboard(self.port, baud)
+      if start_server:
+        self._pb.enter_raw_repl()
+        self._pb.exec_raw_no_follow(
+          "import main\nmain.main(compass={0})".format(bool(compass)))
+        self._isServer = True
+      port = _PyboardPort(self._pb)
+    else:
+      self.port = None
+    self.link = ln.ScanLink(port, timeout_s=timeout_s)
+    self.status()
+
+  def close(self):
+    """ Stops the server (if started here) and returns the board to the
+        normal REPL
+    """
+    if self._isServer:
+      try:
+        self.link.quit()
+        self._pb.follow(timeout=2)
+        self._pb.exit_raw_repl()
+      except Exception as e:
+        print("WARNING: Could not stop server ({0})".format(e), file=sys.stderr)
+      self._isServer = False
+    if self._pb:
+      self._pb.close()
+      self._pb = None
+    else:
+      self.link.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def status(self):
+    return self.link.status()
+
+  def wavelengths(self):
+    return self.link.wavelengths()
+
+  def read_spectrum(self, int_s=0):
+    return self.link.read_spectrum(int_s)
+
+  def move(self, pan, tilt, dt_ms=1000):
+    self.link.move(pan, tilt, dt_ms)
+
+  def video(self, int_s=0, n_frames=0, stats=None):
+    return self.link.video(int_s, n_frames, stats=stats)
+
+  def start_scan(self, size_xy, step_xy_deg, int_s, path=ln.PATH_LR_ZIGZAG,
+                 queue_len=DEF_QUEUE_LEN):
+    """ Sets up and starts a scan (see `Scanner.setupScan`); returns the
+        running `ScanJob`
+    """
+    nm = self.link.wavelengths()
+    t = time.localtime()
+    nPix = self.link.setup_scan(size_xy, step_xy_deg, int_s, path)
+    header = {"size_xy": list(size_xy), "step_xy_deg": list(step_xy_deg),
+              "n_spect": self.link.n_spect, "t_int_s": int_s, "path": path,
+              "n_pix": nPix, "date_yyyymmdd": [t.tm_year, t.tm_mon, t.tm_mday],
+              "time_hhmmss": [t.tm_hour, t.tm_min, t.tm_sec]}
+    return ScanJob(self.link, ScanResult(header, nm), queue_len)
+
+  def scan(self, size_xy, step_xy_deg, int_s, path=ln.PATH_LR_ZIGZAG,
+           progress=None):
+    """ Runs a scan and returns the `ScanResult`; with `progress=True`, the
+        progress is shown with `tqdm`, otherwise `progress(job)` is called
+        after every pixel, if given
+    """
+    job = self.start_scan(size_xy, step_xy_deg, int_s, path)
+    if progress is True:
+      from tqdm.auto import tqdm
+      with tqdm(total=job.n_pix) as bar:
+        return job.wait(lambda j: bar.update(1))
+    return job.wait(progress)
+
+# ----------------------------------------------------------------------------
+class _PyboardPort(object):
+  # `read`/`write` interface of `ScanLink` on top of a `Pyboard`, which may
+  # already hold received bytes
+
+  def __init__(self, pb):
+    self._pb = pb
+
+  def read(self, n):
+    k = min(n, self._pb.in_waiting())
+    if k == 0:
+      time.sleep(0.001)
+      return b""
+    return self._pb.read(k)
+
+  def write(self, b):
+    return self._pb.serial.write(b)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,195 @@
+# ----------------------------------------------------------------------------
+# conecatch.py
+# Projection of spectral cubes onto opsin sensitivities (cone catches)
+#
+# For a set of opsins (e.g. `human_SML`) and the wavelength table of the
+# spectrometer, a weight matrix (n_opsins x n_channels) is built once, with
+# the resampled sensitivities and the trapezoid weights of the integration
+# over wavelength folded in, and cached; a cube is then projected with one
+# (chunked) matrix multiplication.
+#
+# Opsin sets are `<name>.npz` files with one curve per opsin (keys in order
+# short to long wavelength, e.g. `s`, `m`, `l`) sampled at the wavelengths
+# in `wavelengths_nm.npz` (key `nm`) in the same directory; they are looked
+# up in `$SCANHOST_OPSINS` and in `opsins` of the package, or added with
+# `register`.
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - opsin sets as package data; `to_rgb` uses the three
+#                    longest wavelength opsins
+# ----------------------------------------------------------------------------
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+DEF_SET       = "human_SML"
+DEF_CHUNK     = 65536   # pixels per matrix multiplication
+CACHE_SIZE    = 16
+
+_sets         = {}
+_wCache       = OrderedDict()
+
+def _packageDir():
+  # Opsin sets that come with the package
+  try:
+    from importlib.resources import files
+  except ImportError:
+    # Python 3.8
+    return os.path.join(os.path.dirname(__file__), "opsins")
+  return str(files("scanhost").joinpath("opsins"))
+
+OPSIN_DIRS    = [d for d in (os.environ.get("SCANHOST_OPSINS"), _packageDir()) if d]
+
+# ----------------------------------------------------------------------------
+class OpsinSet(object):
+  """Sensitivity curves `curves` (n_opsins x n) at wavelengths `nm` (n);
+     `names` in order short to long wavelength."""
+
+  def __init__(self, name, names, curves, nm):
+    self.name = name
+    self.names = tuple(names)
+    self.nm = np.asarray(nm, dtype=np.float64)
+    # Missing and negative values do not contribute
+    c = np.nan_to_num(np.asarray(curves, dtype=np.float64), nan=0.)
+    self.curves = np.clip(c, 0, None)
+
+  def __repr__(self):
+    return "<OpsinSet {0} {1}>".format(self.name, "/".join(self.names))
+
+def register(name, curves, nm):
+  """ Adds opsin set `name`; `curves` is a dict (name -> curve, in order
+      short to long wavelength) sampled at wavelengths `nm`
+  """
+  _sets[name] = OpsinSet(name, list(curves.keys()), list(curves.values()), nm)
+  return _sets[name]
+
+def get_set(name=DEF_SET):
+  """ Returns the `OpsinSet` `name`, loading it if needed
+  """
+  if isinstance(name, OpsinSet):
+    return name
+  if name not in _sets:
+    for d in OPSIN_DIRS:
+      fn = os.path.join(d, name +".npz")
+      if os.path.exists(fn):
+        nm = np.load(os.path.join(d, "wavelengths_nm.npz"))["nm"]
+        with np.load(fn) as f:
+          _sets[name] = OpsinSet(name, f.files, [f[k] for k in f.files], nm)
+        break
+    else:
+      raise KeyError("Opsin set `{0}` not found in {1}".format(name, OPSIN_DIRS))
+  return _sets[name]
+
+def available_sets():
+  """ Returns the names of the known opsin sets
+  """
+  names = set(_sets)
+  for d in OPSIN_DIRS:
+    if os.path.isdir(d):
+      names |= {os.path.splitext(f)[0] for f in os.listdir(d)
+                if f.endswith(".npz") and f != "wavelengths_nm.npz"}
+  return sorted(names)
+
+# ----------------------------------------------------------------------------
+def trapezoid_weights(nm):
+  """ Returns the weights `w` such that `y @ w` equals
+      `np.trapezoid(y, nm)`
+  """
+  nm = np.asarray(nm, dtype=np.float64)
+  w = np.zeros(len(nm))
+  if len(nm) > 1:
+    d = np.diff(nm) /2
+    w[:-1] += d
+    w[1:] += d
+  return w
+
+def weights(wavelengths_nm, opsins=DEF_SET, range_nm=None):
+  """ Returns the weight matrix (n_opsins x n_channels, `float32`) for
+      the spectrometer channels at `wavelengths_nm`, restricted to
+      `range_nm` (`(min, max)`), if given; cached per wavelength table
+  """
+  ops = get_set(opsins)
+  nm = np.asarray(wavelengths_nm, dtype=np.float64)
+  h = hashlib.blake2b(nm.tobytes(), digest_size=16).digest()
+  key = (ops.name, id(ops), h, None if range_nm is None else tuple(range_nm))
+  w = _wCache.get(key)
+  if w is not None:
+    _wCache.move_to_end(key)
+    return w
+  # Resample; the sensitivity is zero outside of the opsin table
+  res = np.array([np.interp(nm, ops.nm, c, left=0., right=0.)
+                  for c in ops.curves])
+  tw = trapezoid_weights(nm)
+  if range_nm is not None:
+    tw = tw *((nm >= range_nm[0]) & (nm <= range_nm[1]))
+  w = (res *tw).astype(np.float32)
+  w.setflags(write=False)
+  _wCache[key] = w
+  if len(_wCache) > CACHE_SIZE:
+    _wCache.popitem(last=False)
+  return w
+
+# ----------------------------------------------------------------------------
+def project(cube, wavelengths_nm, opsins=DEF_SET, range_nm=None, dark=None,
+            chunk=DEF_CHUNK, out=None):
+  """ Returns the opsin catches (... x n_opsins, `float32`) of `cube`
+      (... x n_channels, any dtype, e.g. a memory-mapped recording); `dark`
+      (n_channels) is subtracted, if given. The cube is processed in chunks
+      of `chunk` pixels
+  """
+  w = weights(wavelengths_nm, opsins, range_nm)
+  cube = np.asarray(cube)
+  nCh = cube.shape[-1]
+  if nCh != w.shape[1]:
+    raise ValueError("Cube has {0} channels, wavelength table {1}"
+                     .format(nCh, w.shape[1]))
+  flat = cube.reshape(-1, nCh)
+  if out is None:
+    out = np.empty((len(flat), w.shape[0]), dtype=np.float32)
+  else:
+    out = out.reshape(-1, w.shape[0])
+  wt = np.ascontiguousarray(w.T)
+  # Offset for the dark spectrum, the projection is linear
+  off = 0. if dark is None else np.asarray(dark, np.float32) @ wt
+  for i in range(0, len(flat), chunk):
+    np.matmul(flat[i:i +chunk].astype(np.float32), wt, out=out[i:i +chunk])
+    if dark is not None:
+      out[i:i +chunk] -= off
+  return out.reshape(cube.shape[:-1] +(w.shape[0],))
+
+def project_recording(rec, opsins=DEF_SET, range_nm=None, start=0, stop=None,
+                      chunk=DEF_CHUNK):
+  """ Returns the catches of frames `start` to `stop` of a `store.Recording`
+      (frames x pixels x n_opsins); frames are read chunk by chunk
+  """
+  stop = len(rec) if stop is None else min(stop, len(rec))
+  nOps = weights(rec.wavelengths_nm, opsins, range_nm).shape[0]
+  out = np.empty((max(0, stop -start), rec.n_pix, nOps), dtype=np.float32)
+  step = max(1, rec.chunk_len)
+  for i in range(start, stop, step):
+    j = min(stop, i +step)
+    project(rec.slice(i, j), rec.wavelengths_nm, opsins, range_nm,
+            chunk=chunk, out=out[i -start:j -start])
+  return out
+
+def to_rgb(catches, gain=None):
+  """ Returns an RGB image (... x 3, 0..1) of catches (... x n_opsins,
+      short to long wavelength): the three longest wavelength opsins go into
+      blue, green and red (with two opsins, into blue and green). Each
+      channel is divided by its maximum, or by `gain` (n_opsins)
+  """
+  c = np.asarray(catches, dtype=np.float32)
+  n = c.shape[-1]
+  if gain is None:
+    gain = c.reshape(-1, n).max(axis=0)
+  c = c /np.where(np.asarray(gain) > 0, gain, 1)
+  rgb = np.zeros(c.shape[:-1] +(3,), dtype=np.float32)
+  k = min(n, 3)
+  for i in range(k):
+    rgb[..., 2 -i] = c[..., n -k +i]
+  return np.clip(rgb, 0, 1)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,262 @@
+# ----------------------------------------------------------------------------
+# convert.py
+# Converts an archive of legacy recordings (`.pkl` of `loop_telescope`,
+# `.npy` of `run_spectrometer.save`, text files of `SpectImg`) in parallel
+# into `.npz` files of `ScanResult` (`uint16`, pixels in grid order)
+#
+#   python -m scanhost.convert <src_dir> <dst_dir> [-j N] [--flip auto]
+#
+# Finished files are recorded in `<dst_dir>/converted.jsonl`; a run that
+# was interrupted continues where it stopped.
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - pixel positions and paths via `grid`
+# ----------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scanhost import grid
+from scanhost.client import ScanResult
+from scanhost.link import PATH_LR_ZIGZAG
+
+CHECKPOINT    = "converted.jsonl"
+EXTENSIONS    = (".pkl", ".npy", ".sim", ".txt")
+
+# Path of legacy files w/o path type in their header; the notebooks always
+# scanned with `PATH_LR_ZIGZAG`
+LEGACY_PATH   = PATH_LR_ZIGZAG
+
+# How to deal with zigzag rows in files w/o pixel positions:
+#   "auto" - check which orientation of the odd rows gives the smoother image
+#   "yes"  - always reverse odd rows (data in scan order)
+#   "no"   - never reverse (data already in grid order)
+FLIP_MODES    = ("auto", "yes", "no")
+AUTO_MARGIN   = 0.9     # `auto` needs a clear winner, otherwise the default
+
+# ----------------------------------------------------------------------------
+def load_legacy(fname):
+  """ Returns `(header, cube, wavelengths_nm, pix)` of a legacy file; `cube`
+      has the shape as stored, `pix` is None if there are no positions
+  """
+  ext = os.path.splitext(fname)[1].lower()
+  if ext == ".pkl":
+    import pickle
+    with open(fname, "rb") as f:
+      d = pickle.load(f)
+    hdr = {k: v for k, v in d.items() if k not in ("SpectImg", "wavelengths_nm")}
+    return hdr, np.asarray(d["SpectImg"]), d.get("wavelengths_nm"), None
+  if ext == ".npy":
+    # `save` of `run_spectrometer.ipynb`: header, image and wavelengths in
+    # one file; or just the image
+    with open(fname, "rb") as f:
+      a = np.load(f, allow_pickle=True)
+      if a.dtype != object or a.ndim != 0:
+        return {}, a, None, None
+      hdr = a.item()
+      cube = np.load(f, allow_pickle=True)
+      try:
+        nm = np.load(f, allow_pickle=True)
+      except (EOFError, ValueError, OSError):
+        nm = None
+    return hdr, cube, nm, None
+  from scanhost import textlog
+  res = textlog.parse_file(fname)
+  if res is None:
+    raise ValueError("no header or pixels")
+  return res.header, res.cube, res.wavelengths_nm, res.pix
+
+def grid_size(hdr):
+  """ Returns the number of pixels `(nx, ny)` of a scan
+  """
+  dx, dy = hdr["size_xy"]
+  sx, sy = hdr["step_xy_deg"]
+  return int(dx //sx) +1, int(dy //sy) +1
+
+def odd_rows_reversed(img, margin=AUTO_MARGIN):
+  """ Checks if the odd rows of image `img` (rows x cols) are stored in scan
+      direction of a zigzag path (True), in grid order (False), or cannot
+      tell (None), by comparing neighbouring rows in both orientations
+  """
+  if img.shape[0] < 2:
+    return None
+  a = img[:-1]
+  b = img[1:]
+  dSame = np.abs(a -b).mean()
+  dFlip = np.abs(a -b[:, ::-1]).mean()
+  if dFlip < dSame *margin:
+    return True
+  if dSame < dFlip *margin:
+    return False
+  return None
+
+# ----------------------------------------------------------------------------
+def convert_file(src, dst, flip="auto", compressed=True):
+  """ Converts `src` into `dst` (`.npz`); returns a dict with what was done
+  """
+  hdr, cube, nm, pix = load_legacy(src)
+  hdr = dict(hdr)
+  if pix is None and not ("size_xy" in hdr and "step_xy_deg" in hdr):
+    # E.g. a bare `.npy` image; the pixels could not be placed
+    raise ValueError("Neither scan geometry (`size_xy`, `step_xy_deg`) nor "
+                     "pixel positions")
+  info = {"src": src, "dst": dst}
+  nSpect = cube.shape[-1]
+  flat = cube.reshape(-1, nSpect)
+  if flat.dtype != np.uint16:
+    flat = np.clip(np.rint(np.nan_to_num(flat)), 0, 0xFFFF).astype(np.uint16)
+  path = hdr.get("path", LEGACY_PATH)
+  order = "scan"
+  if "size_xy" in hdr and "step_xy_deg" in hdr:
+    nx, ny = grid_size(hdr)
+    if pix is not None and np.isfinite(pix[:, :2]).all():
+      # Positions known; sort into rows and columns, if they form the full
+      # grid
+      step = grid.path_step(path, hdr["size_xy"], hdr["step_xy_deg"])
+      gi = grid.index_from_xy(pix[:, :2], step)
+      if gi.shape == (ny, nx) and len(np.unique(gi.cell)) == len(flat):
+        flat = grid.to_grid(flat, gi).reshape(-1, nSpect)
+        pix = grid.to_grid(pix, gi).reshape(-1, pix.shape[1])
+        order = "grid"
+    elif path == PATH_LR_ZIGZAG and len(flat) == nx *ny:
+      g = flat.reshape(ny, nx, nSpect)
+      if flip == "auto":
+        isRev = odd_rows_reversed(g.sum(axis=2, dtype=np.float64))
+        # A flat array is in scan order, unless the image says otherwise
+        doFlip = (cube.ndim == 2) if isRev is None else isRev
+      else:
+        doFlip = flip == "yes"
+      if doFlip:
+        gi = grid.index_from_path(path, hdr["size_xy"], hdr["step_xy_deg"])
+        if gi.shape != (ny, nx) or len(np.unique(gi.cell)) != len(flat):
+          raise ValueError("Zigzag grid {0} does not match the {1}x{2} pixels"
+                           .format(gi.shape, ny, nx))
+        g = grid.to_grid(flat, gi)
+      flat = g.reshape(-1, nSpect)
+      info["flipped"] = bool(doFlip)
+      order = "grid"
+    elif len(flat) == nx *ny:
+      # Other paths (spiral) do not fill a rectangle; keep the scan order
+      # and add the positions, for `grid.to_grid`
+      pix = np.full((len(flat), 5), np.nan, dtype=np.float32)
+      pix[:, :2] = grid.scan_path(path, hdr["size_xy"], hdr["step_xy_deg"])
+  hdr.update({"n_pix": len(flat), "n_spect": nSpect, "path": path,
+              "order": order, "source": os.path.basename(src)})
+  res = ScanResult(hdr, None if nm is None else np.asarray(nm, np.float32))
+  res.cube[:] = flat
+  if pix is not None:
+    res.pix[:] = pix
+  res.received[:] = True
+  tmp = dst +".tmp.npz"
+  res.save(tmp, compressed)
+  os.replace(tmp, dst)
+  info.update(n_pix=len(flat), order=order)
+  return info
+
+def _job(args):
+  # Runs in a worker process
+  src, dst, flip, compressed = args
+  t0 = time.monotonic()
+  try:
+    info = convert_file(src, dst, flip, compressed)
+    info["ok"] = True
+  except Exception as e:
+    info = {"src": src, "dst": dst, "ok": False,
+            "error": "{0}: {1}".format(type(e).__name__, e)}
+  info["dt_s"] = round(time.monotonic() -t0, 3)
+  return info
+
+# ----------------------------------------------------------------------------
+def find_files(src_dir, extensions=EXTENSIONS):
+  """ Returns the legacy files below `src_dir` (sorted)
+  """
+  fnames = []
+  for dirpath, _, names in os.walk(src_dir):
+    for n in names:
+      if os.path.splitext(n)[1].lower() in extensions:
+        fnames.append(os.path.join(dirpath, n))
+  return sorted(fnames)
+
+def convert_dir(src_dir, dst_dir, n_jobs=None, flip="auto", compressed=True,
+                retry_failed=False, verbose=True):
+  """ Converts all legacy files below `src_dir` into `dst_dir` (same tree)
+      with `n_jobs` processes (default: number of cores); files recorded as
+      done in the checkpoint are skipped. Returns `(n_ok, n_failed)`
+  """
+  if flip not in FLIP_MODES:
+    raise ValueError("`flip` must be one of {0}".format(FLIP_MODES))
+  os.makedirs(dst_dir, exist_ok=True)
+  fCkpt = os.path.join(dst_dir, CHECKPOINT)
+  done = {}
+  isCut = False
+  if os.path.exists(fCkpt):
+    with open(fCkpt) as f:
+      for ln in f:
+        isCut = not ln.endswith("\n")
+        try:
+          d = json.loads(ln)
+        except ValueError:
+          # Last line of an interrupted run
+          continue
+        done[d["src"]] = d["ok"]
+  jobs = []
+  for src in find_files(src_dir):
+    rel = os.path.relpath(src, src_dir)
+    if rel in done and (done[rel] or not retry_failed):
+      continue
+    dst = os.path.join(dst_dir, os.path.splitext(rel)[0] +".npz")
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    jobs.append((src, dst, flip, compressed))
+  if verbose:
+    print("{0} file(s) to convert, {1} done before".format(len(jobs), len(done)))
+  nOk = nErr = 0
+  with open(fCkpt, "a") as fc, ProcessPoolExecutor(n_jobs) as ex:
+    if isCut:
+      # New records start on a line of their own
+      fc.write("\n")
+    futures = [ex.submit(_job, j) for j in jobs]
+    for fut in as_completed(futures):
+      info = fut.result()
+      info["src"] = os.path.relpath(info["src"], src_dir)
+      info["dst"] = os.path.relpath(info["dst"], dst_dir)
+      fc.write(json.dumps(info) +"\n")
+      fc.flush()
+      if info["ok"]:
+        nOk += 1
+      else:
+        nErr += 1
+        if verbose:
+          print("\nERROR: `{0}`: {1}".format(info["src"], info["error"]))
+      if verbose:
+        print("\r{0}/{1}".format(nOk +nErr, len(jobs)), end="", flush=True)
+  if verbose and jobs:
+    print("")
+  return nOk, nErr
+
+# ----------------------------------------------------------------------------
+def main(argv=None):
+  ap = argparse.ArgumentParser(description="Converts legacy recordings into "
+                               "`.npz` files with `uint16` cubes in grid order")
+  ap.add_argument("src", help="archive directory")
+  ap.add_argument("dst", help="output directory")
+  ap.add_argument("-j", "--jobs", type=int, default=None,
+                  help="number of processes (default: all cores)")
+  ap.add_argument("--flip", choices=FLIP_MODES, default="auto",
+                  help="reverse odd rows of zigzag scans w/o positions")
+  ap.add_argument("--uncompressed", action="store_true")
+  ap.add_argument("--retry-failed", action="store_true")
+  args = ap.parse_args(argv)
+  nOk, nErr = convert_dir(args.src, args.dst, args.jobs, args.flip,
+                          not args.uncompressed, args.retry_failed)
+  print("{0} converted, {1} failed".format(nOk, nErr))
+  return 1 if nErr else 0
+
+if __name__ == "__main__":
+  sys.exit(main())
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,163 @@
+# ----------------------------------------------------------------------------
+# grid.py
+# Reassembly of the pixels of a scan (in scan order) into an image cube
+# (row x column x channel), for any scan path
+#
+# The cell of each pixel is computed once per scan geometry, from the pixel
+# positions or from the path type and parameters (like `generateScanPath`
+# on the device), and cached; a cube is then assembled with a single
+# fancy-indexing operation. Row 0 is the top (+y), column 0 is +x, as in
+# `PATH_LR_ZIGZAG`.
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - zigzag cells from the scan order; `path_step`
+# ----------------------------------------------------------------------------
+import hashlib
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+import numpy as np
+from scanhost.link import PATH_R_SPIRAL, PATH_LR_ZIGZAG
+
+CACHE_SIZE    = 32
+
+# `shape` is `(n_rows, n_cols)`, `cell` the flat cell index of each pixel
+GridIndex     = namedtuple("GridIndex", ("shape", "cell"))
+
+_xyCache      = OrderedDict()
+
+# ----------------------------------------------------------------------------
+def _shape(size_xy, step_xy):
+  # Number of pixels in x and y
+  return int(size_xy[0] //step_xy[0]) +1, int(size_xy[1] //step_xy[1]) +1
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _scanPath(path, size_xy, step_xy):
+  dx, dy = size_xy
+  nx, ny = _shape(size_xy, step_xy)
+  n = nx *ny
+  if path == PATH_LR_ZIGZAG:
+    xs = np.linspace(dx //2, -(dx //2), nx)
+    ys = np.linspace(dy //2, -(dy //2), ny)
+    x = np.tile(xs, ny).reshape(ny, nx)
+    x[1::2] *= -1
+    xy = np.column_stack((x.ravel(), np.repeat(ys, nx)))
+  elif path == PATH_R_SPIRAL:
+    # Legs of length 1, 1, 2, 2, 3, 3, ... alternating in x and y, with the
+    # direction reversed after each pair
+    xy = np.zeros((n, 2))
+    i = 1
+    k = 0
+    while i < n:
+      m = min(k //2 +1, n -i)
+      pol = 1 if (k //2) % 2 == 0 else -1
+      ax = k % 2
+      xy[i:i +m] = xy[i -1]
+      xy[i:i +m, ax] += pol *step_xy[ax] *np.arange(1, m +1)
+      i += m
+      k += 1
+  else:
+    raise ValueError("Unknown scan path type {0}".format(path))
+  xy.setflags(write=False)
+  return xy
+
+def scan_path(path, size_xy, step_xy):
+  """ Returns the positions (n_pix x 2, [°]) of the pixels of a scan with
+      path type `path` in scan order, as generated on the device
+  """
+  return _scanPath(int(path), tuple(size_xy), tuple(step_xy))
+
+def path_step(path, size_xy, step_xy):
+  """ Returns the spacing (x, y [°]) of the pixel positions of a scan with
+      path type `path`; the positions of `PATH_LR_ZIGZAG` span the size
+      evenly, hence they differ from `step_xy` if the size is not a
+      multiple of the step
+  """
+  if int(path) != PATH_LR_ZIGZAG:
+    return tuple(step_xy)
+  res = []
+  for d, s, n in zip(size_xy, step_xy, _shape(size_xy, step_xy)):
+    w = 2 *(d //2)
+    res.append(w /(n -1) if n > 1 and w > 0 else s)
+  return tuple(res)
+
+def index_from_xy(xy, step_xy):
+  """ Returns the `GridIndex` of pixels at positions `xy` (n_pix x 2, [°],
+      e.g. of masked or adaptive scans); positions are snapped to a grid
+      with spacing `step_xy` spanning all (finite) positions
+  """
+  xy = np.asarray(xy, dtype=np.float64)
+  h = hashlib.blake2b(xy.tobytes(), digest_size=16)
+  key = (h.digest(), xy.shape, tuple(step_xy))
+  gi = _xyCache.get(key)
+  if gi is not None:
+    _xyCache.move_to_end(key)
+    return gi
+  ok = np.isfinite(xy).all(axis=1)
+  if not ok.any():
+    raise ValueError("No valid pixel positions")
+  x0, y0 = xy[ok].max(axis=0)
+  col = np.rint((x0 -xy[:, 0]) /step_xy[0])
+  row = np.rint((y0 -xy[:, 1]) /step_xy[1])
+  nCols = int(col[ok].max()) +1
+  nRows = int(row[ok].max()) +1
+  cell = np.where(ok, row *nCols +col, -1).astype(np.intp)
+  cell.setflags(write=False)
+  gi = GridIndex((nRows, nCols), cell)
+  _xyCache[key] = gi
+  if len(_xyCache) > CACHE_SIZE:
+    _xyCache.popitem(last=False)
+  return gi
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _zigzagIndex(nx, ny):
+  # Row by row from +x to -x, odd rows reversed
+  cell = np.arange(nx *ny).reshape(ny, nx)
+  cell[1::2] = cell[1::2, ::-1]
+  cell = cell.ravel()
+  cell.setflags(write=False)
+  return GridIndex((ny, nx), cell)
+
+def index_from_path(path, size_xy, step_xy):
+  """ Returns the `GridIndex` of a scan with path type `path`
+  """
+  if int(path) == PATH_LR_ZIGZAG:
+    return _zigzagIndex(*_shape(size_xy, step_xy))
+  return index_from_xy(scan_path(path, size_xy, step_xy), step_xy)
+
+def index_for(header, xy=None):
+  """ Returns the `GridIndex` of a scan with `header` (`size_xy`,
+      `step_xy_deg` and `path`, which defaults to `PATH_LR_ZIGZAG`, as used
+      by the old notebooks); the pixel positions `xy` are used instead of
+      the path, if given and valid
+  """
+  step = header["step_xy_deg"]
+  path = header.get("path", PATH_LR_ZIGZAG)
+  if xy is not None and np.isfinite(xy).all():
+    return index_from_xy(xy, path_step(path, header["size_xy"], step))
+  return index_from_path(path, header["size_xy"], step)
+
+# ----------------------------------------------------------------------------
+def to_grid(flat, gi, mask=None, fill=0):
+  """ Places the pixels of `flat` (pixels in scan order x ...) into cube
+      (rows x cols x ...) according to `GridIndex` `gi`; `flat` may hold
+      only the first pixels of a scan (e.g. a running one). Pixels where
+      `mask` is False are left out, cells w/o pixel are `fill`; if a cell
+      has several pixels, the last one counts
+  """
+  flat = np.asarray(flat)
+  n = len(flat)
+  cell = gi.cell[:n]
+  ok = cell >= 0
+  if mask is not None:
+    ok = ok & np.asarray(mask[:n], dtype=bool)
+  nCells = gi.shape[0] *gi.shape[1]
+  out = np.full((nCells,) +flat.shape[1:], fill, dtype=flat.dtype)
+  if ok.all():
+    out[cell] = flat
+  else:
+    out[cell[ok]] = flat[ok]
+  return out.reshape(gi.shape +flat.shape[1:])
+
+# ----------------------------------------------------------------------------
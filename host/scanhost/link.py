@@ -0,0 +1,355 @@
+# ----------------------------------------------------------------------------
+# link.py
+# Host-side client for the binary command server of the scanner (`main.py`,
+# frame format see `code/protocol.py`)
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - video mode
+# ----------------------------------------------------------------------------
+import time
+import struct
+import zlib
+from collections import namedtuple
+import numpy as np
+
+# Opcodes, status flags and error codes (as in `code/protocol.py`)
+OP_STATUS        = 0x01
+OP_SETUP_SCAN    = 0x02
+OP_SCAN_ALL      = 0x03
+OP_READ_SPECTRUM = 0x04
+OP_MOVE          = 0x05
+OP_WAVELENGTHS   = 0x06
+OP_VIDEO_START   = 0x07
+OP_VIDEO_STOP    = 0x08
+OP_QUIT          = 0x0F
+OP_PIXEL         = 0x10
+OP_STREAM_HDR    = 0x11
+OP_STREAM_PIX    = 0x12
+OP_STREAM_END    = 0x13
+OP_FRAME         = 0x14
+OP_ERROR         = 0x7F
+OP_REPLY         = 0x80
+
+ST_SCANNER       = 0x01
+ST_SCAN_READY    = 0x02
+ST_COMPASS       = 0x04
+ST_VIDEO         = 0x08
+
+ERR_CRC          = 1
+ERR_UNKNOWN_OP   = 2
+ERR_BAD_PAYLOAD  = 3
+ERR_NOT_READY    = 4
+ERR_EXCEPTION    = 5
+
+FMT_PIXEL        = "<I5f"
+PIXEL_HDR_LEN    = struct.calcsize(FMT_PIXEL)
+FMT_FRAME        = "<III"
+FRAME_HDR_LEN    = struct.calcsize(FMT_FRAME)
+
+# Scan path types (as in `code/scanner.py`)
+PATH_R_SPIRAL    = 0
+PATH_LR_ZIGZAG   = 1
+
+DEF_BAUD         = 921600
+DEF_TIMEOUT_S    = 5.0
+
+# ----------------------------------------------------------------------------
+class LinkError(Exception):
+  """Raised if the device answers with an error frame or not at all."""
+
+  def __init__(self, msg, code=0):
+    super().__init__(msg)
+    self.code = code
+
+Frame = namedtuple("Frame", ["seq", "t_us", "n_dropped", "spectrum"])
+
+# ----------------------------------------------------------------------------
+class VideoStats(object):
+  """Frame counters of a video run; `fps` is estimated from the device time
+     stamps of the received frames."""
+
+  def __init__(self):
+    self.n_received = 0
+    self.n_dropped = 0
+    self.n_frames = 0
+    self.n_sent = 0
+    self.dt_ms = 0
+    self._t0 = None
+    self._t1 = None
+    self._seq0 = 0
+    self._seq1 = 0
+
+  def add(self, f):
+    if self._t0 is None:
+      self._t0, self._seq0 = f.t_us, f.seq
+    self._t1, self._seq1 = f.t_us, f.seq
+    self.n_received += 1
+    self.n_dropped = f.n_dropped
+
+  @property
+  def fps(self):
+    """ Acquisition frame rate (incl. frames dropped on the device)
+    """
+    if self._t0 is None or self._seq1 == self._seq0:
+      return 0.
+    # Device time stamps are `ticks_us`, which wrap at 2^30
+    dt = (self._t1 -self._t0) & 0x3FFFFFFF
+    return (self._seq1 -self._seq0) /dt *1e6 if dt > 0 else 0.
+
+  @property
+  def n_lost(self):
+    """ Frames acquired but not received (dropped on device or link)
+    """
+    return (self._seq1 +1 -self.n_received) if self._t0 is not None else 0
+
+# ----------------------------------------------------------------------------
+def cobs_encode(data):
+  """ COBS-encodes `data` (w/o delimiter)
+  """
+  out = bytearray()
+  block = bytearray()
+  for b in data:
+    if b == 0:
+      out.append(len(block) +1)
+      out += block
+      block.clear()
+    else:
+      block.append(b)
+      if len(block) == 254:
+        out.append(255)
+        out += block
+        block.clear()
+  out.append(len(block) +1)
+  out += block
+  return bytes(out)
+
+def cobs_decode(data):
+  """ Decodes the COBS-encoded `data` (w/o delimiter); returns None if
+      `data` is malformed
+  """
+  out = bytearray()
+  i = 0
+  n = len(data)
+  while i < n:
+    code = data[i]
+    i += 1
+    if code == 0 or i +code -1 > n:
+      return None
+    out += data[i:i +code -1]
+    i += code -1
+    if code < 0xFF and i < n:
+      out.append(0)
+  return bytes(out)
+
+def make_frame(op, seq, data=b""):
+  """ Returns the complete frame, including both delimiters
+  """
+  msg = bytes((op, seq)) +bytes(data)
+  msg += struct.pack("<I", zlib.crc32(msg) & 0xFFFFFFFF)
+  return b"\x00" +cobs_encode(msg) +b"\x00"
+
+def parse_frame(raw):
+  """ Returns `(op, seq, data)` for the COBS-encoded frame `raw` (w/o
+      delimiters), or None if it is malformed or the CRC does not match
+  """
+  msg = cobs_decode(raw)
+  if msg is None or len(msg) < 6:
+    return None
+  crc, = struct.unpack_from("<I", msg, len(msg) -4)
+  if zlib.crc32(msg[:-4]) & 0xFFFFFFFF != crc:
+    return None
+  return msg[0], msg[1], msg[2:-4]
+
+# ----------------------------------------------------------------------------
+class FrameReader(object):
+  """Splits a byte stream into frames; anything between delimiters that is
+     not a valid frame (e.g. text printed by the device) is counted and
+     skipped."""
+
+  def __init__(self):
+    self._buf = bytearray()
+    self.n_skipped = 0
+
+  def feed(self, data):
+    """ Adds `data` and returns the list of complete frames `(op, seq, data)`
+    """
+    self._buf += data
+    frames = []
+    while True:
+      i = self._buf.find(b"\x00")
+      if i < 0:
+        break
+      raw = bytes(self._buf[:i])
+      del self._buf[:i +1]
+      if not raw:
+        continue
+      f = parse_frame(raw)
+      if f is None:
+        self.n_skipped += 1
+      else:
+        frames.append(f)
+    return frames
+
+# ----------------------------------------------------------------------------
+class ScanLink(object):
+  """Client for the command server; `port` is any object with `read(n)` and
+     `write(b)` (e.g. a `serial.Serial` with a short timeout) or a serial
+     device name, which is then opened with `baud`."""
+
+  def __init__(self, port, baud=DEF_BAUD, timeout_s=DEF_TIMEOUT_S):
+    if isinstance(port, str):
+      import serial
+      port = serial.Serial(port, baud, timeout=0.05)
+    self._port = port
+    self._reader = FrameReader()
+    self._pending = []
+    self._seq = 0
+    self.timeout_s = timeout_s
+    self.n_spect = 0
+
+  def close(self):
+    if hasattr(self._port, "close"):
+      self._port.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def status(self):
+    """ Returns a dict with the server version, status flags, index of the
+        next pixel, number of pixels and free device memory
+    """
+    d = self.request(OP_STATUS)
+    ver, flags, i_pix, n_pix, free = struct.unpack("<BBIII", d)
+    return {"version": ver, "flags": flags, "i_pix": i_pix, "n_pix": n_pix,
+            "mem_free": free}
+
+  def setup_scan(self, size_xy, step_xy_deg, int_s, path=PATH_R_SPIRAL):
+    """ Sets up a scan (see `Scanner.setupScan`); returns the number of
+        pixels
+    """
+    d = struct.pack("<HHfffB", size_xy[0], size_xy[1],
+                    step_xy_deg[0], step_xy_deg[1], int_s, path)
+    r = struct.unpack("<HHfffBHH", self.request(OP_SETUP_SCAN, d))
+    self.n_spect = r[7]
+    return r[6]
+
+  def scan_all(self):
+    """ Runs the scan that was set up and yields the pixels as tuples
+        `(i_pix, x, y, head, pitch, roll, spectrum)`
+    """
+    seq = self._send(OP_SCAN_ALL)
+    while True:
+      op, data = self._receive(seq)
+      if op == OP_PIXEL:
+        hdr = struct.unpack_from(FMT_PIXEL, data)
+        spect = np.frombuffer(data, dtype="<u2", offset=PIXEL_HDR_LEN)
+        yield hdr +(spect,)
+      elif op == OP_SCAN_ALL | OP_REPLY:
+        return
+
+  def read_spectrum(self, int_s=0):
+    """ Reads a single spectrum (with integration time `int_s`, if > 0) and
+        returns it as `uint16` array
+    """
+    d = self.request(OP_READ_SPECTRUM, struct.pack("<f", int_s))
+    return np.frombuffer(d, dtype="<u2").copy()
+
+  def wavelengths(self):
+    """ Returns the wavelengths of the spectrometer channels in [nm]
+    """
+    return np.frombuffer(self.request(OP_WAVELENGTHS), dtype="<f4").copy()
+
+  def move(self, pan, tilt, dt_ms=1000):
+    """ Moves the scanner head to `pan`, `tilt` [°] within `dt_ms`
+    """
+    self.request(OP_MOVE, struct.pack("<ffH", pan, tilt, dt_ms))
+
+  def video(self, int_s=0, n_frames=0, n_slots=4, stats=None):
+    """ Starts the free-running acquisition and yields `Frame`s with the
+        spectrum as `uint16` array, until `n_frames` (if > 0) were taken or
+        the generator is closed, which stops the acquisition; frame counters
+        are collected in `stats` (`VideoStats`), if given
+    """
+    d = self.request(OP_VIDEO_START, struct.pack("<fIB", int_s, n_frames,
+                                                 n_slots))
+    self.n_spect, = struct.unpack("<H", d)
+    seq = self._seq
+    isStopped = False
+    try:
+      while True:
+        op, data = self._receive(seq)
+        if op == OP_FRAME:
+          s, t_us, nDrop = struct.unpack_from(FMT_FRAME, data)
+          spect = np.frombuffer(data, dtype="<u2", offset=FRAME_HDR_LEN)
+          f = Frame(s, t_us, nDrop, spect)
+          if stats is not None:
+            stats.add(f)
+          yield f
+        elif op == OP_VIDEO_STOP | OP_REPLY:
+          isStopped = True
+          self._onVideoStop(data, stats)
+          return
+    finally:
+      if not isStopped:
+        try:
+          self._onVideoStop(self.request(OP_VIDEO_STOP), stats)
+        except LinkError as e:
+          if e.code != ERR_NOT_READY:
+            raise
+
+  def quit(self):
+    """ Stops the server on the device
+    """
+    self.request(OP_QUIT)
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def request(self, op, data=b""):
+    """ Sends request `op` with payload `data` and returns the payload of
+        the reply
+    """
+    seq = self._send(op, data)
+    while True:
+      rop, d = self._receive(seq)
+      if rop == op | OP_REPLY:
+        return d
+
+  def _onVideoStop(self, data, stats):
+    if stats is not None:
+      n = struct.unpack("<IIII", data)
+      stats.n_frames, stats.n_dropped, stats.n_sent, stats.dt_ms = n
+
+  def _send(self, op, data=b""):
+    self._seq = (self._seq +1) & 0xFF
+    self._port.write(make_frame(op, self._seq, data))
+    return self._seq
+
+  def _receive(self, seq):
+    """ Returns the next frame `(op, data)` for request `seq`; frames of
+        other (earlier) requests are dropped
+    """
+    deadline = time.monotonic() +self.timeout_s
+    while True:
+      while self._pending:
+        op, s, d = self._pending.pop(0)
+        if s != seq:
+          continue
+        if op == OP_ERROR:
+          code = d[0] if d else 0
+          raise LinkError("Device error {0}: {1}"
+                          .format(code, bytes(d[1:]).decode(errors="replace")),
+                          code)
+        return op, d
+      if time.monotonic() > deadline:
+        raise LinkError("Timeout waiting for reply to request {0}".format(seq))
+      data = self._port.read(4096)
+      if data:
+        self._pending += self._reader.feed(data)
+        deadline = time.monotonic() +self.timeout_s
+
+# ----------------------------------------------------------------------------
@@ -70,7 +70,7 @@ Or:
 import sys
 import time
 import os
-import ast
+import contextlib
 
 try:
     stdout = sys.stdout.buffer
@@ -202,7 +202,15 @@ class ProcessToSerial:
         # res = self.sel.select(0)
         res = self.poll.poll(0)
         if res:
-            return 1
+            # Report how much is actually buffered in the pipe, so that the
+            # caller can read it all in one go
+            import array
+            import fcntl
+            import termios
+
+            n = array.array("i", [0])
+            fcntl.ioctl(self.subp.stdout.fileno(), termios.FIONREAD, n)
+            return max(n[0], 1)
         return 0
 
 
@@ -251,10 +259,26 @@ class ProcessPtyToTerminal:
         return self.ser.inWaiting()
 
 
+class _FrameError(Exception):
+    # A frame of `fs_get` failed its check
+    pass
+
+
 class Pyboard:
     def __init__(self, device, baudrate=115200, user="micro", password="python", wait=0):
         self.use_raw_paste = True
-        if device.startswith("exec:"):
+        # In a persistent session, a command that fits into the raw-paste
+        # window is sent in one write, without waiting for the prompt and the
+        # raw-paste header first; these are checked afterwards
+        self.persistent_session = False
+        # Window size of raw-paste mode, once known
+        self.paste_window = 0
+        # Data received from the device but not yet consumed
+        self.rx_buf = bytearray()
+        if not isinstance(device, str):
+            # An object with the read/write/inWaiting interface of a serial port
+            self.serial = device
+        elif device.startswith("exec:"):
             self.serial = ProcessToSerial(device[len("exec:") :])
         elif device.startswith("execpty:"):
             self.serial = ProcessPtyToTerminal(device[len("qemupty:") :])
@@ -288,36 +312,97 @@ class Pyboard:
     def close(self):
         self.serial.close()
 
+    def read(self, size):
+        # Read exactly `size` bytes, taking already received data first
+        if not self.rx_buf:
+            return self.serial.read(size)
+        data = bytes(self.rx_buf[:size])
+        del self.rx_buf[:size]
+        if len(data) < size:
+            data += self.serial.read(size - len(data))
+        return data
+
+    def in_waiting(self):
+        return len(self.rx_buf) + self.serial.inWaiting()
+
     def read_until(self, min_num_bytes, ending, timeout=10, data_consumer=None):
         # if data_consumer is used then data is not accumulated and the ending must be 1 byte long
+        # `ending` can also be a tuple of endings, then reading stops at the first one found
+        if isinstance(ending, tuple):
+            assert data_consumer is None
+            return self.read_until_any(min_num_bytes, ending, timeout)
         assert data_consumer is None or len(ending) == 1
 
-        data = self.serial.read(min_num_bytes)
-        if data_consumer:
-            data_consumer(data)
-        timeout_count = 0
+        # Everything the device has sent is read in bulk into `rx_buf`, which
+        # is searched for `ending` incrementally; data after the ending stays
+        # in `rx_buf` for the next read.
+        buf = self.rx_buf
+        if len(buf) < min_num_bytes:
+            buf.extend(self.serial.read(min_num_bytes - len(buf)))
+        start = max(0, min_num_bytes - len(ending))
+        deadline = None if timeout is None else time.monotonic() + timeout
         while True:
-            if data.endswith(ending):
-                break
-            elif self.serial.inWaiting() > 0:
-                new_data = self.serial.read(1)
+            i = buf.find(ending, start)
+            if i >= 0:
+                n = i + len(ending)
+                data = bytes(buf[:n])
+                del buf[:n]
                 if data_consumer:
-                    data_consumer(new_data)
-                    data = new_data
-                else:
-                    data = data + new_data
-                timeout_count = 0
+                    data_consumer(data)
+                    data = data[-len(ending) :]
+                return data
+            if data_consumer and buf:
+                data_consumer(bytes(buf))
+                del buf[:]
+                start = 0
             else:
-                timeout_count += 1
-                if timeout is not None and timeout_count >= 100 * timeout:
-                    break
-                time.sleep(0.01)
-        return data
+                start = max(start, len(buf) - len(ending) + 1)
+            n = self.serial.inWaiting()
+            if n > 0:
+                buf.extend(self.serial.read(n))
+                if deadline is not None:
+                    deadline = time.monotonic() + timeout
+            elif deadline is not None and time.monotonic() >= deadline:
+                data = bytes(buf)
+                del buf[:]
+                return data
+            else:
+                time.sleep(0.001)
+
+    def read_until_any(self, min_num_bytes, endings, timeout=10):
+        buf = self.rx_buf
+        if len(buf) < min_num_bytes:
+            buf.extend(self.serial.read(min_num_bytes - len(buf)))
+        start = max(0, min_num_bytes - max(len(e) for e in endings))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            n = -1
+            for e in endings:
+                i = buf.find(e, start)
+                if i >= 0 and (n < 0 or i + len(e) < n):
+                    n = i + len(e)
+            if n >= 0:
+                data = bytes(buf[:n])
+                del buf[:n]
+                return data
+            start = max(start, len(buf) - max(len(e) for e in endings) + 1)
+            n = self.serial.inWaiting()
+            if n > 0:
+                buf.extend(self.serial.read(n))
+                if deadline is not None:
+                    deadline = time.monotonic() + timeout
+            elif deadline is not None and time.monotonic() >= deadline:
+                data = bytes(buf)
+                del buf[:]
+                return data
+            else:
+                time.sleep(0.001)
 
     def enter_raw_repl(self):
         self.serial.write(b"\r\x03\x03")  # ctrl-C twice: interrupt any running program
 
         # flush input (without relying on serial.flushInput())
+        del self.rx_buf[:]
         n = self.serial.inWaiting()
         while n > 0:
             self.serial.read(n)
@@ -362,15 +447,16 @@ class Pyboard:
 
     def raw_paste_write(self, command_bytes):
         # Read initial header, with window size.
-        data = self.serial.read(2)
+        data = self.read(2)
         window_size = data[0] | data[1] << 8
         window_remain = window_size
+        self.paste_window = window_size
 
         # Write out the command_bytes data.
         i = 0
         while i < len(command_bytes):
-            while window_remain == 0 or self.serial.inWaiting():
-                data = self.serial.read(1)
+            while window_remain == 0 or self.in_waiting():
+                data = self.read(1)
                 if data == b"\x01":
                     # Device indicated that a new window of data can be sent.
                     window_remain += window_size
@@ -401,6 +487,13 @@ class Pyboard:
         else:
             command_bytes = bytes(command, encoding="utf8")
 
+        if (
+            self.persistent_session
+            and self.use_raw_paste
+            and len(command_bytes) < self.paste_window
+        ):
+            return self._exec_queued(command_bytes)
+
         # check we have a prompt
         data = self.read_until(1, b">")
         if not data.endswith(b">"):
@@ -409,7 +502,7 @@ class Pyboard:
         if self.use_raw_paste:
             # Try to enter raw-paste mode.
             self.serial.write(b"\x05A\x01")
-            data = self.serial.read(2)
+            data = self.read(2)
             if data == b"R\x00":
                 # Device understood raw-paste command but doesn't support it.
                 pass
@@ -432,14 +525,67 @@ class Pyboard:
         self.serial.write(b"\x04")
 
         # check if we could exec command
-        data = self.serial.read(2)
+        data = self.read(2)
         if data != b"OK":
             raise PyboardError("could not exec command (response: %r)" % data)
 
+    def _exec_queued(self, command_bytes):
+        # Request raw-paste mode, send the command and end of data at once;
+        # the board reads them when it is back at the prompt. The command is
+        # smaller than the window, hence needs no flow control
+        self.serial.write(b"\x05A\x01" + command_bytes + b"\x04")
+        data = self.read_until(1, b">")
+        if not data.endswith(b">"):
+            raise PyboardError("could not enter raw repl")
+        data = self.read(4)
+        if data[:2] != b"R\x01":
+            raise PyboardError("raw-paste not accepted in session: %r" % data)
+        data = self.read_until(1, b"\x04")
+        if not data.endswith(b"\x04"):
+            raise PyboardError("could not complete raw paste: {}".format(data))
+
     def exec_raw(self, command, timeout=10, data_consumer=None):
         self.exec_raw_no_follow(command)
         return self.follow(timeout, data_consumer)
 
+    def exec_stream(self, statements, timeout=10):
+        # Send all statements as one payload and yield (index, output) for
+        # each statement as soon as its output is complete. A separator byte
+        # is printed after each statement; iterate to the end, otherwise the
+        # remaining output is left unread. An exception on the board raises
+        # PyboardError with the index of the failing statement.
+        sep = "print('\\x1e',end='')"
+        payload = "\n".join("%s\n%s" % (st, sep) for st in statements)
+        self.exec_raw_no_follow(payload)
+        for index in range(len(statements)):
+            data = self.read_until(1, (b"\x1e", b"\x04"), timeout=timeout)
+            if data.endswith(b"\x1e"):
+                yield index, data[:-1]
+            elif data.endswith(b"\x04"):
+                data_err = self.read_until(1, b"\x04", timeout=timeout)
+                raise PyboardError("exception", data[:-1], data_err[:-1], index)
+            else:
+                raise PyboardError("timeout waiting for output of statement %u" % index)
+        ret, ret_err = self.follow(timeout)
+        if ret_err:
+            raise PyboardError("exception", ret, ret_err, len(statements))
+
+    def exec_batch(self, statements, timeout=10):
+        # Like exec_ for each of the statements, but with a single round-trip;
+        # returns a list with the output of each statement
+        return [out for _, out in self.exec_stream(statements, timeout)]
+
+    @contextlib.contextmanager
+    def session(self):
+        # Persistent session for the commands of the `with` block (see
+        # `persistent_session`)
+        prev = self.persistent_session
+        self.persistent_session = True
+        try:
+            yield self
+        finally:
+            self.persistent_session = prev
+
     def eval(self, expression):
         ret = self.exec_("print({})".format(expression))
         ret = ret.strip()
@@ -475,36 +621,176 @@ class Pyboard:
         )
         self.exec_(cmd, data_consumer=stdout_write_bytes)
 
-    def fs_get(self, src, dest, chunk_size=256):
-        self.exec_("f=open('%s','rb')\nr=f.read" % src)
+    def interrupt(self, timeout=2):
+        # Stop a running program (ctrl-C) and wait for the raw REPL prompt
+        self.serial.write(b"\r\x03")
+        data = self.read_until(1, b"\x04>", timeout=timeout)
+        del self.rx_buf[:]
+        if data.endswith(b"\x04>"):
+            # Keep the prompt for the next command
+            self.rx_buf += b">"
+
+    def fs_get(self, src, dest, chunk_size=4096, retries=3):
+        # The board streams the file as frames of a "<length> <crc32>" line
+        # followed by a base64 line, without a round-trip per chunk. A frame
+        # that fails the check ends the transfer, which then resumes at the
+        # last good offset.
+        import binascii
+        import zlib
+
+        offset = 0
         with open(dest, "wb") as f:
-            while True:
-                data = bytearray()
-                self.exec_("print(r(%u))" % chunk_size, data_consumer=lambda d: data.extend(d))
-                assert data.endswith(b"\r\n\x04")
+            for attempt in range(retries + 1):
+                state = {"rx": bytearray(), "hdr": None, "error": None}
+
+                def consume(d):
+                    rx = state["rx"]
+                    rx.extend(d)
+                    while True:
+                        i = rx.find(b"\n")
+                        if i < 0:
+                            break
+                        ln = bytes(rx[:i]).strip()
+                        del rx[: i + 1]
+                        if not ln or ln == b"\x04":
+                            continue
+                        if state["hdr"] is None:
+                            state["hdr"] = ln
+                            continue
+                        try:
+                            n, crc = (int(x) for x in state["hdr"].split())
+                            data = binascii.a2b_base64(ln)
+                        except (ValueError, binascii.Error) as e:
+                            raise _FrameError(str(e))
+                        state["hdr"] = None
+                        if len(data) != n or (
+                            crc != -1 and zlib.crc32(data) != crc & 0xFFFFFFFF
+                        ):
+                            raise _FrameError("corrupted chunk at offset %u" % f.tell())
+                        f.write(data)
+
+                cmd = (
+                    "import ubinascii as b,sys\n"
+                    "c=getattr(b,'crc32',None)\n"
+                    "f=open('%s','rb')\nf.seek(%u)\n"
+                    "d=bytearray(%u)\nm=memoryview(d)\n"
+                    "try:\n"
+                    " while 1:\n"
+                    "  n=f.readinto(d)\n"
+                    "  if not n:break\n"
+                    "  print(n,c(m[:n]) if c else -1)\n"
+                    "  print(b.b2a_base64(m[:n]).decode(),end='')\n"
+                    "finally:\n"
+                    " f.close()" % (src, offset, chunk_size)
+                )
                 try:
-                    data = ast.literal_eval(str(data[:-3], "ascii"))
-                    if not isinstance(data, bytes):
-                        raise ValueError("Not bytes")
-                except (UnicodeError, ValueError) as e:
-                    raise PyboardError("fs_get: Could not interpret received data: %s" % str(e))
-                if not data:
-                    break
-                f.write(data)
-        self.exec_("f.close()")
+                    self.exec_(cmd, data_consumer=consume)
+                except _FrameError as er:
+                    # Stop the board right away and drain what it has sent
+                    self.interrupt()
+                    state["error"] = str(er)
+                except PyboardError as er:
+                    if len(er.args) > 1:
+                        # Error raised on the board (e.g. file not found)
+                        raise
+                    self.interrupt()
+                    state["error"] = str(er)
+                if state["error"] is None:
+                    return
+                offset = f.tell()
+        raise PyboardError("fs_get: %s" % state["error"])
 
-    def fs_put(self, src, dest, chunk_size=256):
-        self.exec_("f=open('%s','wb')\nw=f.write" % dest)
+    def fs_put(self, src, dest, chunk_size=1024, window=4, retries=3):
+        # The board reads frames of "<offset> <crc32> <base64>" lines from
+        # stdin and acknowledges each with "A <next offset>", or "N <offset>"
+        # to request a resend. Up to `window` chunks are sent ahead of their
+        # acknowledgement (go-back-N).
+        import binascii
+        import zlib
+
+        cmd = (
+            "import ubinascii as b,sys\n"
+            "c=getattr(b,'crc32',None)\n"
+            "f=open('%s','%s')\np=%u\n"
+            "try:\n"
+            " while 1:\n"
+            "  l=sys.stdin.readline()\n"
+            "  if l[0]=='E':break\n"
+            "  try:\n"
+            "   o,k,d=l.split()\n"
+            "   if int(o)!=p:continue\n"
+            "   d=b.a2b_base64(d)\n"
+            "   if c and c(d)&0xffffffff!=int(k):raise ValueError\n"
+            "  except Exception:\n"
+            "   print('N',p)\n"
+            "   continue\n"
+            "  f.write(d)\n"
+            "  p+=len(d)\n"
+            "  print('A',p)\n"
+            "finally:\n"
+            " f.close()"
+        )
         with open(src, "rb") as f:
-            while True:
-                data = f.read(chunk_size)
-                if not data:
-                    break
-                if sys.version_info < (3,):
-                    self.exec_("w(b" + repr(data) + ")")
-                else:
-                    self.exec_("w(" + repr(data) + ")")
-        self.exec_("f.close()")
+            src_size = os.fstat(f.fileno()).st_size
+            acked = 0
+            for attempt in range(retries + 1):
+                mode = "wb" if acked == 0 else "ab"
+                f.seek(acked)
+                sent = acked
+                in_flight = []
+                n_resends = 0
+                try:
+                    self.exec_raw_no_follow(cmd % (dest, mode, acked))
+                    while True:
+                        while len(in_flight) < window:
+                            data = f.read(chunk_size)
+                            if not data:
+                                break
+                            line = b"%u %u %s" % (
+                                sent,
+                                zlib.crc32(data),
+                                binascii.b2a_base64(data),
+                            )
+                            self.serial.write(line)
+                            sent += len(data)
+                            in_flight.append(sent)
+                        if not in_flight:
+                            break
+                        resp = self.read_until(1, b"\n", timeout=10)
+                        if not resp.endswith(b"\n"):
+                            raise PyboardError("fs_put: timeout waiting for acknowledge")
+                        kind, _, pos = resp.strip().partition(b" ")
+                        if kind == b"A":
+                            acked = int(pos)
+                            while in_flight and in_flight[0] <= acked:
+                                in_flight.pop(0)
+                        elif kind == b"N":
+                            n_resends += 1
+                            if n_resends > retries:
+                                raise PyboardError("fs_put: too many resends")
+                            acked = int(pos)
+                            f.seek(acked)
+                            sent = acked
+                            in_flight = []
+                        else:
+                            raise PyboardError("fs_put: unexpected response %r" % resp)
+                    self.serial.write(b"E\n")
+                    ret, ret_err = self.follow(10)
+                    if ret_err:
+                        raise PyboardError("exception", ret, ret_err)
+                    return
+                except PyboardError as er:
+                    if len(er.args) > 1 or attempt == retries:
+                        raise
+                    # Resume after what actually made it into the file (the
+                    # ack of a chunk that was written may have been lost).
+                    # The board writes only verified chunks, in order, hence
+                    # its file (closed when interrupted) is a prefix of
+                    # `src`, unless it is longer
+                    self.interrupt()
+                    self.exec_("import uos")
+                    size = int(self.eval("uos.stat('%s')[6]" % dest))
+                    acked = size if size <= src_size else 0
 
     def fs_mkdir(self, dir):
         self.exec_("import uos\nuos.mkdir('%s')" % dir)
@@ -530,6 +816,32 @@ def execfile(filename, device="/dev/ttyACM0", baudrate=115200, user="micro", pas
     pyb.close()
 
 
+def benchmark(num_bytes=1 << 22, repeat=3):
+    """Measure the throughput of Pyboard.read_until over a loopback
+    ProcessToSerial device that sends num_bytes followed by an EOF marker."""
+    cmd = (
+        "exec:%s -c \"import sys; sys.stdout.buffer.write(b'x' * %u + b'\\x04');"
+        ' sys.stdout.flush(); sys.stdin.read()"' % (sys.executable, num_bytes)
+    )
+    rates = []
+    for _ in range(repeat):
+        pyb = Pyboard(cmd)
+        try:
+            t0 = time.monotonic()
+            data = pyb.read_until(1, b"\x04", timeout=10)
+            dt = time.monotonic() - t0
+        finally:
+            pyb.close()
+        if len(data) != num_bytes + 1:
+            raise PyboardError("benchmark: received %u of %u bytes" % (len(data), num_bytes + 1))
+        rates.append(len(data) / dt)
+    print(
+        "read_until: %u bytes, best %.1f MB/s, mean %.1f MB/s"
+        % (num_bytes, max(rates) / 1e6, sum(rates) / len(rates) / 1e6)
+    )
+    return rates
+
+
 def filesystem_command(pyb, args):
     def fname_remote(src):
         if src.startswith(":"):
@@ -653,9 +965,18 @@ def main():
     cmd_parser.add_argument(
         "-f", "--filesystem", action="store_true", help="perform a filesystem action"
     )
+    cmd_parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="measure the receive throughput over a loopback device and exit",
+    )
     cmd_parser.add_argument("files", nargs="*", help="input files")
     args = cmd_parser.parse_args()
 
+    if args.benchmark:
+        benchmark()
+        return
+
     # open the connection to the pyboard
     try:
         pyb = Pyboard(args.device, args.baudrate, args.user, args.password, args.wait)
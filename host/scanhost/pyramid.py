@@ -0,0 +1,283 @@
+# ----------------------------------------------------------------------------
+# pyramid.py
+# Multi-resolution pyramid of a spectral cube (e.g. a stitched panorama or a
+# frame of a time-lapse) for interactive viewing; see `tileserver.py`
+#
+#   <path>/meta.json          shape of levels, tile size, bands, gains, ...
+#   <path>/spect_<k>.npy      level k (rows x cols x n_spect, `uint16`)
+#   <path>/preview_<k>.npy    level k (rows x cols x n_bands, `float32`)
+#
+# Level 0 is the cube itself, each further level halves rows and columns
+# (mean of 2x2 pixels) until the level fits into one tile. The previews
+# hold the mean of the channels in each band (short to long wavelength).
+# Levels are computed block by block from the level before, hence cubes
+# need not fit into memory (`np.load(..., mmap_mode="r")`).
+#
+#   python -m scanhost.pyramid <src> <dst>
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import os
+import sys
+import json
+import zlib
+import struct
+import shutil
+import argparse
+import numpy as np
+from scanhost import conecatch, cache, store
+
+DEF_TILE      = 256
+DEF_BANDS_NM  = ((400, 500), (500, 600), (600, 700))
+ROW_BLOCK     = 256     # rows of a level processed at once (even)
+
+META_FILE     = "meta.json"
+
+# ----------------------------------------------------------------------------
+class Pyramid(object):
+  """Read access to a pyramid built by `build`; `tile(level, ty, tx)`
+     returns an RGB tile, `spectrum(row, col, level)` the spectrum of a
+     pixel."""
+
+  def __init__(self, path):
+    self.path = path
+    with open(os.path.join(path, META_FILE)) as f:
+      self.meta = json.load(f)
+    self._spect = {}
+    self._preview = {}
+
+  @property
+  def id(self):
+    """ Changes when the pyramid is rebuilt
+    """
+    return self.meta["id"]
+
+  @property
+  def n_levels(self):
+    return len(self.meta["shapes"])
+
+  @property
+  def tile_size(self):
+    return self.meta["tile"]
+
+  @property
+  def wavelengths_nm(self):
+    return self.meta["wavelengths_nm"]
+
+  def shape(self, level=0):
+    """ Rows and columns of `level`
+    """
+    return tuple(self.meta["shapes"][level])
+
+  def n_tiles(self, level=0):
+    """ Number of tiles in y and x of `level`
+    """
+    t = self.tile_size
+    return tuple(-(-n //t) for n in self.shape(level))
+
+  def spect(self, level=0):
+    """ Spectra of `level` (memory-mapped)
+    """
+    if level not in self._spect:
+      self._spect[level] = np.load(self._fname("spect", level), mmap_mode="r")
+    return self._spect[level]
+
+  def preview(self, level=0):
+    """ Band means of `level` (memory-mapped)
+    """
+    if level not in self._preview:
+      self._preview[level] = np.load(self._fname("preview", level),
+                                     mmap_mode="r")
+    return self._preview[level]
+
+  def spectrum(self, row, col, level=0):
+    """ Returns the spectrum of pixel `(row, col)` of `level`
+    """
+    rows, cols = self.shape(level)
+    if not (0 <= row < rows and 0 <= col < cols):
+      raise IndexError("Pixel ({0}, {1}) not in level {2}".format(row, col, level))
+    return np.array(self.spect(level)[row, col])
+
+  def tile(self, level, ty, tx):
+    """ Returns tile `(ty, tx)` of `level` as RGB image (`uint8`; tiles at
+        the right and bottom edge may be smaller)
+    """
+    ny, nx = self.n_tiles(level)
+    if not (0 <= level < self.n_levels and 0 <= ty < ny and 0 <= tx < nx):
+      raise IndexError("Tile {0}/{1}/{2} not in pyramid".format(level, ty, tx))
+    t = self.tile_size
+    p = self.preview(level)[ty *t:(ty +1) *t, tx *t:(tx +1) *t]
+    rgb = conecatch.to_rgb(p, self.meta["gain"])
+    return (rgb *255 +0.5).astype(np.uint8)
+
+  def tile_png(self, level, ty, tx):
+    return png_bytes(self.tile(level, ty, tx))
+
+  def _fname(self, kind, level):
+    return os.path.join(self.path, "{0}_{1}.npy".format(kind, level))
+
+# ----------------------------------------------------------------------------
+def band_matrix(wavelengths_nm, n_spect, bands_nm=DEF_BANDS_NM):
+  """ Returns the matrix (n_spect x n_bands) that averages the channels in
+      each band; w/o wavelengths, the channels are split into equal bands
+  """
+  m = np.zeros((n_spect, len(bands_nm)), dtype=np.float32)
+  if wavelengths_nm is None:
+    for i, ch in enumerate(np.array_split(np.arange(n_spect), len(bands_nm))):
+      m[ch, i] = 1
+  else:
+    nm = np.asarray(wavelengths_nm)
+    for i, (a, b) in enumerate(bands_nm):
+      m[(nm >= a) & (nm < b), i] = 1
+  n = m.sum(axis=0)
+  return m /np.where(n > 0, n, 1)
+
+def half(a):
+  """ Returns `a` (rows x cols x ...) with half the rows and columns (mean
+      of 2x2 pixels, `float32`); an odd last row or column is averaged with
+      itself
+  """
+  a = np.asarray(a)
+  n, m = a.shape[0] //2, a.shape[1] //2
+  r = a[0::2].astype(np.float32)
+  r[:n] += a[1::2]
+  if a.shape[0] % 2:
+    r[-1] *= 2
+  c = r[:, 0::2]
+  c[:, :m] += r[:, 1::2]
+  if a.shape[1] % 2:
+    c[:, -1] *= 2
+  c *= 0.25
+  return c
+
+def build(src, path, tile=DEF_TILE, bands_nm=DEF_BANDS_NM, wavelengths_nm=None,
+          overwrite=False):
+  """ Builds the pyramid of `src` (cube, `ScanResult` or `(Recording, i)`,
+      see `cache.get_cube`) in directory `path`; an existing pyramid is kept
+      unless `overwrite` is True. Returns the `Pyramid`
+  """
+  isPyr = os.path.exists(os.path.join(path, META_FILE))
+  if isPyr and not overwrite:
+    return Pyramid(path)
+  if not isPyr and os.path.isdir(path) and os.listdir(path):
+    raise FileExistsError("`{0}` exists and is not a pyramid".format(path))
+  cube, nm = cache.get_cube(src)
+  nm = nm if wavelengths_nm is None else wavelengths_nm
+  if cube.ndim != 3:
+    raise ValueError("Need a cube (rows x cols x n_spect), got shape {0}"
+                     .format(cube.shape))
+  if cube.size == 0:
+    raise ValueError("Cube is empty (shape {0})".format(cube.shape))
+  # Built in a temporary directory, which then replaces `path`
+  tmp = path.rstrip(os.sep) +".tmp"
+  shutil.rmtree(tmp, ignore_errors=True)
+  os.makedirs(tmp)
+  nSpect = cube.shape[2]
+  bm = band_matrix(nm, nSpect, bands_nm)
+  shapes = []
+  prev = cube
+  level = 0
+  while True:
+    rows, cols = (prev.shape[:2] if level == 0 else
+                  (-(-prev.shape[0] //2), -(-prev.shape[1] //2)))
+    shapes.append((rows, cols))
+    sp = np.lib.format.open_memmap(os.path.join(tmp, "spect_{0}.npy".format(level)),
+                                   mode="w+", dtype="<u2", shape=(rows, cols, nSpect))
+    pv = np.lib.format.open_memmap(os.path.join(tmp, "preview_{0}.npy".format(level)),
+                                   mode="w+", dtype="<f4",
+                                   shape=(rows, cols, len(bands_nm)))
+    for r in range(0, rows, ROW_BLOCK //2 if level else ROW_BLOCK):
+      if level == 0:
+        b = np.asarray(prev[r:r +ROW_BLOCK])
+        if b.dtype != np.uint16:
+          if b.dtype.kind == "f":
+            b = np.nan_to_num(np.rint(b))
+          b = np.clip(b, 0, 0xFFFF)
+        sp[r:r +len(b)] = b
+        b = b.astype(np.float32)
+      else:
+        b = half(prev[2 *r:2 *r +ROW_BLOCK])
+        sp[r:r +len(b)] = np.rint(b)
+      pv[r:r +len(b)] = b @ bm
+    sp.flush()
+    pv.flush()
+    if level == 0:
+      gain = pv.reshape(-1, len(bands_nm)).max(axis=0)
+    prev = sp
+    level += 1
+    if max(rows, cols) <= tile:
+      break
+  meta = {"id": os.urandom(8).hex(), "shapes": shapes, "tile": tile,
+          "n_spect": nSpect, "bands_nm": [list(b) for b in bands_nm],
+          "gain": [float(g) for g in gain],
+          "wavelengths_nm": None if nm is None else [float(v) for v in nm]}
+  with open(os.path.join(tmp, META_FILE), "w") as f:
+    json.dump(meta, f)
+  del sp, pv, prev
+  shutil.rmtree(path, ignore_errors=True)
+  os.replace(tmp, path)
+  return Pyramid(path)
+
+def build_recording(rec, root, start=0, stop=None, **kwargs):
+  """ Builds the pyramids of frames `start` to `stop` of a `Recording` in
+      `<root>/frame_<i>`; frames with a pyramid are skipped. Returns the
+      paths of the pyramids
+  """
+  stop = len(rec) if stop is None else min(stop, len(rec))
+  paths = []
+  for i in range(start, stop):
+    p = os.path.join(root, "frame_{0:06d}".format(i))
+    build((rec, i), p, **kwargs)
+    paths.append(p)
+  return paths
+
+# ----------------------------------------------------------------------------
+def png_bytes(img):
+  """ Returns image `img` (rows x cols [x 3], `uint8`) as PNG
+  """
+  img = np.ascontiguousarray(img, dtype=np.uint8)
+  h, w = img.shape[:2]
+  color = 2 if img.ndim == 3 else 0
+  raw = np.zeros((h, img[0].size +1), dtype=np.uint8)
+  raw[:, 1:] = img.reshape(h, -1)
+
+  def chunk(kind, data):
+    c = struct.pack(">I", len(data)) +kind +data
+    return c +struct.pack(">I", zlib.crc32(kind +data) & 0xFFFFFFFF)
+
+  return (b"\x89PNG\r\n\x1a\n"
+          +chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, color, 0, 0, 0))
+          +chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+          +chunk(b"IEND", b""))
+
+# ----------------------------------------------------------------------------
+def main(argv=None):
+  ap = argparse.ArgumentParser(description="Builds the pyramid of a scan "
+                               "(`.npz` of `ScanResult`, cube as `.npy`) or of "
+                               "each frame of a `Recording` (directory)")
+  ap.add_argument("src")
+  ap.add_argument("dst")
+  ap.add_argument("--tile", type=int, default=DEF_TILE)
+  ap.add_argument("--overwrite", action="store_true")
+  args = ap.parse_args(argv)
+  kw = {"tile": args.tile, "overwrite": args.overwrite}
+  if os.path.isdir(args.src):
+    rec = store.Recording(args.src, readonly=True)
+    paths = build_recording(rec, args.dst, **kw)
+    print("{0} pyramid(s) in `{1}`".format(len(paths), args.dst))
+    return 0
+  if args.src.lower().endswith(".npz"):
+    from scanhost.client import ScanResult
+    src = ScanResult.load(args.src)
+  else:
+    src = np.load(args.src, mmap_mode="r")
+  p = build(src, args.dst, **kw)
+  print("{0} level(s), {1}x{2} pixels".format(p.n_levels, *p.shape()))
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
+
+# ----------------------------------------------------------------------------
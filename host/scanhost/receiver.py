@@ -0,0 +1,203 @@
+# ----------------------------------------------------------------------------
+# receiver.py
+# Receives pixel streams sent by the scanner via WLAN (`code/netstream.py`)
+# and writes the records directly into a memory-mapped cube
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# 2026-10-19, v1.1 - Malformed records and headers are counted and skipped
+# ----------------------------------------------------------------------------
+import asyncio
+import struct
+import numpy as np
+from scanhost import link as ln
+
+DEF_PORT      = 5005
+N_PIX_VALS    = 5       # x, y, head, pitch, roll
+
+# ----------------------------------------------------------------------------
+class CubeWriter(object):
+  """Memory-mapped `.npy` cube of `n_pix` x `n_spect` `uint16` spectra plus
+     a `n_pix` x 5 `float32` array with position and orientation per pixel
+     (file name with `_pix` appended)."""
+
+  def __init__(self, fname, n_pix, n_spect):
+    base = fname[:-4] if fname.endswith(".npy") else fname
+    self.fname = base +".npy"
+    self.fname_pix = base +"_pix.npy"
+    self.n_pix = n_pix
+    self.n_spect = n_spect
+    self.cube = np.lib.format.open_memmap(self.fname, mode="w+",
+                                          dtype="<u2", shape=(n_pix, n_spect))
+    self.pix = np.lib.format.open_memmap(self.fname_pix, mode="w+",
+                                         dtype="<f4", shape=(n_pix, N_PIX_VALS))
+    self.received = np.zeros(n_pix, dtype=bool)
+    self.n_received = 0
+
+  def put(self, i_pix, vals, spect_bytes):
+    """ Stores pixel `i_pix`; returns False if it was already received.
+        Raises `ValueError` if `i_pix` is out of range or the spectrum has
+        not `n_spect` channels
+    """
+    if not 0 <= i_pix < self.n_pix:
+      raise ValueError("Pixel {0} out of range".format(i_pix))
+    if len(spect_bytes) != 2 *self.n_spect:
+      raise ValueError("Spectrum of {0} bytes, expected {1}"
+                       .format(len(spect_bytes), 2 *self.n_spect))
+    isNew = not self.received[i_pix]
+    self.cube[i_pix] = np.frombuffer(spect_bytes, dtype="<u2")
+    self.pix[i_pix] = vals
+    if isNew:
+      self.received[i_pix] = True
+      self.n_received += 1
+    return isNew
+
+  def missing(self):
+    """ Returns the indices of the pixels not (yet) received
+    """
+    return np.flatnonzero(~self.received)
+
+  def flush(self):
+    self.cube.flush()
+    self.pix.flush()
+
+# ----------------------------------------------------------------------------
+class StreamReceiver(object):
+  """Accepts pixel streams via TCP or UDP and writes them into a
+     `CubeWriter`; the cube is created when the stream header arrives,
+     unless `n_pix` and `n_spect` are given. Malformed frames, records of
+     pixels out of range and headers with dimensions other than those of
+     the cube being received are counted in `n_bad` and skipped."""
+
+  def __init__(self, fname, n_pix=None, n_spect=None):
+    self._fname = fname
+    self.cube = None
+    self.done = asyncio.Event()
+    self.n_records = 0
+    self.n_duplicates = 0
+    self.n_early = 0
+    self.n_dropped_dev = 0
+    self.n_bad = 0
+    self._lastSeq = -1
+    self.n_seq_gaps = 0
+    if n_pix and n_spect:
+      self._open(n_pix, n_spect)
+
+  async def serve_tcp(self, host="0.0.0.0", port=DEF_PORT):
+    """ Starts a TCP server; returns the `asyncio.Server`
+    """
+    return await asyncio.start_server(self._onClient, host, port)
+
+  async def serve_udp(self, host="0.0.0.0", port=DEF_PORT):
+    """ Opens a UDP endpoint; returns the transport
+    """
+    loop = asyncio.get_running_loop()
+    tr, _ = await loop.create_datagram_endpoint(
+      lambda: _DatagramProtocol(self), local_addr=(host, port))
+    return tr
+
+  async def wait(self, timeout_s=None):
+    """ Waits until the stream ended or all pixels were received; returns
+        True if so, False on timeout
+    """
+    try:
+      await asyncio.wait_for(self.done.wait(), timeout_s)
+    except asyncio.TimeoutError:
+      return False
+    finally:
+      if self.cube:
+        self.cube.flush()
+    return True
+
+  @property
+  def n_lost(self):
+    """ Number of pixels not received (so far)
+    """
+    return len(self.cube.missing()) if self.cube else 0
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _open(self, n_pix, n_spect):
+    if self.cube:
+      # Same stream, e.g. after a reconnect; a different one would replace
+      # the cube being received
+      if (self.cube.n_pix, self.cube.n_spect) != (n_pix, n_spect):
+        self.n_bad += 1
+      return
+    self.cube = CubeWriter(self._fname, n_pix, n_spect)
+
+  async def _onClient(self, reader, writer):
+    fr = ln.FrameReader()
+    try:
+      while not reader.at_eof():
+        data = await reader.read(65536)
+        if not data:
+          break
+        for f in fr.feed(data):
+          self._onFrame(*f)
+    finally:
+      writer.close()
+
+  def _onFrame(self, op, seq, d):
+    if op == ln.OP_STREAM_PIX:
+      if self.cube is None:
+        self.n_early += 1
+        return
+      if len(d) != 4 +ln.PIXEL_HDR_LEN +2 *self.cube.n_spect:
+        self.n_bad += 1
+        return
+      hdr = struct.unpack_from(ln.FMT_PIXEL, d, 4)
+      try:
+        isNew = self.cube.put(hdr[0], hdr[1:], d[4 +ln.PIXEL_HDR_LEN:])
+      except ValueError:
+        self.n_bad += 1
+        return
+      sseq, = struct.unpack_from("<I", d)
+      if self._lastSeq >= 0 and sseq > self._lastSeq +1:
+        self.n_seq_gaps += sseq -self._lastSeq -1
+      self._lastSeq = max(self._lastSeq, sseq)
+      if not isNew:
+        self.n_duplicates += 1
+      self.n_records += 1
+      if self.cube.n_received == self.cube.n_pix:
+        self.done.set()
+    elif op == ln.OP_STREAM_HDR:
+      if len(d) != 6:
+        self.n_bad += 1
+        return
+      n_pix, n_spect = struct.unpack("<IH", d)
+      self._open(n_pix, n_spect)
+    elif op == ln.OP_STREAM_END:
+      if len(d) != 8:
+        self.n_bad += 1
+        return
+      _, self.n_dropped_dev = struct.unpack("<II", d)
+      self.done.set()
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+  def __init__(self, rec):
+    self._rec = rec
+    self._fr = ln.FrameReader()
+
+  def datagram_received(self, data, addr):
+    for f in self._fr.feed(data):
+      self._rec._onFrame(*f)
+
+# ----------------------------------------------------------------------------
+def receive(fname, port=DEF_PORT, udp=False, timeout_s=None, host="0.0.0.0"):
+  """ Receives one scan into `fname`; returns the `StreamReceiver`
+  """
+  async def run():
+    rec = StreamReceiver(fname)
+    if udp:
+      srv = await rec.serve_udp(host, port)
+    else:
+      srv = await rec.serve_tcp(host, port)
+    try:
+      await rec.wait(timeout_s)
+    finally:
+      srv.close()
+    return rec
+  return asyncio.run(run())
+
+# ----------------------------------------------------------------------------
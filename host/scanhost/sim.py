@@ -0,0 +1,232 @@
+# ----------------------------------------------------------------------------
+# sim.py
+# Simulated scanner that serves the binary command protocol on a pty or a
+# socket, or sends a pixel stream, to test host code without hardware
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import os
+import socket
+import struct
+import time
+import threading
+import numpy as np
+from scanhost import link as ln
+
+N_SPECT      = 288
+
+# ----------------------------------------------------------------------------
+class SocketPort(object):
+  """Wraps a socket into the `read(n)`/`write(b)` interface of `ScanLink`."""
+
+  def __init__(self, sock, timeout_s=0.05):
+    self._sock = sock
+    self._sock.settimeout(timeout_s)
+
+  def read(self, n):
+    try:
+      return self._sock.recv(n)
+    except socket.timeout:
+      return b""
+
+  def write(self, b):
+    self._sock.sendall(b)
+
+  def close(self):
+    self._sock.close()
+
+# ----------------------------------------------------------------------------
+class SimScanner(object):
+  """Answers requests like `main.Server`, with random spectra; the device
+     end is a file descriptor (e.g. pty master) or a socket."""
+
+  def __init__(self, end, n_spect=N_SPECT, junk=b""):
+    """ `junk` is written before each reply, to mimic stray `print` output
+    """
+    self._end = end
+    self._nSpect = n_spect
+    self._junk = junk
+    self._reader = ln.FrameReader()
+    self._rng = np.random.default_rng(0)
+    self._scan = None
+    self._iPix = 0
+    self._running = False
+    self._thread = None
+    self._video = None
+
+  def start(self):
+    self._running = True
+    self._thread = threading.Thread(target=self._loop, daemon=True)
+    self._thread.start()
+    return self
+
+  def stop(self):
+    self._running = False
+    if self._thread:
+      self._thread.join(1)
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _read(self):
+    if isinstance(self._end, socket.socket):
+      self._end.settimeout(0.001 if self._video else 0.05)
+      try:
+        return self._end.recv(4096)
+      except socket.timeout:
+        return b""
+    return os.read(self._end, 4096)
+
+  def _write(self, b):
+    if isinstance(self._end, socket.socket):
+      self._end.sendall(b)
+    else:
+      os.write(self._end, b)
+
+  def _send(self, op, seq, data=b""):
+    self._write(self._junk +ln.make_frame(op, seq, data))
+
+  def _loop(self):
+    while self._running:
+      try:
+        data = self._read()
+      except OSError:
+        break
+      for op, seq, d in self._reader.feed(data):
+        if not self._handle(op, seq, d):
+          self._running = False
+          break
+      if self._video:
+        self._sendFrames()
+
+  def _sendFrames(self):
+    # Frames that are due at the simulated frame rate
+    seq, t0, dt, nFr, nSent = self._video
+    nDue = int((time.monotonic() -t0) /dt) +1
+    if nFr > 0:
+      nDue = min(nDue, nFr)
+    while nSent < nDue:
+      t_us = int((t0 +nSent *dt) *1e6) & 0x3FFFFFFF
+      hdr = struct.pack(ln.FMT_FRAME, nSent, t_us, 0)
+      self._send(ln.OP_FRAME, seq, hdr +self._spectrum().tobytes())
+      nSent += 1
+    self._video = (seq, t0, dt, nFr, nSent)
+    if nFr > 0 and nSent >= nFr:
+      self._stopVideo(seq)
+
+  def _stopVideo(self, seq):
+    vseq, t0, dt, nFr, nSent = self._video
+    dt_ms = int((time.monotonic() -t0) *1000)
+    self._send(ln.OP_VIDEO_STOP | ln.OP_REPLY, seq,
+               struct.pack("<IIII", nSent, 0, nSent, dt_ms))
+    self._video = None
+
+  def _handle(self, op, seq, d):
+    rop = op | ln.OP_REPLY
+    try:
+      if op == ln.OP_STATUS:
+        flags = ln.ST_SCANNER
+        nPix = 0
+        if self._scan:
+          flags |= ln.ST_SCAN_READY
+          nPix = self._scan[0]
+        self._send(rop, seq, struct.pack("<BBIII", 2, flags, self._iPix,
+                                         nPix, 100000))
+      elif op == ln.OP_SETUP_SCAN:
+        dx, dy, sx, sy, t_s, path = struct.unpack("<HHfffB", d)
+        nPix = (dx//max(1, int(sx)) +1) *(dy//max(1, int(sy)) +1)
+        self._scan = (nPix, dx, dy, sx, sy)
+        self._iPix = 0
+        self._send(rop, seq, struct.pack("<HHfffBHH", dx, dy, sx, sy, t_s,
+                                         path, nPix, self._nSpect))
+      elif op == ln.OP_SCAN_ALL:
+        if not self._scan:
+          self._send(ln.OP_ERROR, seq, bytes((ln.ERR_NOT_READY,)) +b"no scan")
+          return True
+        nPix, dx, dy, sx, sy = self._scan
+        nx = dx//max(1, int(sx)) +1
+        for i in range(nPix):
+          x = (i % nx) *sx -dx/2
+          y = (i // nx) *sy -dy/2
+          hdr = struct.pack(ln.FMT_PIXEL, i, x, y, 0., 0., 0.)
+          self._send(ln.OP_PIXEL, seq, hdr +self._spectrum().tobytes())
+          self._iPix = i +1
+        self._scan = None
+        self._send(rop, seq, struct.pack("<I", nPix))
+      elif op == ln.OP_READ_SPECTRUM:
+        self._send(rop, seq, self._spectrum().tobytes())
+      elif op == ln.OP_MOVE:
+        struct.unpack("<ffH", d)
+        self._send(rop, seq)
+      elif op == ln.OP_WAVELENGTHS:
+        nm = np.linspace(315, 887, self._nSpect).astype("<f4")
+        self._send(rop, seq, nm.tobytes())
+      elif op == ln.OP_VIDEO_START:
+        t_s, nFr, nSlots = struct.unpack("<fIB", d)
+        self._send(rop, seq, struct.pack("<H", self._nSpect))
+        self._video = (seq, time.monotonic(), max(t_s, 0.001), nFr, 0)
+      elif op == ln.OP_VIDEO_STOP:
+        if not self._video:
+          self._send(ln.OP_ERROR, seq, bytes((ln.ERR_NOT_READY,)))
+        else:
+          self._stopVideo(seq)
+      elif op == ln.OP_QUIT:
+        self._send(rop, seq)
+        return False
+      else:
+        self._send(ln.OP_ERROR, seq, bytes((ln.ERR_UNKNOWN_OP,)))
+    except struct.error as e:
+      self._send(ln.OP_ERROR, seq, bytes((ln.ERR_BAD_PAYLOAD,)) +str(e).encode())
+    return True
+
+  def _spectrum(self):
+    return self._rng.integers(0, 4096, self._nSpect).astype("<u2")
+
+# ----------------------------------------------------------------------------
+def socket_pair(**kwargs):
+  """ Returns `(port, sim)`, a port for `ScanLink` connected via a socket
+      pair to a running `SimScanner`
+  """
+  a, b = socket.socketpair()
+  return SocketPort(a), SimScanner(b, **kwargs).start()
+
+def pty_pair(**kwargs):
+  """ Returns `(device_name, sim)`, with `SimScanner` running on the master
+      side of a pty, such that `ScanLink(device_name)` can open the slave
+      side like a serial port (requires `pyserial`)
+  """
+  import tty
+  master, slave = os.openpty()
+  tty.setraw(slave)
+  name = os.ttyname(slave)
+  return name, SimScanner(master, **kwargs).start()
+
+# ----------------------------------------------------------------------------
+def stream_pixels(host, port, n_pix, n_spect=N_SPECT, udp=False, skip=()):
+  """ Sends a pixel stream like `netstream.NetSink` to a receiver at
+      `host`:`port`; pixels in `skip` are not sent (to mimic losses)
+  """
+  rng = np.random.default_rng(1)
+  frames = [ln.make_frame(ln.OP_STREAM_HDR, 0, struct.pack("<IH", n_pix,
+                                                           n_spect))]
+  nSent = 0
+  for i in range(n_pix):
+    if i in skip:
+      continue
+    d = struct.pack("<I", i) +struct.pack(ln.FMT_PIXEL, i, i, -i, 0., 0., 0.)
+    d += rng.integers(0, 4096, n_spect).astype("<u2").tobytes()
+    frames.append(ln.make_frame(ln.OP_STREAM_PIX, i & 0xFF, d))
+    nSent += 1
+  frames.append(ln.make_frame(ln.OP_STREAM_END, 0,
+                              struct.pack("<II", nSent, len(skip))))
+  if udp:
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for f in frames:
+      s.sendto(f, (host, port))
+  else:
+    s = socket.create_connection((host, port))
+    s.sendall(b"".join(frames))
+  s.close()
+  return nSent
+
+# ----------------------------------------------------------------------------
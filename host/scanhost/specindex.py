@@ -0,0 +1,209 @@
+# ----------------------------------------------------------------------------
+# specindex.py
+# Nearest-neighbour search of spectra in a library (reference spectra and/or
+# pixels of earlier recordings) by spectral angle
+#
+# Spectra are normalised to unit length, for which the Euclidean distance
+# is a monotonic function of the spectral angle. Candidates are searched in
+# the space of the first principal components (KD-tree, if SciPy is
+# installed, otherwise brute force) and then ranked by their exact angle.
+#
+#   idx = SpectralIndex(wavelengths_nm=nm)
+#   idx.add(refs, ["grass", "bark", ...], wavelengths_nm=nm_refs)
+#   idx.build()
+#   lbl = idx.classify(cube, max_angle=0.1)    # entry per pixel, -1: none
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import json
+import numpy as np
+from scanhost import analytics
+
+DEF_COMPONENTS  = 16
+DEF_CANDIDATES  = 16    # candidates per query ranked by their exact angle
+QUERY_CHUNK     = 512   # queries ranked at once
+
+# ----------------------------------------------------------------------------
+def _toJSON(v):
+  if isinstance(v, np.generic):
+    return v.item()
+  raise TypeError(type(v))
+
+def unit(spectra):
+  """ Returns `spectra` (n x n_spect) with unit length (`float32`); spectra
+      that are all zero stay zero
+  """
+  a = np.asarray(spectra, dtype=np.float32)
+  n = np.linalg.norm(a, axis=-1, keepdims=True)
+  return a /np.where(n > 0, n, 1)
+
+def pca_basis(x, k, n_iter=2, seed=0):
+  """ Returns `(mean, basis)` with the first `k` principal components of
+      `x` (n x n_spect) as rows of `basis` (randomised SVD; fast for
+      `k` << n_spect)
+  """
+  rng = np.random.default_rng(seed)
+  mean = x.mean(axis=0)
+  xc = x -mean
+  q = xc @ rng.standard_normal((x.shape[1], min(k +8, x.shape[1]))).astype(x.dtype)
+  for _ in range(n_iter):
+    q, _ = np.linalg.qr(q)
+    q = xc @ (xc.T @ q)
+  q, _ = np.linalg.qr(q)
+  _, _, vt = np.linalg.svd(q.T @ xc, full_matrices=False)
+  return mean, vt[:k]
+
+class SpectralIndex(object):
+  """Library of spectra with labels; `add` entries, `build` the index, then
+     `query` or `classify`. With `wavelengths_nm`, spectra added with their
+     own wavelengths are resampled to these."""
+
+  def __init__(self, wavelengths_nm=None, n_components=DEF_COMPONENTS,
+               n_candidates=DEF_CANDIDATES):
+    self.wavelengths_nm = (None if wavelengths_nm is None
+                           else np.asarray(wavelengths_nm, dtype=np.float64))
+    self.n_components = n_components
+    self.n_candidates = n_candidates
+    self.labels = []
+    self._parts = []
+    self._refs = None
+    self._mean = None
+    self._basis = None
+    self._red = None
+    self._redSq = None
+    self._tree = None
+
+  def __len__(self):
+    return len(self.labels)
+
+  def add(self, spectra, labels, wavelengths_nm=None):
+    """ Adds `spectra` (n x n_spect) with `labels` (one per spectrum, or one
+        for all), sampled at `wavelengths_nm`, if given
+    """
+    a = np.atleast_2d(np.asarray(spectra, dtype=np.float64))
+    if wavelengths_nm is not None and self.wavelengths_nm is not None:
+      nm = np.asarray(wavelengths_nm, dtype=np.float64)
+      a = np.array([np.interp(self.wavelengths_nm, nm, s, left=0., right=0.)
+                    for s in a])
+    if isinstance(labels, (str, bytes)) or np.ndim(labels) == 0:
+      labels = [labels] *len(a)
+    elif len(labels) != len(a):
+      raise ValueError("{0} labels for {1} spectra".format(len(labels), len(a)))
+    self._parts.append(unit(a))
+    self.labels += list(labels)
+    self._refs = None
+
+  def add_source(self, src, label, step=1):
+    """ Adds every `step`-th spectrum of `src` (see `analytics.blocks`, e.g.
+        a `Recording`) that is not all zero, labelled `(label, i)` with `i`
+        the flat index of the spectrum in `src`
+    """
+    _, _, bl = analytics.blocks(src)
+    for a, b, x in bl:
+      i = np.arange(a, b)
+      x = np.asarray(x)
+      ok = (i % step == 0) & x.any(axis=1)
+      self.add(x[ok], [(label, int(j)) for j in i[ok]])
+
+  def build(self):
+    """ Builds the index; called by `query` after entries were added
+    """
+    if not self._parts:
+      raise ValueError("Library is empty")
+    self._refs = np.concatenate(self._parts)
+    self._parts = [self._refs]
+    k = min(self.n_components, len(self._refs), self._refs.shape[1])
+    self._mean, self._basis = pca_basis(self._refs, k)
+    self._red = self._reduce(self._refs)
+    try:
+      from scipy.spatial import cKDTree
+      self._tree = cKDTree(self._red)
+      self._redSq = None
+    except ImportError:
+      self._tree = None
+      self._redSq = (self._red **2).sum(axis=1)
+    return self
+
+  def query(self, spectra, k=1):
+    """ Returns `(angles, idx)` (n x k) of the `k` entries with the smallest
+        spectral angle [rad] to each of `spectra` (n x n_spect); NaN and -1
+        for spectra that are all zero
+    """
+    if self._refs is None:
+      self.build()
+    q = unit(np.atleast_2d(spectra))
+    nRefs = len(self._refs)
+    m = min(nRefs, max(k, self.n_candidates))
+    k = min(k, nRefs)
+    ang = np.empty((len(q), k), dtype=np.float32)
+    idx = np.empty((len(q), k), dtype=np.int64)
+    for i in range(0, len(q), QUERY_CHUNK):
+      qc = q[i:i +QUERY_CHUNK]
+      cand = self._candidates(qc, m)
+      cos = np.einsum("ij,ikj->ik", qc, self._refs[cand])
+      best = np.argsort(-cos, axis=1)[:, :k]
+      c = np.take_along_axis(cos, best, axis=1)
+      ang[i:i +QUERY_CHUNK] = np.arccos(np.clip(c, -1, 1))
+      idx[i:i +QUERY_CHUNK] = np.take_along_axis(cand, best, axis=1)
+    zero = ~q.any(axis=1)
+    ang[zero] = np.nan
+    idx[zero] = -1
+    return ang, idx
+
+  def classify(self, src, max_angle=None, chunk=QUERY_CHUNK, n_jobs=None):
+    """ Returns the index of the closest entry for each spectrum of `src`
+        (see `analytics.blocks`; result with the shape of `src` w/o the
+        channels), or -1 if its angle exceeds `max_angle` [rad]; the label
+        is `labels[i]`
+    """
+    if self._refs is None:
+      self.build()
+    lim = np.inf if max_angle is None else max_angle
+
+    def nearest(x):
+      ang, idx = self.query(x)
+      idx[~(ang <= lim)] = -1
+      return idx
+
+    return analytics.map_blocks(nearest, src, 1, np.int32, chunk,
+                                n_jobs)[..., 0]
+
+  def save(self, fname):
+    """ Saves entries and labels (JSON-serialisable) as `.npz`
+    """
+    refs = np.concatenate(self._parts) if self._parts else np.zeros((0, 0))
+    np.savez(fname, refs=refs, labels=json.dumps(self.labels, default=_toJSON),
+             wavelengths_nm=np.array([]) if self.wavelengths_nm is None
+                            else self.wavelengths_nm)
+
+  @classmethod
+  def load(cls, fname, **kwargs):
+    with np.load(fname) as d:
+      nm = d["wavelengths_nm"]
+      idx = cls(nm if len(nm) else None, **kwargs)
+      if len(d["refs"]):
+        idx._parts = [d["refs"]]
+      idx.labels = [tuple(v) if isinstance(v, list) else v
+                    for v in json.loads(str(d["labels"]))]
+    return idx
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _candidates(self, q, m):
+    # Indices (n x m) of the entries closest to `q` in the reduced space
+    r = self._reduce(q)
+    if self._tree is not None:
+      _, cand = self._tree.query(r, k=m)
+      return cand.reshape(len(q), m)
+    d = r @ self._red.T
+    d *= -2
+    d += self._redSq
+    if m >= d.shape[1]:
+      return np.broadcast_to(np.arange(d.shape[1]), d.shape).copy()
+    return np.argpartition(d, m -1, axis=1)[:, :m]
+
+  def _reduce(self, x):
+    return np.ascontiguousarray((x -self._mean) @ self._basis.T, dtype=np.float32)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,277 @@
+# ----------------------------------------------------------------------------
+# store.py
+# Append-only on-disk store for time-lapse recordings: a directory of
+# fixed-size `uint16` chunks (time x pixel x channel, `.npy`) plus an index
+# with one line per frame (time, integration time, scan parameters)
+#
+#   <path>/meta.json           n_pix, n_spect, chunk_len, wavelengths
+#   <path>/index.jsonl         one JSON object per frame
+#   <path>/spect_000000.npy    chunk_len x n_pix x n_spect, uint16
+#   <path>/pix_000000.npy      chunk_len x n_pix x 5, float32
+#
+# A frame is first written into its chunk and then added to the index;
+# frames in a chunk that are not in the index (e.g. after a crash) are
+# ignored and overwritten by the next `append`.
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import os
+import json
+import time
+import numpy as np
+
+DEF_CHUNK_LEN = 16
+N_PIX_VALS    = 5       # x, y, head, pitch, roll
+
+META_FILE     = "meta.json"
+INDEX_FILE    = "index.jsonl"
+
+# ----------------------------------------------------------------------------
+class Recording(object):
+  """Append-only store of frames with `n_pix` x `n_spect` spectra each; an
+     existing store is opened with `Recording(path)`, a new one is created
+     when `n_pix` and `n_spect` are given. `rec[i]` returns frame `i` and
+     `rec.slice` returns a memory-mapped range over time."""
+
+  def __init__(self, path, n_pix=None, n_spect=None, wavelengths_nm=None,
+               chunk_len=DEF_CHUNK_LEN, readonly=False):
+    self.path = path
+    self.readonly = readonly
+    fMeta = os.path.join(path, META_FILE)
+    if os.path.exists(fMeta):
+      with open(fMeta) as f:
+        self.meta = json.load(f)
+      if n_pix and (n_pix, n_spect) != (self.n_pix, self.n_spect):
+        raise ValueError("Store `{0}` holds {1}x{2} frames, not {3}x{4}"
+                         .format(path, self.n_pix, self.n_spect, n_pix, n_spect))
+    elif n_pix and n_spect and not readonly:
+      os.makedirs(path, exist_ok=True)
+      self.meta = {"n_pix": int(n_pix), "n_spect": int(n_spect),
+                   "chunk_len": int(chunk_len), "version": 1,
+                   "wavelengths_nm": None if wavelengths_nm is None
+                                     else [float(v) for v in wavelengths_nm]}
+      with open(fMeta, "w") as f:
+        json.dump(self.meta, f)
+    else:
+      raise FileNotFoundError("No recording at `{0}`".format(path))
+    self.index = []
+    fIndex = os.path.join(path, INDEX_FILE)
+    if os.path.exists(fIndex):
+      with open(fIndex) as f:
+        for ln in f:
+          if ln.strip():
+            self.index.append(json.loads(ln))
+    self._chunks = {}
+    self._fIndex = None
+
+  @property
+  def n_pix(self):
+    return self.meta["n_pix"]
+
+  @property
+  def n_spect(self):
+    return self.meta["n_spect"]
+
+  @property
+  def chunk_len(self):
+    return self.meta["chunk_len"]
+
+  @property
+  def wavelengths_nm(self):
+    nm = self.meta["wavelengths_nm"]
+    return None if nm is None else np.array(nm, dtype=np.float32)
+
+  def __len__(self):
+    return len(self.index)
+
+  def close(self):
+    for sp, pix in self._chunks.values():
+      if not self.readonly:
+        sp.flush()
+        pix.flush()
+    self._chunks = {}
+    if self._fIndex:
+      self._fIndex.close()
+      self._fIndex = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def append(self, cube, pix=None, t=None, t_int_s=None, **params):
+    """ Appends frame `cube` (`n_pix` x `n_spect`, converted to `uint16`)
+        with position/orientation `pix` (`n_pix` x 5), taken at `t` (epoch
+        [s], now if None); `t_int_s` and further scan parameters go into
+        the index. Returns the index of the frame
+    """
+    if self.readonly:
+      raise IOError("Recording `{0}` is read-only".format(self.path))
+    cube = np.asarray(cube)
+    if cube.shape != (self.n_pix, self.n_spect):
+      raise ValueError("Frame has shape {0}, expected {1}"
+                       .format(cube.shape, (self.n_pix, self.n_spect)))
+    if cube.dtype != np.uint16:
+      cube = np.clip(np.rint(np.nan_to_num(cube)), 0, 0xFFFF)
+    i = len(self.index)
+    sp, px = self._chunk(i //self.chunk_len, create=True)
+    j = i % self.chunk_len
+    sp[j] = cube
+    px[j] = np.nan if pix is None else pix
+    sp.flush()
+    px.flush()
+    entry = {"i": i, "t": time.time() if t is None else float(t),
+             "t_int_s": t_int_s}
+    entry.update(params)
+    if self._fIndex is None:
+      self._fIndex = open(os.path.join(self.path, INDEX_FILE), "a")
+    self._fIndex.write(json.dumps(entry, default=_toJSON) +"\n")
+    self._fIndex.flush()
+    self.index.append(entry)
+    return i
+
+  def append_result(self, res, t=None):
+    """ Appends a `ScanResult` (see `client.py`); the time is taken from
+        its header, if not given
+    """
+    hdr = res.header
+    if t is None and "date_yyyymmdd" in hdr and "time_hhmmss" in hdr:
+      t = header_time(hdr)
+    if self.meta["wavelengths_nm"] is None and res.wavelengths_nm is not None:
+      self._setWavelengths(res.wavelengths_nm)
+    params = {k: hdr[k] for k in ("size_xy", "step_xy_deg", "path")
+              if k in hdr}
+    return self.append(res.cube, res.pix, t, hdr.get("t_int_s"), **params)
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def __getitem__(self, i):
+    """ Returns frame `i` (memory-mapped, `n_pix` x `n_spect`)
+    """
+    n = len(self.index)
+    if i < 0:
+      i += n
+    if not 0 <= i < n:
+      raise IndexError("Frame {0} not in recording".format(i))
+    return self._chunk(i //self.chunk_len)[0][i % self.chunk_len]
+
+  def pix(self, i):
+    """ Returns position/orientation of the pixels of frame `i`
+    """
+    if i < 0:
+      i += len(self.index)
+    return self._chunk(i //self.chunk_len)[1][i % self.chunk_len]
+
+  def slice(self, start=0, stop=None, pix=slice(None), ch=slice(None)):
+    """ Returns frames `start` to `stop` (excl.) as array (time x pixel x
+        channel), restricted to pixels `pix` and channels `ch`; only the
+        chunks in the range are touched
+    """
+    n = len(self.index)
+    stop = n if stop is None else min(stop, n)
+    parts = []
+    i = start
+    while i < stop:
+      iCh = i //self.chunk_len
+      j0 = i % self.chunk_len
+      j1 = min(self.chunk_len, j0 +stop -i)
+      parts.append(self._chunk(iCh)[0][j0:j1, pix, ch])
+      i += j1 -j0
+    if not parts:
+      return np.zeros((0, self.n_pix, self.n_spect), dtype=np.uint16)[:, pix, ch]
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+  @property
+  def times(self):
+    """ Times of the frames as epoch [s]
+    """
+    return np.array([e["t"] for e in self.index], dtype=np.float64)
+
+  def select(self, t0=None, t1=None, **match):
+    """ Returns the indices of the frames taken between `t0` and `t1`
+        (epoch [s]) whose index entries equal the values in `match`
+    """
+    t = self.times
+    ok = np.ones(len(t), dtype=bool)
+    if t0 is not None:
+      ok &= t >= t0
+    if t1 is not None:
+      ok &= t < t1
+    for k, v in match.items():
+      ok &= np.array([e.get(k) == v for e in self.index], dtype=bool)
+    return np.flatnonzero(ok)
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _chunk(self, k, create=False):
+    if k in self._chunks:
+      return self._chunks[k]
+    fSp = os.path.join(self.path, "spect_{0:06d}.npy".format(k))
+    fPx = os.path.join(self.path, "pix_{0:06d}.npy".format(k))
+    if os.path.exists(fSp):
+      mode = "r" if self.readonly else "r+"
+      sp = np.load(fSp, mmap_mode=mode)
+      px = np.load(fPx, mmap_mode=mode)
+    elif create:
+      sp = np.lib.format.open_memmap(fSp, mode="w+", dtype="<u2",
+                                     shape=(self.chunk_len, self.n_pix,
+                                            self.n_spect))
+      px = np.lib.format.open_memmap(fPx, mode="w+", dtype="<f4",
+                                     shape=(self.chunk_len, self.n_pix,
+                                            N_PIX_VALS))
+    else:
+      raise IOError("Chunk {0} of `{1}` is missing".format(k, self.path))
+    if len(self._chunks) >= 8:
+      # Only keep a few chunks mapped
+      self._chunks.pop(next(iter(self._chunks)))
+    self._chunks[k] = (sp, px)
+    return sp, px
+
+  def _setWavelengths(self, nm):
+    self.meta["wavelengths_nm"] = [float(v) for v in nm]
+    with open(os.path.join(self.path, META_FILE), "w") as f:
+      json.dump(self.meta, f)
+
+# ----------------------------------------------------------------------------
+def header_time(hdr):
+  """ Returns the time in the header of a scan (`date_yyyymmdd`,
+      `time_hhmmss`, local time) as epoch [s]
+  """
+  y, mo, d = hdr["date_yyyymmdd"]
+  h, mi, s = hdr["time_hhmmss"]
+  return time.mktime((y, mo, d, h, mi, s, 0, 0, -1))
+
+def _toJSON(v):
+  if isinstance(v, np.generic):
+    return v.item()
+  if isinstance(v, np.ndarray):
+    return v.tolist()
+  raise TypeError(type(v))
+
+def import_pickles(fnames, path, chunk_len=DEF_CHUNK_LEN):
+  """ Appends recordings saved as pickled header dicts with `SpectImg` and
+      `wavelengths_nm` (as written by `loop_telescope.ipynb`) to the store at
+      `path`, in order of their time; returns the `Recording`
+  """
+  import pickle
+  frames = []
+  for fn in fnames:
+    with open(fn, "rb") as f:
+      d = pickle.load(f)
+    frames.append((header_time(d), fn, d))
+  frames.sort(key=lambda x: x[0])
+  rec = None
+  for t, fn, d in frames:
+    cube = np.asarray(d["SpectImg"])
+    cube = cube.reshape(-1, cube.shape[-1])
+    if rec is None:
+      rec = Recording(path, cube.shape[0], cube.shape[1],
+                      d.get("wavelengths_nm"), chunk_len)
+    params = {k: d[k] for k in ("size_xy", "step_xy_deg") if k in d}
+    rec.append(cube, None, t, d.get("t_int_s"), source=os.path.basename(fn),
+               **params)
+  return rec
+
+# ----------------------------------------------------------------------------
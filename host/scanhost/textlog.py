@@ -0,0 +1,220 @@
+# ----------------------------------------------------------------------------
+# textlog.py
+# Streaming parser for the text line format written by `SpectImg`
+# (`h,N|{...}`, `w,0|{...}`, `p,N|{...}`, `c,_|...`), for files on disk or
+# a live serial stream
+#
+# The spectra (`spect_au`) are not parsed line by line with `json`; the
+# number lists of all pixel lines in a chunk are joined and converted by a
+# single call of NumPy's tokenizer into a preallocated block.
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import ast
+import numpy as np
+from scanhost.client import ScanResult
+
+DEF_CHUNK     = 1 << 20
+DEF_N_PIX     = 1024    # initial number of pixels, if there is no header
+
+_KEY_SPECT    = b"'spect_au':"
+_KEY_XY       = b"'xy':"
+_KEYS_ORI     = (b"'head_deg':", b"'pitch_deg':", b"'roll_deg':")
+
+# ----------------------------------------------------------------------------
+class TextParser(object):
+  """Parses the text format in chunks of any size (`feed`); a line split
+     between two chunks is kept until the rest arrives. Pixels go into the
+     `ScanResult` `result`, which is allocated as soon as the scan size is
+     known from the header (or grown, if the header is missing)."""
+
+  def __init__(self, n_spect=None):
+    self.header = {}
+    self.wavelengths_nm = None
+    self.comments = []
+    self.result = None
+    self.n_lines = 0
+    self.n_bad = 0
+    self._nSpect = n_spect
+    self._rest = b""
+
+  def feed(self, data):
+    """ Parses all complete lines in `data` (`bytes`); returns the number
+        of pixels added
+    """
+    buf = self._rest +data if self._rest else data
+    k = buf.rfind(b"\n")
+    if k < 0:
+      self._rest = buf
+      return 0
+    self._rest = buf[k +1:]
+    return self._parseLines(buf[:k].split(b"\n"))
+
+  def close(self):
+    """ Parses what is left (a last line w/o line feed) and returns the
+        `ScanResult`, trimmed to the pixels received if there was no header
+    """
+    if self._rest.strip():
+      self._parseLines([self._rest])
+    self._rest = b""
+    res = self.result
+    if res is not None:
+      res.header.update(self.header)
+      if "n_pix" not in self.header:
+        n = int(np.flatnonzero(res.received)[-1]) +1 if res.n_received else 0
+        res.cube = res.cube[:n]
+        res.pix = res.pix[:n]
+        res.received = res.received[:n]
+        res.header["n_pix"] = n
+      res.wavelengths_nm = self.wavelengths_nm
+    return res
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _parseLines(self, lines):
+    iPix = []
+    spect = []
+    info = []
+    for ln in lines:
+      if len(ln) < 4 or ln[1:2] != b",":
+        continue
+      self.n_lines += 1
+      kind = ln[:1]
+      if kind == b"p":
+        try:
+          iBar = ln.index(b"|")
+          i = int(ln[2:iBar])
+          j = ln.index(b"[", ln.index(_KEY_SPECT, iBar)) +1
+          s = ln[j:ln.index(b"]", j)]
+          vals = [_between(ln, _KEY_XY, iBar)]
+          for key in _KEYS_ORI:
+            vals.append(_value(ln, key, iBar))
+        except ValueError:
+          self.n_bad += 1
+          continue
+        iPix.append(i)
+        spect.append(s)
+        info.append(b",".join(vals))
+      elif kind == b"h" or kind == b"w":
+        self._parseMeta(kind, ln)
+      elif kind == b"c":
+        self.comments.append(ln[ln.find(b"|") +1:].rstrip().decode(errors="replace"))
+    if iPix:
+      return self._store(iPix, spect, info)
+    return 0
+
+  def _parseMeta(self, kind, ln):
+    try:
+      d = ast.literal_eval(ln[ln.index(b"|") +1:].strip().decode())
+    except (ValueError, SyntaxError):
+      self.n_bad += 1
+      return
+    if kind == b"w":
+      self.wavelengths_nm = np.array(d["wavelength_nm"], dtype=np.float32)
+      return
+    self.header.update(d)
+    if "n_spect" in d:
+      self._nSpect = d["n_spect"]
+    if "size_xy" in d and "step_xy_deg" in d:
+      dx, dy = d["size_xy"]
+      sx, sy = d["step_xy_deg"]
+      self.header["n_pix"] = int((dx //sx +1) *(dy //sy +1))
+      self._alloc(self.header["n_pix"])
+
+  def _alloc(self, n_pix):
+    hdr = dict(self.header, n_pix=n_pix, n_spect=self._nSpect)
+    res = ScanResult(hdr, self.wavelengths_nm)
+    old = self.result
+    if old is not None:
+      n = min(len(old.received), n_pix)
+      res.cube[:n] = old.cube[:n]
+      res.pix[:n] = old.pix[:n]
+      res.received[:n] = old.received[:n]
+    self.result = res
+
+  def _store(self, iPix, spect, info):
+    n = len(iPix)
+    try:
+      sp = np.fromstring(b",".join(spect), dtype=np.int64, sep=",")
+    except ValueError:
+      sp = None
+    if self._nSpect is None:
+      self._nSpect = len(np.fromstring(spect[0], dtype=np.float64, sep=","))
+    nSpect = self._nSpect
+    if sp is None or len(sp) != n *nSpect:
+      # Non-integer values or incomplete lines; parse line by line
+      sp, ok = self._storeSlow(spect, nSpect)
+      iPix = [i for i, isOk in zip(iPix, ok) if isOk]
+      info = [s for s, isOk in zip(info, ok) if isOk]
+      n = len(iPix)
+      if n == 0:
+        return 0
+    inf = np.fromstring(b",".join(info).replace(b"None", b"nan"),
+                        dtype=np.float32, sep=",").reshape(n, -1)
+    idx = np.asarray(iPix)
+    res = self.result
+    if res is None or idx.max() >= len(res.received):
+      m = len(res.received) if res is not None else DEF_N_PIX
+      while m <= idx.max():
+        m *= 2
+      self._alloc(m)
+      res = self.result
+    res.cube[idx] = np.clip(sp, 0, 0xFFFF).reshape(n, nSpect)
+    res.pix[idx] = inf
+    res.received[idx] = True
+    return n
+
+  def _storeSlow(self, spect, n_spect):
+    rows = []
+    ok = []
+    for s in spect:
+      try:
+        v = np.fromstring(s, dtype=np.float64, sep=",")
+      except ValueError:
+        v = ()
+      isOk = len(v) == n_spect
+      if isOk:
+        rows.append(np.clip(np.rint(v), 0, 0xFFFF).astype(np.uint16))
+      else:
+        self.n_bad += 1
+      ok.append(isOk)
+    sp = np.concatenate(rows) if rows else np.zeros(0, dtype=np.uint16)
+    return sp, ok
+
+# ----------------------------------------------------------------------------
+def _between(ln, key, start):
+  # Contents of the list `[...]` that follows `key`
+  j = ln.index(b"[", ln.index(key, start)) +1
+  return ln[j:ln.index(b"]", j)]
+
+def _value(ln, key, start):
+  # Scalar value that follows `key`, up to the next `,` or `}`
+  j = ln.index(key, start) +len(key)
+  k = ln.find(b",", j)
+  m = ln.find(b"}", j)
+  if k < 0 or 0 <= m < k:
+    k = m
+  return ln[j:k].strip()
+
+# ----------------------------------------------------------------------------
+def parse_stream(stream, n_spect=None, chunk_size=DEF_CHUNK):
+  """ Reads from `stream` (any object with `read(n)`, e.g. a file opened in
+      binary mode or a `serial.Serial`) until it returns no more data;
+      returns the `ScanResult`, or None if there were no pixels or header
+  """
+  p = TextParser(n_spect)
+  while True:
+    data = stream.read(chunk_size)
+    if not data:
+      break
+    p.feed(data)
+  return p.close()
+
+def parse_file(fname, n_spect=None, chunk_size=DEF_CHUNK):
+  """ Parses a file written by `SpectImg`; returns the `ScanResult`
+  """
+  with open(fname, "rb") as f:
+    return parse_stream(f, n_spect, chunk_size)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,192 @@
+# ----------------------------------------------------------------------------
+# tileserver.py
+# Local HTTP server for the pyramids (see `pyramid.py`) below a directory;
+# viewers fetch only the tiles on screen and the spectra of single pixels
+#
+#   python -m scanhost.tileserver <root> [--port 8000]
+#
+#   GET /                                   names of the pyramids (JSON)
+#   GET /<name>/meta.json                   levels, tile size, bands, ...
+#   GET /<name>/<level>/<ty>/<tx>.png       RGB tile (band means)
+#   GET /<name>/spectrum/<level>/<row>/<col>  spectrum of a pixel (JSON)
+#
+# `<name>` is the path of a pyramid relative to `<root>` (e.g. the frames
+# of a recording, `rec/frame_000012`). Responses carry an `ETag` that
+# changes when a pyramid is rebuilt, and may be cached by the browser.
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import os
+import re
+import sys
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from scanhost import pyramid
+
+DEF_PORT      = 8000
+MAX_AGE_S     = 3600
+CACHE_SIZE    = 1024    # encoded tiles kept in memory
+
+_RE_TILE      = re.compile(r"^/(.+)/(\d+)/(\d+)/(\d+)\.png$")
+_RE_SPECTRUM  = re.compile(r"^/(.+)/spectrum/(\d+)/(\d+)/(\d+)$")
+_RE_META      = re.compile(r"^/(.+)/meta\.json$")
+
+# ----------------------------------------------------------------------------
+class TileStore(object):
+  """Opens the pyramids below `root` on demand and keeps the most recently
+     requested tiles as PNG."""
+
+  def __init__(self, root, cache_size=CACHE_SIZE):
+    self.root = os.path.realpath(root)
+    self.cache_size = cache_size
+    self._pyrs = {}
+    self._tiles = OrderedDict()
+    self._lock = threading.Lock()
+
+  def names(self):
+    """ Returns the names of all pyramids below `root`
+    """
+    names = []
+    for dirpath, dirnames, fnames in os.walk(self.root):
+      if pyramid.META_FILE in fnames:
+        dirnames[:] = []
+        names.append(os.path.relpath(dirpath, self.root).replace(os.sep, "/"))
+    return sorted(names)
+
+  def get(self, name):
+    """ Returns the `Pyramid` `name`; reopened if it was rebuilt
+    """
+    path = os.path.realpath(os.path.join(self.root, name))
+    if not path.startswith(self.root +os.sep):
+      raise KeyError(name)
+    fMeta = os.path.join(path, pyramid.META_FILE)
+    try:
+      mtime = os.stat(fMeta).st_mtime
+    except OSError:
+      raise KeyError(name)
+    with self._lock:
+      p = self._pyrs.get(path)
+      if p is None or p[0] != mtime:
+        p = (mtime, pyramid.Pyramid(path))
+        self._pyrs[path] = p
+    return p[1]
+
+  def tile_png(self, pyr, level, ty, tx):
+    key = (pyr.id, level, ty, tx)
+    with self._lock:
+      png = self._tiles.get(key)
+      if png is not None:
+        self._tiles.move_to_end(key)
+        return png
+    png = pyr.tile_png(level, ty, tx)
+    with self._lock:
+      self._tiles[key] = png
+      if len(self._tiles) > self.cache_size:
+        self._tiles.popitem(last=False)
+    return png
+
+# ----------------------------------------------------------------------------
+class TileHandler(BaseHTTPRequestHandler):
+  """Request handler; `server.tiles` is the `TileStore`."""
+
+  def do_GET(self):
+    tiles = self.server.tiles
+    url = self.path.split("?")[0]
+    try:
+      if url in ("", "/"):
+        return self._send(json.dumps(tiles.names()).encode(), "application/json")
+      m = _RE_TILE.match(url)
+      if m:
+        pyr = tiles.get(m.group(1))
+        level, ty, tx = (int(v) for v in m.groups()[1:])
+        etag = '"{0}-{1}-{2}-{3}"'.format(pyr.id, level, ty, tx)
+        if self._notModified(etag):
+          return
+        return self._send(tiles.tile_png(pyr, level, ty, tx), "image/png", etag)
+      m = _RE_SPECTRUM.match(url)
+      if m:
+        pyr = tiles.get(m.group(1))
+        level, row, col = (int(v) for v in m.groups()[1:])
+        etag = '"{0}-s{1}-{2}-{3}"'.format(pyr.id, level, row, col)
+        if self._notModified(etag):
+          return
+        d = {"level": level, "row": row, "col": col,
+             "wavelengths_nm": pyr.wavelengths_nm,
+             "counts": pyr.spectrum(row, col, level).tolist()}
+        return self._send(json.dumps(d).encode(), "application/json", etag)
+      m = _RE_META.match(url)
+      if m:
+        pyr = tiles.get(m.group(1))
+        etag = '"{0}"'.format(pyr.id)
+        if self._notModified(etag):
+          return
+        d = dict(pyr.meta, n_tiles=[pyr.n_tiles(k) for k in range(pyr.n_levels)])
+        return self._send(json.dumps(d).encode(), "application/json", etag)
+      self.send_error(404)
+    except (KeyError, IndexError):
+      self.send_error(404)
+
+  def log_message(self, fmt, *args):
+    if self.server.verbose:
+      BaseHTTPRequestHandler.log_message(self, fmt, *args)
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _notModified(self, etag):
+    if self.headers.get("If-None-Match") != etag:
+      return False
+    self.send_response(304)
+    self.send_header("ETag", etag)
+    self.end_headers()
+    return True
+
+  def _send(self, body, ctype, etag=None):
+    self.send_response(200)
+    self.send_header("Content-Type", ctype)
+    self.send_header("Content-Length", str(len(body)))
+    self.send_header("Access-Control-Allow-Origin", "*")
+    if etag:
+      self.send_header("ETag", etag)
+      self.send_header("Cache-Control", "max-age={0}".format(MAX_AGE_S))
+    else:
+      self.send_header("Cache-Control", "no-cache")
+    self.end_headers()
+    self.wfile.write(body)
+
+def make_server(root, host="127.0.0.1", port=DEF_PORT, verbose=False):
+  """ Returns the server for the pyramids below `root` (call its
+      `serve_forever`, e.g. in a thread)
+  """
+  srv = ThreadingHTTPServer((host, port), TileHandler)
+  srv.daemon_threads = True
+  srv.tiles = TileStore(root)
+  srv.verbose = verbose
+  return srv
+
+# ----------------------------------------------------------------------------
+def main(argv=None):
+  ap = argparse.ArgumentParser(description="Serves tiles and spectra of the "
+                               "pyramids below a directory")
+  ap.add_argument("root")
+  ap.add_argument("--host", default="127.0.0.1")
+  ap.add_argument("--port", type=int, default=DEF_PORT)
+  ap.add_argument("-v", "--verbose", action="store_true")
+  args = ap.parse_args(argv)
+  srv = make_server(args.root, args.host, args.port, args.verbose)
+  print("Serving `{0}` on http://{1}:{2}/".format(args.root, args.host,
+                                                  srv.server_address[1]))
+  try:
+    srv.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  srv.server_close()
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
+
+# ----------------------------------------------------------------------------
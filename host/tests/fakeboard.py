@@ -0,0 +1,164 @@
+# ----------------------------------------------------------------------------
+# fakeboard.py
+# Raw REPL of a MicroPython board (raw-paste mode) for the tests of
+# `scanhost.pyboard`; the pasted code runs with CPython in a thread, with
+# `ubinascii`, `uos` and `sys.stdin`/`print` shimmed
+#
+# The MIT License (MIT)
+# Copyright (c) 2026 Thomas Euler
+# 2026-10-19, v1
+# ----------------------------------------------------------------------------
+import os
+import time
+import types
+import zlib
+import binascii
+import builtins
+import threading
+
+WINDOW      = 128     # raw-paste window [bytes]
+OUT_CAP     = 2048    # output buffered before `print` blocks [bytes]
+
+# ----------------------------------------------------------------------------
+class FakeBoard(object):
+  """Host end of the serial port (`read`, `write`, `inWaiting`) of a board
+     in the raw REPL; `on_print(bytes)` may alter each printed line. Data
+     written by the host arrives after `latency_s`."""
+
+  def __init__(self, window=WINDOW, out_cap=OUT_CAP, on_print=None,
+               latency_s=0):
+    self.window = window
+    self.out_cap = out_cap
+    self.on_print = on_print
+    self.latency_s = latency_s
+    self.n_writes = 0
+    self.n_interrupts = 0
+    self.n_bytes_out = 0
+    self._cond = threading.Condition()
+    self._out = bytearray()
+    self._in = bytearray()
+    self._code = bytearray()
+    self._req = bytearray()
+    self._mode = "idle"
+    self._remain = 0
+    self._intr = False
+    ub = types.SimpleNamespace(a2b_base64=binascii.a2b_base64,
+                               b2a_base64=binascii.b2a_base64,
+                               crc32=zlib.crc32)
+    stdin = types.SimpleNamespace(readline=self._readline)
+    self._mods = {"ubinascii": ub, "uos": os,
+                  "sys": types.SimpleNamespace(stdin=stdin)}
+    bi = dict(vars(builtins), print=self._print, __import__=self._import)
+    self.globals = {"__builtins__": bi}
+    with self._cond:
+      self._emit(b">")
+
+  # Serial port
+  def write(self, data):
+    if self.latency_s:
+      time.sleep(self.latency_s)
+    with self._cond:
+      self.n_writes += 1
+      for c in bytes(data):
+        self._feed(c)
+      self._cond.notify_all()
+    return len(data)
+
+  def read(self, size=1, timeout=2):
+    t0 = time.time()
+    with self._cond:
+      while len(self._out) < size and time.time() -t0 < timeout:
+        self._cond.wait(0.05)
+      data = bytes(self._out[:size])
+      del self._out[:size]
+      self._cond.notify_all()
+    return data
+
+  def inWaiting(self):
+    with self._cond:
+      return len(self._out)
+
+  def close(self):
+    pass
+
+  # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+  def _emit(self, data):
+    self._out += data
+    self.n_bytes_out += len(data)
+    self._cond.notify_all()
+
+  def _feed(self, c):
+    if self._mode == "idle":
+      self._req.append(c)
+      if self._req.endswith(b"\x05A\x01"):
+        del self._req[:]
+        self._code = bytearray()
+        self._remain = self.window
+        self._mode = "paste"
+        self._emit(b"R\x01" +self.window.to_bytes(2, "little"))
+    elif self._mode == "paste":
+      if c == 0x04:
+        self._emit(b"\x04")
+        self._mode = "run"
+        self._intr = False
+        del self._in[:]
+        code = bytes(self._code).decode()
+        threading.Thread(target=self._run, args=(code,), daemon=True).start()
+        return
+      self._code.append(c)
+      self._remain -= 1
+      if self._remain == 0:
+        self._remain = self.window
+        self._emit(b"\x01")
+    elif c == 0x03:
+      self._intr = True
+      self.n_interrupts += 1
+    else:
+      self._in.append(c)
+
+  def _run(self, code):
+    err = b""
+    try:
+      exec(code, self.globals)
+    except KeyboardInterrupt:
+      err = b"Traceback (most recent call last):\r\nKeyboardInterrupt: \r\n"
+    except Exception as e:
+      err = ("Traceback (most recent call last):\r\n{0}: {1}\r\n"
+             .format(type(e).__name__, e).encode())
+    with self._cond:
+      self._mode = "idle"
+      self._emit(b"\x04" +err +b"\x04>")
+
+  def _check(self):
+    # Called with the lock held
+    if self._intr:
+      self._intr = False
+      raise KeyboardInterrupt
+
+  def _readline(self):
+    with self._cond:
+      while b"\n" not in self._in:
+        self._check()
+        self._cond.wait(0.05)
+      i = self._in.index(b"\n") +1
+      ln = bytes(self._in[:i]).decode()
+      del self._in[:i]
+      return ln
+
+  def _print(self, *args, sep=" ", end="\n"):
+    data = (sep.join(str(a) for a in args) +end).replace("\n", "\r\n").encode()
+    if self.on_print is not None:
+      data = self.on_print(data)
+    with self._cond:
+      while len(self._out) > self.out_cap:
+        self._check()
+        self._cond.wait(0.05)
+      self._check()
+      self._emit(data)
+
+  def _import(self, name, *args, **kwargs):
+    if name in self._mods:
+      return self._mods[name]
+    return builtins.__import__(name, *args, **kwargs)
+
+# ----------------------------------------------------------------------------
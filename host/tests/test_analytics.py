@@ -0,0 +1,88 @@
+# ----------------------------------------------------------------------------
+# test_analytics.py
+# Out-of-core spectral analytics of `scanhost.analytics`
+# ----------------------------------------------------------------------------
+import numpy as np
+from scanhost import analytics, store
+
+# ----------------------------------------------------------------------------
+def _spectra(n=3000, n_spect=12, seed=0):
+  # Mixtures of 3 non-negative endmembers plus noise, with a large offset
+  rng = np.random.default_rng(seed)
+  h = np.abs(rng.normal(size=(3, n_spect))) +0.1
+  w = rng.random((n, 3))
+  return 1000. +w @ h *100 +rng.normal(scale=0.5, size=(n, n_spect)), h
+
+def test_pca():
+  # Same as the covariance of all spectra at once, for any chunking
+  x, _ = _spectra()
+  ref = np.cov(x, rowvar=False)
+  val, vec = np.linalg.eigh(ref)
+  for chunk in (x.shape[0], 1000, 333):
+    p = analytics.PCA(4).fit(x.reshape(30, 100, -1), chunk=chunk, n_jobs=2)
+    assert p.n == len(x)
+    assert np.allclose(p.mean, x.mean(axis=0))
+    assert np.allclose(p.cov, ref, rtol=1e-8, atol=1e-8)
+    assert np.allclose(p.explained_variance, val[::-1][:4])
+    # Components up to their sign
+    assert np.allclose(np.abs(p.components @ vec[:, ::-1][:, :4]), np.eye(4),
+                       atol=1e-6)
+  s = p.transform(x, chunk=500)
+  assert s.shape == (len(x), 4)
+  assert np.allclose(s, (x -x.mean(axis=0)) @ p.components.T)
+  assert np.allclose(p.inverse_transform(s), x, atol=3)
+
+def test_pca_recording(tmp_path):
+  x, _ = _spectra(n=400)
+  with store.Recording(str(tmp_path /"rec"), 40, x.shape[1], chunk_len=3) as rec:
+    for f in np.rint(x).reshape(10, 40, -1):
+      rec.append(f)
+    p = analytics.PCA().fit([rec, np.rint(x)], chunk=100)
+  xx = np.concatenate([np.rint(x)] *2)
+  assert p.n == 800
+  assert np.allclose(p.cov, np.cov(xx, rowvar=False))
+
+def test_pca_recording_views(tmp_path, monkeypatch):
+  # Blocks of a `Recording` are views of its memory-mapped chunks, for any
+  # block size
+  x, _ = _spectra(n=400)
+  seen = []
+  pmap = analytics._pmap
+
+  def _pmapSpy(func, bl, n_jobs):
+    seen.extend(x for _, _, x in bl)
+    return pmap(func, bl, n_jobs)
+
+  monkeypatch.setattr(analytics, "_pmap", _pmapSpy)
+  with store.Recording(str(tmp_path /"rec"), 40, x.shape[1], chunk_len=3) as rec:
+    for f in np.rint(x).reshape(10, 40, -1):
+      rec.append(f)
+    for chunk in (1, 100, 1000):
+      del seen[:]
+      p = analytics.PCA().fit(rec, chunk=chunk)
+      assert p.n == 400
+      assert seen and all(isinstance(b, np.memmap) for b in seen)
+      assert sum(len(b) for b in seen) == 400
+
+def test_unmix():
+  x, h = _spectra(n=2000)
+  x = x -1000
+  w = analytics.unmix(x, h, n_iter=500)
+  assert np.abs(w @ h -x).mean() < 0.2 *np.abs(x).mean()
+  end = analytics.nmf(np.clip(x, 0, None), 3, n_epochs=4, batch=500)
+  assert end.shape == (3, x.shape[1]) and np.allclose(end.max(axis=1), 1)
+
+def test_spectral_angles():
+  rng = np.random.default_rng(2)
+  refs = rng.random((3, 8))
+  x = np.concatenate([refs *5, rng.random((10, 8)), np.zeros((1, 8))])
+  ang = analytics.spectral_angles(x, refs, chunk=4)
+  assert np.allclose(np.diag(ang[:3]), 0, atol=1e-6)
+  y = x[3:-1]
+  cos = (y @ refs.T) /np.outer(np.linalg.norm(y, axis=1), np.linalg.norm(refs, axis=1))
+  assert np.allclose(ang[3:-1], np.arccos(np.clip(cos, -1, 1)))
+  assert np.all(np.isnan(ang[-1]))
+  lbl = analytics.sam_classify(x, refs, max_angle=0.01)
+  assert list(lbl[:3]) == [0, 1, 2] and lbl[-1] == -1
+
+# ----------------------------------------------------------------------------
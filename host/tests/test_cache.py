@@ -0,0 +1,61 @@
+# ----------------------------------------------------------------------------
+# test_cache.py
+# Product cache of `scanhost.cache`
+# ----------------------------------------------------------------------------
+import os
+import numpy as np
+import pytest
+from scanhost import cache
+
+# ----------------------------------------------------------------------------
+def _arr(v, n=1000):
+  return np.full(n, v, dtype=np.float64)
+
+def test_put_get(tmp_path):
+  pc = cache.ProductCache(str(tmp_path))
+  a = _arr(1.)
+  b = pc.put("k1", a)
+  # A copy is stored; the caller's array stays writable
+  assert a.flags.writeable and not b.flags.writeable
+  a[:] = 2.
+  assert np.array_equal(pc.get("k1"), _arr(1.))
+  assert pc.n_hits_mem == 1
+  assert pc.get("k2") is None and pc.n_misses == 1
+
+def test_disk_hit(tmp_path):
+  cache.ProductCache(str(tmp_path)).put("k1", _arr(3.))
+  pc = cache.ProductCache(str(tmp_path))
+  a = pc.get("k1")
+  assert pc.n_hits_disk == 1 and np.array_equal(a, _arr(3.))
+  # Read-only, as it is shared via the memory cache
+  with pytest.raises(ValueError):
+    a[0] = 0
+  assert pc.get("k1") is a and pc.n_hits_mem == 1
+
+def test_eviction(tmp_path):
+  # 8000 bytes per product; RAM holds 2, disk 3 products
+  pc = cache.ProductCache(str(tmp_path), max_disk=3 *8200, max_mem=2 *8000)
+  for i in range(4):
+    pc.put("k{0}".format(i), _arr(i))
+  pc.get("k1")
+  pc.put("k4", _arr(4.))
+  assert pc.n_bytes[0] == 2 *8000 and pc.n_bytes[1] <= 3 *8200
+  # Least recently used first: k0 (never used again), then k2
+  files = {n[:-4] for _, _, ns in os.walk(str(tmp_path)) for n in ns}
+  assert files == {"k1", "k3", "k4"}
+  assert pc.get("k2") is None
+  assert np.array_equal(pc.get("k1"), _arr(1.))
+
+def test_products(tmp_path):
+  pc = cache.ProductCache(str(tmp_path))
+  cube = np.arange(24, dtype=np.uint16).reshape(2, 3, 4)
+  nm = np.array([400., 500., 600., 700.])
+  img = cache.mono(cube, wavelengths_nm=nm, cache=pc)
+  ref = np.trapezoid(cube.astype(np.float64), nm, axis=-1)
+  assert np.allclose(img, ref /ref.max())
+  assert cache.mono(cube, wavelengths_nm=nm, cache=pc) is img
+  # Another recipe is another product
+  img2 = cache.mono(cube, wavelengths_nm=nm, normalize=False, cache=pc)
+  assert np.allclose(img2, ref)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,94 @@
+# ----------------------------------------------------------------------------
+# test_catalog.py
+# SQLite catalog of recordings of `scanhost.catalog`
+# ----------------------------------------------------------------------------
+import time
+import pickle
+import numpy as np
+import pytest
+from scanhost import catalog, store
+from scanhost.client import ScanResult
+
+# ----------------------------------------------------------------------------
+def _t(h, day=1):
+  return time.mktime((2026, 6, day, h, 0, 0, 0, 0, -1))
+
+def _tree(root):
+  # A store with a frame per 3 hours, a `.npz` and a pickle of the notebooks
+  with store.Recording(str(root /"a" /"rec"), 4, 3) as rec:
+    for i in range(8):
+      rec.append(np.full((4, 3), 100 *i), t=_t(3 *i), t_int_s=0.1 *(1 +i % 2),
+                 size_xy=[2, 2], step_xy_deg=[1, 1])
+  hdr = {"n_pix": 2, "n_spect": 3, "size_xy": [4, 0], "step_xy_deg": [2, 1],
+         "t_int_s": 0.5, "date_yyyymmdd": [2026, 6, 2], "time_hhmmss": [12, 0, 0]}
+  res = ScanResult(hdr, None)
+  res.cube[:] = 4095
+  res.save(str(root /"b.npz"))
+  with open(str(root /"a" /"scan_2026-6-3_22:30:0.pkl"), "wb") as f:
+    pickle.dump({"SpectImg": np.ones((2, 2, 3)), "t_int_s": 0.5}, f)
+
+def test_update_query(tmp_path):
+  _tree(tmp_path)
+  with catalog.Catalog(str(tmp_path /"cat.sqlite")) as cat:
+    assert cat.update(str(tmp_path)) == 10
+    assert len(cat) == 10
+    # Nothing changed, nothing read
+    assert cat.update(str(tmp_path)) == 0
+
+    rows = cat.query(t0=_t(6), t1=_t(12))
+    assert [r["i_frame"] for r in rows] == [2, 3]
+    assert np.array_equal(cat.load(rows[1]), np.full((4, 3), 300))
+    # Night, over midnight
+    rows = cat.query(tod=(21, 3))
+    assert sorted(r["t"] for r in rows) == [_t(0), _t(21), _t(22, 3) +1800]
+    rows = cat.query(t_int_min=0.2, t_int_max=0.2)
+    assert [r["i_frame"] for r in rows] == [1, 3, 5, 7]
+    rows = cat.query(size_xy=(4, 0), step_xy_deg=(2, 1))
+    assert len(rows) == 1 and rows[0]["frac_sat"] == 1.
+    assert rows[0]["t"] == _t(12, 2)
+
+    # Only the frames appended to the store are added
+    with store.Recording(str(tmp_path /"a" /"rec")) as rec:
+      rec.append(np.zeros((4, 3)), t=_t(0, 5), t_int_s=0.1)
+    assert cat.update(str(tmp_path)) == 1
+    assert len(cat) == 11
+
+def test_npy_text(tmp_path):
+  # `.npy` of `run_spectrometer.save` and text files of `SpectImg`, but not
+  # `.npy` arrays w/o header
+  hdr = {"size_xy": [2, 0], "step_xy_deg": [1, 1], "t_int_s": 0.3,
+         "date_yyyymmdd": [2026, 6, 4], "time_hhmmss": [8, 0, 0]}
+  with open(str(tmp_path /"s.npy"), "wb") as f:
+    np.save(f, np.array(hdr, dtype=object), allow_pickle=True)
+    np.save(f, np.full((1, 3, 4), 7, dtype=np.uint16))
+    np.save(f, np.linspace(400., 700., 4))
+  np.save(str(tmp_path /"spect_0.npy"), np.zeros((3, 3, 4), dtype=np.uint16))
+  lines = ["h,1|{'date_yyyymmdd': [2026, 6, 5], 'time_hhmmss': [9, 0, 0]}",
+           "h,2|{'size_xy': [2, 0], 'step_xy_deg': [1, 1], 'n_spect': 4, "
+           "'t_int_s': 0.3}"]
+  for i in range(3):
+    d = {"xy": [i, 0], "head_deg": 0.0, "pitch_deg": 0.0, "roll_deg": 0.0,
+         "spect_au": [9] *4}
+    lines.append("p,{0}|{1}".format(i, d))
+  (tmp_path /"s.sim").write_text("\n".join(lines) +"\n")
+  with catalog.Catalog(str(tmp_path /"cat.sqlite")) as cat:
+    assert cat.update(str(tmp_path)) == 2
+    rows = cat.query(order="t DESC")
+    assert [r["path"][-5:] for r in rows] == ["s.sim", "s.npy"]
+    assert rows[1]["t"] == _t(8, 4) and rows[1]["n_pix"] == 3
+    assert np.array_equal(cat.load(rows[0]), np.full((3, 4), 9))
+    assert np.array_equal(cat.load(rows[1]).reshape(3, 4), np.full((3, 4), 7))
+
+def test_order(tmp_path):
+  _tree(tmp_path)
+  with catalog.Catalog(str(tmp_path /"cat.sqlite")) as cat:
+    cat.update(str(tmp_path))
+    rows = cat.query(t1=_t(12), order="t_int_s desc, t")
+    assert [r["i_frame"] for r in rows] == [1, 3, 0, 2]
+    for order in ("t; DROP TABLE frames", "t DESC DESC", "(SELECT 1)",
+                  "t,", "unknown"):
+      with pytest.raises(ValueError):
+        cat.query(order=order)
+    assert len(cat) == 10
+
+# ----------------------------------------------------------------------------
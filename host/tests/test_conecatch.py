@@ -0,0 +1,36 @@
+# ----------------------------------------------------------------------------
+# test_conecatch.py
+# Opsin catches and RGB renderings of `scanhost.conecatch`
+# ----------------------------------------------------------------------------
+import numpy as np
+from scanhost import conecatch
+
+# ----------------------------------------------------------------------------
+def test_package_sets():
+  # The opsin sets come with the package
+  assert {"human_SML", "mouse_SM"} <= set(conecatch.available_sets())
+  ops = conecatch.get_set("human_SML")
+  assert ops.curves.shape == (3, len(ops.nm))
+
+def test_project():
+  # Equals the integral of spectrum x resampled sensitivity
+  rng = np.random.default_rng(1)
+  nm = np.linspace(350., 750., 120)
+  cube = rng.integers(0, 4000, (5, 7, len(nm))).astype(np.uint16)
+  ops = conecatch.get_set()
+  c = conecatch.project(cube, nm)
+  assert c.shape == (5, 7, 3)
+  for k, curve in enumerate(ops.curves):
+    s = np.interp(nm, ops.nm, curve, left=0., right=0.)
+    ref = np.trapezoid(cube.astype(np.float64) *s, nm, axis=-1)
+    assert np.allclose(c[..., k], ref, rtol=1e-4)
+
+def test_to_rgb():
+  # Three longest wavelength opsins into blue, green and red
+  c = np.array([[1., 2., 4., 8.]])
+  rgb = conecatch.to_rgb(c, gain=[1., 4., 8., 16.])
+  assert np.allclose(rgb, [[0.5, 0.5, 0.5]])
+  rgb = conecatch.to_rgb(np.array([[1., 3.]]), gain=[2., 4.])
+  assert np.allclose(rgb, [[0., 0.75, 0.5]])
+
+# ----------------------------------------------------------------------------
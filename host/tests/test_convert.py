@@ -0,0 +1,128 @@
+# ----------------------------------------------------------------------------
+# test_convert.py
+# Conversion of legacy recordings by `scanhost.convert`
+# ----------------------------------------------------------------------------
+import os
+import json
+import numpy as np
+import pytest
+from scanhost import convert, grid
+from scanhost.client import ScanResult
+from scanhost.link import PATH_LR_ZIGZAG
+
+SIZE_XY = (30, 30)      # not a multiple of the step
+STEP_XY = (4, 4)
+N_SPECT = 3
+
+# ----------------------------------------------------------------------------
+def _image():
+  # Smooth image (rows x cols x n_spect), such that `auto` can tell the
+  # orientation of the rows
+  nx, ny = convert.grid_size({"size_xy": SIZE_XY, "step_xy_deg": STEP_XY})
+  y, x = np.mgrid[:ny, :nx]
+  img = 100 +10 *x +3 *y
+  return np.repeat(img[..., None], N_SPECT, axis=2).astype(np.uint16)
+
+def _scanOrder(img):
+  # Pixels in the order of the zigzag path
+  s = img.copy()
+  s[1::2] = s[1::2, ::-1]
+  return s.reshape(-1, img.shape[2])
+
+def _saveNpy(fname, cube):
+  # Like `save` of `run_spectrometer.ipynb`
+  hdr = {"size_xy": list(SIZE_XY), "step_xy_deg": list(STEP_XY)}
+  with open(fname, "wb") as f:
+    np.save(f, np.array(hdr, dtype=object), allow_pickle=True)
+    np.save(f, cube)
+    np.save(f, np.linspace(400., 700., N_SPECT))
+
+@pytest.mark.parametrize("flip", ["auto", "yes"])
+def test_zigzag_scan_order(tmp_path, flip):
+  img = _image()
+  src = str(tmp_path /"scan.npy")
+  _saveNpy(src, _scanOrder(img))
+  info = convert.convert_file(src, str(tmp_path /"scan.npz"), flip=flip)
+  assert info["flipped"] and info["order"] == "grid" and info["n_pix"] == 64
+  res = ScanResult.load(str(tmp_path /"scan.npz"))
+  assert np.array_equal(res.to_grid(), img)
+
+def test_zigzag_grid_order(tmp_path):
+  img = _image()
+  src = str(tmp_path /"scan.npy")
+  _saveNpy(src, img)
+  info = convert.convert_file(src, str(tmp_path /"scan.npz"))
+  assert not info["flipped"]
+  res = ScanResult.load(str(tmp_path /"scan.npz"))
+  assert np.array_equal(res.to_grid(), img)
+
+def test_zigzag_mismatch(tmp_path, monkeypatch):
+  # A grid that does not match the pixels fails the file
+  src = str(tmp_path /"scan.npy")
+  _saveNpy(src, _scanOrder(_image()))
+  gi = grid.GridIndex((9, 9), np.arange(64))
+  monkeypatch.setattr(grid, "index_from_path", lambda *args: gi)
+  with pytest.raises(ValueError):
+    convert.convert_file(src, str(tmp_path /"scan.npz"), flip="yes")
+
+def test_positions(tmp_path):
+  # Text file with the positions of the device; sorted into the grid
+  img = _image()
+  xy = grid.scan_path(PATH_LR_ZIGZAG, SIZE_XY, STEP_XY)
+  lines = ["h,2|{'size_xy': %s, 'step_xy_deg': %s, 'n_spect': %u}"
+           % (list(SIZE_XY), list(STEP_XY), N_SPECT)]
+  for i, s in enumerate(_scanOrder(img)):
+    d = {"xy": xy[i].tolist(), "head_deg": 0.0, "pitch_deg": 0.0,
+         "roll_deg": 0.0, "spect_au": s.tolist()}
+    lines.append("p,{0}|{1}".format(i, d))
+  src = tmp_path /"scan.txt"
+  src.write_text("\n".join(lines) +"\n")
+  info = convert.convert_file(str(src), str(tmp_path /"scan.npz"))
+  assert info["order"] == "grid"
+  res = ScanResult.load(str(tmp_path /"scan.npz"))
+  assert np.array_equal(res.cube.reshape(img.shape), img)
+
+def test_no_geometry(tmp_path):
+  # A bare image cannot be placed into a grid
+  src = str(tmp_path /"scan.npy")
+  np.save(src, _image())
+  with pytest.raises(ValueError):
+    convert.convert_file(src, str(tmp_path /"scan.npz"))
+  assert not os.path.exists(str(tmp_path /"scan.npz"))
+
+def test_convert_dir(tmp_path):
+  src = tmp_path /"src"
+  dst = tmp_path /"dst"
+  (src /"a").mkdir(parents=True)
+  img = _image()
+  _saveNpy(str(src /"s1.npy"), _scanOrder(img))
+  _saveNpy(str(src /"a" /"s2.npy"), img)
+  np.save(str(src /"a" /"bare.npy"), img)
+  (src /"notes.md").write_text("not a recording")
+  assert convert.convert_dir(str(src), str(dst), 1, verbose=False) == (2, 1)
+  for n in ("s1.npz", "a/s2.npz"):
+    assert np.array_equal(ScanResult.load(str(dst /n)).to_grid(), img)
+  assert not (dst /"a" /"bare.npz").exists()
+  fCkpt = dst /convert.CHECKPOINT
+  log = [json.loads(ln) for ln in fCkpt.read_text().splitlines()]
+  assert sorted((d["src"], d["ok"]) for d in log) == [
+    ("a/bare.npy", False), ("a/s2.npy", True), ("s1.npy", True)]
+
+  # Interrupted run: the record of `s1` is missing, the last line is cut
+  (dst /"s1.npz").unlink()
+  (dst /"a" /"s2.npz").unlink()
+  lines = [json.dumps(d) for d in log if d["src"] != "s1.npy"]
+  fCkpt.write_text("\n".join(lines) +"\n" +'{"src": "s1.n')
+  assert convert.convert_dir(str(src), str(dst), 1, verbose=False) == (1, 0)
+  assert (dst /"s1.npz").exists() and not (dst /"a" /"s2.npz").exists()
+
+  # Failed files only again on request
+  _saveNpy(str(src /"a" /"bare.npy"), img)
+  assert convert.convert_dir(str(src), str(dst), 1, verbose=False) == (0, 0)
+  assert convert.convert_dir(str(src), str(dst), 1, retry_failed=True,
+                             verbose=False) == (1, 0)
+  assert (dst /"a" /"bare.npz").exists()
+  assert convert.convert_dir(str(src), str(dst), 1, retry_failed=True,
+                             verbose=False) == (0, 0)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,42 @@
+# ----------------------------------------------------------------------------
+# test_grid.py
+# Reassembly of scans into image cubes by `scanhost.grid`
+# ----------------------------------------------------------------------------
+import numpy as np
+import pytest
+from scanhost import grid
+from scanhost.link import PATH_R_SPIRAL, PATH_LR_ZIGZAG
+
+# ----------------------------------------------------------------------------
+@pytest.mark.parametrize("size_xy, step_xy", [((8, 4), (2, 2)), ((30, 30), (4, 4)),
+                                              ((31, 10), (4, 3))])
+def test_zigzag(size_xy, step_xy):
+  # Size not necessarily a multiple of the step; each cell has one pixel
+  nx = size_xy[0] //step_xy[0] +1
+  ny = size_xy[1] //step_xy[1] +1
+  gi = grid.index_from_path(PATH_LR_ZIGZAG, size_xy, step_xy)
+  assert gi.shape == (ny, nx)
+  assert np.array_equal(np.sort(gi.cell), np.arange(nx *ny))
+  img = grid.to_grid(np.arange(nx *ny), gi)
+  assert np.array_equal(img[0], np.arange(nx))
+  assert np.array_equal(img[1], np.arange(2 *nx -1, nx -1, -1))
+
+  # The positions generated like on the device give the same cells
+  xy = grid.scan_path(PATH_LR_ZIGZAG, size_xy, step_xy)
+  hdr = {"size_xy": size_xy, "step_xy_deg": step_xy, "path": PATH_LR_ZIGZAG}
+  assert np.array_equal(grid.index_for(hdr, xy).cell, gi.cell)
+  assert np.array_equal(grid.index_for(hdr).cell, gi.cell)
+
+def test_spiral():
+  gi = grid.index_from_path(PATH_R_SPIRAL, (4, 4), (2, 2))
+  assert gi.shape == (3, 3)
+  assert np.array_equal(np.sort(gi.cell), np.arange(9))
+  # Starts in the centre, then +x (column 0 is +x)
+  assert gi.cell[0] == 4 and gi.cell[1] == 3
+
+def test_partial():
+  gi = grid.index_from_path(PATH_LR_ZIGZAG, (4, 2), (2, 2))
+  img = grid.to_grid(np.arange(1, 5), gi, fill=-1)
+  assert np.array_equal(img, [[1, 2, 3], [-1, -1, 4]])
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,132 @@
+# ----------------------------------------------------------------------------
+# test_link.py
+# Framing and requests of `scanhost.link`, against `sim.SimScanner`
+# ----------------------------------------------------------------------------
+import numpy as np
+import pytest
+from scanhost import link as ln
+from scanhost import client, sim
+
+# ----------------------------------------------------------------------------
+@pytest.fixture
+def pair():
+  # Yields a function that returns `(port, sim)`; both are closed afterwards
+  opened = []
+
+  def _open(**kwargs):
+    port, s = sim.socket_pair(**kwargs)
+    opened.append((port, s))
+    return port, s
+
+  yield _open
+  for port, s in opened:
+    port.close()
+    s.stop()
+    s._end.close()
+
+def _frames():
+  return [ln.make_frame(ln.OP_PIXEL, i, bytes((i *50 +k) & 0xFF
+                                             for k in range(300)))
+          for i in range(3)]
+
+# ----------------------------------------------------------------------------
+def test_cobs():
+  rng = np.random.default_rng(0)
+  for data in (b"", b"\x00", b"\x00\x00", b"\x01" *253, b"\x01" *254,
+               b"\x01" *255, b"\x01" *600 +b"\x00", rng.bytes(1000),
+               bytes(range(256)) *3):
+    enc = ln.cobs_encode(data)
+    assert b"\x00" not in enc
+    assert ln.cobs_decode(enc) == data
+  assert ln.cobs_decode(b"\x05ab") is None
+  assert ln.cobs_decode(b"\x00") is None
+
+def test_frame():
+  f = ln.make_frame(ln.OP_STATUS | ln.OP_REPLY, 7, b"\x00abc\x00")
+  assert f[0] == 0 and f[-1] == 0 and b"\x00" not in f[1:-1]
+  assert ln.parse_frame(f[1:-1]) == (ln.OP_STATUS | ln.OP_REPLY, 7,
+                                     b"\x00abc\x00")
+  # CRC mismatch
+  bad = bytearray(f[1:-1])
+  bad[3] ^= 0x01
+  assert ln.parse_frame(bytes(bad)) is None
+
+def test_frame_reader():
+  frames = _frames()
+  stream = b"boot\r\n" +frames[0] +b">>> junk" +frames[1] +b"\x00\x01\x02\x00"
+  stream += frames[2]
+  # Whole, and split into pieces of any size
+  for n in (len(stream), 1, 7, 64):
+    fr = ln.FrameReader()
+    got = []
+    for i in range(0, len(stream), n):
+      got += fr.feed(stream[i:i +n])
+    assert [ln.make_frame(*f) for f in got] == frames
+    assert fr.n_skipped == 3
+
+# ----------------------------------------------------------------------------
+def test_link(pair):
+  port, _ = pair(n_spect=32)
+  with ln.ScanLink(port, timeout_s=2) as lk:
+    st = lk.status()
+    assert st["flags"] == ln.ST_SCANNER and st["n_pix"] == 0
+    nm = lk.wavelengths()
+    assert nm.shape == (32,) and nm[0] == 315
+    sp = lk.read_spectrum(0.01)
+    assert sp.shape == (32,) and sp.dtype == np.uint16
+    lk.move(10, -5, 100)
+
+    assert lk.setup_scan((4, 2), (2, 1), 0.01) == 9
+    assert lk.n_spect == 32
+    assert lk.status()["flags"] & ln.ST_SCAN_READY
+    pix = list(lk.scan_all())
+    assert [p[0] for p in pix] == list(range(9))
+    assert pix[4][1:3] == (0., 0.) and pix[-1][1:3] == (2., 1.)
+    assert all(p[6].shape == (32,) for p in pix)
+    assert lk.status()["i_pix"] == 9
+
+def test_link_errors(pair):
+  port, _ = pair(n_spect=8)
+  with ln.ScanLink(port, timeout_s=2) as lk:
+    # No scan set up
+    with pytest.raises(ln.LinkError) as e:
+      list(lk.scan_all())
+    assert e.value.code == ln.ERR_NOT_READY
+    with pytest.raises(ln.LinkError) as e:
+      lk.request(0x30)
+    assert e.value.code == ln.ERR_UNKNOWN_OP
+    with pytest.raises(ln.LinkError) as e:
+      lk.request(ln.OP_MOVE, b"\x01")
+    assert e.value.code == ln.ERR_BAD_PAYLOAD
+    # Still in sync
+    assert lk.read_spectrum().shape == (8,)
+
+def test_link_junk(pair):
+  # Stray output of the device between frames is skipped
+  port, _ = pair(n_spect=8, junk=b"debug\r\n")
+  with ln.ScanLink(port, timeout_s=2) as lk:
+    assert lk.setup_scan((2, 2), (1, 1), 0.01) == 9
+    assert len(list(lk.scan_all())) == 9
+    assert lk._reader.n_skipped >= 10
+
+def test_video(pair):
+  port, _ = pair(n_spect=8)
+  with ln.ScanLink(port, timeout_s=2) as lk:
+    stats = ln.VideoStats()
+    fr = list(lk.video(0.005, n_frames=5, stats=stats))
+    assert [f.seq for f in fr] == list(range(5))
+    assert stats.n_received == stats.n_frames == 5 and stats.n_lost == 0
+
+def test_client_scan(pair):
+  port, _ = pair(n_spect=16)
+  with client.ScanClient(port) as sc:
+    job = sc.start_scan((4, 2), (1, 1), 0.01)
+    res = job.wait()
+  assert job.n_done == job.n_pix == 15
+  assert res.header["n_pix"] == 15 and res.header["n_spect"] == 16
+  assert res.received.all() and res.cube.shape == (15, 16)
+  assert res.cube.any(axis=1).all()
+  assert np.array_equal(res.pix[:5, 0], [-2, -1, 0, 1, 2])
+  assert res.wavelengths_nm.shape == (16,)
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,105 @@
+# ----------------------------------------------------------------------------
+# test_pyboard.py
+# File transfers of `scanhost.pyboard` with a fake board (see `fakeboard.py`)
+# that loses an acknowledge or corrupts a frame
+# ----------------------------------------------------------------------------
+import time
+import pytest
+from scanhost.pyboard import Pyboard, PyboardError
+from fakeboard import FakeBoard
+
+# ----------------------------------------------------------------------------
+def _data(n):
+  return bytes((i *7 +i //251) & 0xFF for i in range(n))
+
+def _once(match, replace, i_hit):
+  # `on_print` that replaces the `i_hit`-th line that starts with `match`
+  n = [0]
+
+  def on_print(data):
+    if data.startswith(match):
+      n[0] += 1
+      if n[0] == i_hit:
+        return replace(data)
+    return data
+
+  return on_print
+
+def test_exec_batch():
+  pb = Pyboard(FakeBoard())
+  assert pb.exec_batch(["x=6", "print(x*7)", "print('a');print('b')"]) == [
+    b"", b"42\r\n", b"a\r\nb\r\n"]
+  assert pb.eval("x") == b"6"
+
+def test_session():
+  # One write per command in a session, once the window is known
+  board = FakeBoard()
+  pb = Pyboard(board)
+  assert pb.eval("1+1") == b"2"
+  with pb.session():
+    n = board.n_writes
+    assert [pb.eval("%u*3" % i) for i in range(5)] == [b"%u" % (i *3) for i in range(5)]
+    assert board.n_writes == n +5
+    with pytest.raises(PyboardError) as e:
+      pb.exec_("1/0")
+    assert b"ZeroDivisionError" in e.value.args[2]
+    # Longer than the window, hence with flow control
+    cmd = "x=0\n" +"x+=1\n" *100 +"print(x)"
+    assert pb.exec_(cmd) == b"100\r\n"
+    assert pb.eval("x") == b"100"
+  assert not pb.persistent_session
+
+def test_session_latency():
+  # With a slow link, the session saves the round-trips of the prompt and
+  # the raw-paste header
+  def run(session):
+    pb = Pyboard(FakeBoard(latency_s=0.01))
+    pb.eval("0")
+    pb.persistent_session = session
+    t0 = time.monotonic()
+    for i in range(10):
+      pb.eval(str(i))
+    return time.monotonic() -t0
+
+  assert run(True) < 0.6 *run(False)
+
+def test_fs_put(tmp_path):
+  src = tmp_path /"src.bin"
+  src.write_bytes(_data(10000))
+  pb = Pyboard(FakeBoard())
+  pb.fs_put(str(src), str(tmp_path /"dst.bin"), chunk_size=512)
+  assert (tmp_path /"dst.bin").read_bytes() == src.read_bytes()
+
+def test_fs_put_lost_ack(tmp_path):
+  # The acknowledge of a chunk that was written is garbled; the transfer
+  # resumes at the size of the file on the board, without duplicates
+  src = tmp_path /"src.bin"
+  src.write_bytes(_data(10000))
+  board = FakeBoard(on_print=_once(b"A ", lambda d: b"A?\r\n", 3))
+  pb = Pyboard(board)
+  pb.fs_put(str(src), str(tmp_path /"dst.bin"), chunk_size=512)
+  assert board.n_interrupts == 1
+  assert (tmp_path /"dst.bin").read_bytes() == src.read_bytes()
+
+def test_fs_get(tmp_path):
+  src = tmp_path /"src.bin"
+  src.write_bytes(_data(20000))
+  pb = Pyboard(FakeBoard())
+  pb.fs_get(str(src), str(tmp_path /"dst.bin"), chunk_size=1024)
+  assert (tmp_path /"dst.bin").read_bytes() == src.read_bytes()
+
+def test_fs_get_corrupted_frame(tmp_path):
+  # A corrupted frame stops the board right away; the transfer resumes at
+  # the last good offset, hence the file is sent about once
+  n = 64 *1024
+  src = tmp_path /"src.bin"
+  src.write_bytes(_data(n))
+  corrupt = lambda d: d[:8] +(b"A" if d[8:9] != b"A" else b"B") +d[9:]
+  board = FakeBoard(on_print=_once(b"", corrupt, 4))
+  pb = Pyboard(board)
+  pb.fs_get(str(src), str(tmp_path /"dst.bin"), chunk_size=1024)
+  assert board.n_interrupts == 1
+  assert (tmp_path /"dst.bin").read_bytes() == src.read_bytes()
+  assert board.n_bytes_out < 1.6 *n
+
+# ----------------------------------------------------------------------------
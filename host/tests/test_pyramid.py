@@ -0,0 +1,109 @@
+# ----------------------------------------------------------------------------
+# test_pyramid.py
+# Multi-resolution pyramids of `scanhost.pyramid`
+# ----------------------------------------------------------------------------
+import zlib
+import struct
+import numpy as np
+import pytest
+from scanhost import pyramid
+
+# ----------------------------------------------------------------------------
+def _cube(rows=11, cols=9, n_spect=6, seed=0):
+  rng = np.random.default_rng(seed)
+  return rng.integers(0, 4096, (rows, cols, n_spect)).astype(np.uint16)
+
+def _half(a):
+  # Mean of 2x2 pixels, with an odd last row/column repeated
+  a = np.asarray(a, dtype=np.float64)
+  a = np.pad(a, [(0, a.shape[0] % 2), (0, a.shape[1] % 2)] +[(0, 0)] *(a.ndim -2),
+             mode="edge")
+  return a.reshape(a.shape[0] //2, 2, a.shape[1] //2, 2, *a.shape[2:]).mean(axis=(1, 3))
+
+def _decodePNG(data):
+  # Returns the image of a PNG written by `png_bytes` (8 bit, no filters)
+  assert data[:8] == b"\x89PNG\r\n\x1a\n"
+  i = 8
+  chunks = {}
+  while i < len(data):
+    n, = struct.unpack_from(">I", data, i)
+    kind = data[i +4:i +8]
+    body = data[i +8:i +8 +n]
+    crc, = struct.unpack_from(">I", data, i +8 +n)
+    assert zlib.crc32(kind +body) & 0xFFFFFFFF == crc
+    chunks[kind] = body
+    i += 12 +n
+  assert b"IEND" in chunks
+  w, h, depth, color = struct.unpack_from(">IIBB", chunks[b"IHDR"])
+  assert depth == 8
+  nc = 3 if color == 2 else 1
+  raw = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+  raw = raw.reshape(h, w *nc +1)
+  assert not raw[:, 0].any()
+  img = raw[:, 1:].reshape(h, w, nc)
+  return img if nc == 3 else img[..., 0]
+
+# ----------------------------------------------------------------------------
+@pytest.mark.parametrize("shape", [(4, 6), (5, 6), (4, 7), (5, 7), (1, 1),
+                                   (3, 1)])
+def test_half(shape):
+  a = np.random.default_rng(1).random(shape +(3,))
+  h = pyramid.half(a)
+  assert h.dtype == np.float32
+  assert h.shape == (-(-shape[0] //2), -(-shape[1] //2), 3)
+  assert np.allclose(h, _half(a), atol=1e-6)
+
+def test_build(tmp_path, monkeypatch):
+  # Small row blocks, such that levels are computed in several blocks
+  monkeypatch.setattr(pyramid, "ROW_BLOCK", 4)
+  cube = _cube()
+  nm = np.linspace(380, 720, cube.shape[2])
+  p = pyramid.build(cube, str(tmp_path /"p"), tile=4, wavelengths_nm=nm)
+  assert p.n_levels == 3
+  assert [p.shape(k) for k in range(3)] == [(11, 9), (6, 5), (3, 3)]
+  assert p.n_tiles(0) == (3, 3) and p.n_tiles(2) == (1, 1)
+  bm = pyramid.band_matrix(nm, cube.shape[2])
+  ref = cube
+  for k in range(p.n_levels):
+    if k > 0:
+      pv = _half(ref)
+      ref = np.rint(pv)
+    else:
+      pv = ref
+    assert np.array_equal(p.spect(k), ref)
+    assert np.allclose(p.preview(k), pv @ bm, rtol=1e-5)
+  assert np.array_equal(p.spectrum(10, 8), cube[10, 8])
+  with pytest.raises(IndexError):
+    p.spectrum(11, 0)
+
+  t = p.tile(0, 2, 2)
+  assert t.shape == (3, 1, 3) and t.dtype == np.uint8
+  assert np.array_equal(_decodePNG(p.tile_png(0, 2, 2)), t)
+  with pytest.raises(IndexError):
+    p.tile(3, 0, 0)
+  with pytest.raises(IndexError):
+    p.tile(0, 3, 0)
+
+  # Kept, unless overwritten
+  assert pyramid.build(cube[:2], str(tmp_path /"p")).id == p.id
+  q = pyramid.build(cube[:2], str(tmp_path /"p"), overwrite=True)
+  assert q.id != p.id and q.n_levels == 1
+
+def test_build_errors(tmp_path):
+  with pytest.raises(ValueError, match="empty"):
+    pyramid.build(np.zeros((0, 4, 8), dtype=np.uint16), str(tmp_path /"e"))
+  with pytest.raises(ValueError):
+    pyramid.build(np.zeros((4, 8)), str(tmp_path /"e"))
+  (tmp_path /"x").mkdir()
+  (tmp_path /"x" /"other.txt").write_text("")
+  with pytest.raises(FileExistsError):
+    pyramid.build(_cube(), str(tmp_path /"x"))
+
+def test_png_bytes():
+  rng = np.random.default_rng(2)
+  for img in (rng.integers(0, 256, (5, 7, 3)), rng.integers(0, 256, (4, 3)),
+              np.zeros((1, 1, 3))):
+    img = img.astype(np.uint8)
+    assert np.array_equal(_decodePNG(pyramid.png_bytes(img)), img)
+
+# ----------------------------------------------------------------------------
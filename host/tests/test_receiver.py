@@ -0,0 +1,98 @@
+# ----------------------------------------------------------------------------
+# test_receiver.py
+# Pixel streams into `scanhost.receiver`, sent by `sim.stream_pixels`
+# ----------------------------------------------------------------------------
+import asyncio
+import struct
+import numpy as np
+from scanhost import receiver, sim
+from scanhost import link as ln
+
+N_PIX         = 50
+N_SPECT       = 16
+
+# ----------------------------------------------------------------------------
+def _receive(fname, udp, skip=()):
+  # Streams `N_PIX` pixels w/o those in `skip` to a receiver on a free port
+  async def run():
+    rec = receiver.StreamReceiver(fname)
+    if udp:
+      srv = await rec.serve_udp("127.0.0.1", 0)
+      port = srv.get_extra_info("sockname")[1]
+    else:
+      srv = await rec.serve_tcp("127.0.0.1", 0)
+      port = srv.sockets[0].getsockname()[1]
+    try:
+      nSent = await asyncio.to_thread(sim.stream_pixels, "127.0.0.1", port,
+                                      N_PIX, N_SPECT, udp, skip)
+      assert await rec.wait(5)
+    finally:
+      srv.close()
+    assert nSent == N_PIX -len(skip)
+    return rec
+  return asyncio.run(run())
+
+def _pixel(seq, i, n_spect=N_SPECT):
+  d = struct.pack("<I", seq) +struct.pack(ln.FMT_PIXEL, i, i, -i, 0., 0., 0.)
+  return d +np.arange(n_spect, dtype="<u2").tobytes()
+
+def _check(rec, skip):
+  assert rec.cube.n_pix == N_PIX and rec.cube.n_spect == N_SPECT
+  assert list(rec.cube.missing()) == sorted(skip)
+  assert rec.n_lost == len(skip) and rec.n_dropped_dev == len(skip)
+  assert rec.n_records == rec.cube.n_received == N_PIX -len(skip)
+  assert rec.n_duplicates == 0 and rec.n_bad == 0
+  pix = np.load(rec.cube.fname_pix)
+  ok = rec.cube.received
+  assert np.array_equal(pix[ok, 0], np.flatnonzero(ok))
+  assert np.array_equal(pix[ok, 1], -np.flatnonzero(ok))
+  cube = np.load(rec.cube.fname)
+  assert cube.shape == (N_PIX, N_SPECT) and cube[ok].any()
+  assert not cube[~ok].any()
+
+def test_tcp(tmp_path):
+  skip = {3, 17, 49}
+  _check(_receive(str(tmp_path /"tcp.npy"), False, skip), skip)
+
+def test_udp(tmp_path):
+  skip = {0, 20}
+  _check(_receive(str(tmp_path /"udp.npy"), True, skip), skip)
+
+def test_frames(tmp_path):
+  rec = receiver.StreamReceiver(str(tmp_path /"cube"))
+  rec._onFrame(ln.OP_STREAM_PIX, 0, _pixel(0, 0))
+  assert rec.n_early == 1 and rec.cube is None
+  rec._onFrame(ln.OP_STREAM_HDR, 0, struct.pack("<IH", 4, N_SPECT))
+  cube = rec.cube
+  for seq, i in enumerate([0, 1, 1, 3]):
+    rec._onFrame(ln.OP_STREAM_PIX, seq, _pixel(seq, i))
+  assert rec.n_records == 4 and rec.n_duplicates == 1
+  assert cube.n_received == 3 and list(cube.missing()) == [2]
+
+  # Malformed records and a header of another stream are skipped
+  rec._onFrame(ln.OP_STREAM_PIX, 5, _pixel(5, 4))
+  rec._onFrame(ln.OP_STREAM_PIX, 6, _pixel(6, 2)[:-2])
+  rec._onFrame(ln.OP_STREAM_PIX, 7, _pixel(7, 2, N_SPECT +1))
+  rec._onFrame(ln.OP_STREAM_PIX, 8, b"\x00\x01")
+  rec._onFrame(ln.OP_STREAM_HDR, 0, struct.pack("<IH", 8, N_SPECT))
+  rec._onFrame(ln.OP_STREAM_HDR, 0, b"\x00")
+  assert rec.n_bad == 6 and rec.cube is cube
+  assert rec.n_records == 4 and cube.n_received == 3
+  # Same header again, e.g. after a reconnect
+  rec._onFrame(ln.OP_STREAM_HDR, 0, struct.pack("<IH", 4, N_SPECT))
+  assert rec.n_bad == 6 and rec.cube is cube
+  assert not rec.done.is_set()
+
+  rec._onFrame(ln.OP_STREAM_END, 0, struct.pack("<II", 4, 1))
+  assert rec.done.is_set() and rec.n_dropped_dev == 1 and rec.n_lost == 1
+
+def test_complete(tmp_path):
+  # All pixels received ends the stream, also w/o end frame
+  rec = receiver.StreamReceiver(str(tmp_path /"cube"), 2, N_SPECT)
+  rec._onFrame(ln.OP_STREAM_PIX, 0, _pixel(0, 1))
+  rec._onFrame(ln.OP_STREAM_PIX, 1, _pixel(1, 1))
+  assert not rec.done.is_set()
+  rec._onFrame(ln.OP_STREAM_PIX, 2, _pixel(2, 0))
+  assert rec.done.is_set() and rec.n_lost == 0
+
+# ----------------------------------------------------------------------------
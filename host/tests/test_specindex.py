@@ -0,0 +1,100 @@
+# ----------------------------------------------------------------------------
+# test_specindex.py
+# Nearest-neighbour search of spectra of `scanhost.specindex`
+# ----------------------------------------------------------------------------
+import sys
+import numpy as np
+import pytest
+from scanhost import specindex
+
+N_SPECT = 40
+
+# ----------------------------------------------------------------------------
+def _library(n=2000, rank=8, seed=0):
+  # Spectra near a low-dimensional subspace, as of natural scenes
+  rng = np.random.default_rng(seed)
+  base = np.abs(rng.normal(size=(rank, N_SPECT)))
+  x = rng.random((n, rank)) @ base
+  return x +rng.normal(scale=0.01, size=x.shape) *x.mean()
+
+def _bruteForce(lib, q, k):
+  cos = specindex.unit(q).astype(np.float64) @ specindex.unit(lib).T.astype(np.float64)
+  idx = np.argsort(-cos, axis=1)[:, :k]
+  return np.arccos(np.clip(np.take_along_axis(cos, idx, axis=1), -1, 1)), idx
+
+def test_query_exact():
+  # With all components, the candidates are the exact nearest entries
+  lib = _library()
+  q = _library(300, seed=1)
+  idx = specindex.SpectralIndex(n_components=N_SPECT)
+  idx.add(lib, np.arange(len(lib)))
+  ang, i = idx.query(q, k=3)
+  refAng, refI = _bruteForce(lib, q, 3)
+  assert np.mean(i == refI) > 0.99
+  assert np.allclose(ang, refAng, atol=1e-3)
+
+def test_query_reduced():
+  # Default number of components, more than the rank of the library
+  lib = _library()
+  q = _library(300, seed=1)
+  idx = specindex.SpectralIndex()
+  idx.add(lib, "x")
+  _, i = idx.query(q)
+  _, refI = _bruteForce(lib, q, 1)
+  assert np.mean(i[:, 0] == refI[:, 0]) > 0.95
+
+def test_candidates_tree(monkeypatch):
+  # The k-d tree of SciPy and the brute-force search find the same entries
+  pytest.importorskip("scipy")
+  lib = _library()
+  q = _library(300, seed=1)
+  tree = specindex.SpectralIndex(n_components=6)
+  tree.add(lib, np.arange(len(lib)))
+  tree.build()
+  assert tree._tree is not None
+  monkeypatch.setitem(sys.modules, "scipy.spatial", None)
+  brute = specindex.SpectralIndex(n_components=6)
+  brute.add(lib, np.arange(len(lib)))
+  brute.build()
+  assert brute._tree is None and brute._redSq is not None
+  angT, iT = tree.query(q, k=3)
+  angB, iB = brute.query(q, k=3)
+  assert np.array_equal(iT, iB)
+  assert np.allclose(angT, angB)
+
+def test_classify_save_load(tmp_path):
+  rng = np.random.default_rng(3)
+  nm = np.linspace(400., 700., N_SPECT)
+  refs = np.abs(rng.normal(size=(3, N_SPECT)))
+  idx = specindex.SpectralIndex(wavelengths_nm=nm)
+  idx.add(refs, ["grass", "bark", "sky"])
+  # Resampled to the wavelengths of the index
+  nm2 = np.linspace(380., 720., 80)
+  idx.add(np.interp(nm2, nm, refs[0])[None] *3, "grass2", wavelengths_nm=nm2)
+  cube = np.zeros((2, 3, N_SPECT))
+  cube[0, 0] = refs[1] *10
+  cube[0, 1] = refs[2] +0.01
+  cube[1, 2] = rng.random(N_SPECT)
+  lbl = idx.classify(cube, max_angle=0.05)
+  assert lbl.shape == (2, 3)
+  assert lbl[0, 0] == 1 and lbl[0, 1] == 2
+  assert lbl[1, 0] == -1 and lbl[1, 2] in (-1, 0, 1, 2, 3)
+  fn = str(tmp_path /"lib.npz")
+  idx.save(fn)
+  idx2 = specindex.SpectralIndex.load(fn)
+  assert idx2.labels == idx.labels
+  assert np.array_equal(idx2.classify(cube, max_angle=0.05), lbl)
+
+def test_add_source():
+  x = _library(50)
+  x[8] = 0
+  idx = specindex.SpectralIndex()
+  idx.add_source(x.reshape(5, 10, -1), "rec", step=2)
+  # Every 2nd spectrum, w/o the one that is all zero
+  assert len(idx) == 24 and ("rec", 6) in idx.labels
+  assert ("rec", 7) not in idx.labels and ("rec", 8) not in idx.labels
+  ang, i = idx.query(x[[4, 8]])
+  assert idx.labels[i[0, 0]] == ("rec", 4) and ang[0, 0] < 1e-3
+  assert i[1, 0] == -1 and np.isnan(ang[1, 0])
+
+# ----------------------------------------------------------------------------
@@ -0,0 +1,83 @@
+# ----------------------------------------------------------------------------
+# test_store.py
+# Append-only recordings of `scanhost.store`
+# ----------------------------------------------------------------------------
+import os
+import numpy as np
+import pytest
+from scanhost import store
+
+N_PIX   = 6
+N_SPECT = 4
+
+# ----------------------------------------------------------------------------
+def _frame(i):
+  return (np.arange(N_PIX *N_SPECT).reshape(N_PIX, N_SPECT) +100 *i).astype(np.uint16)
+
+def _create(path, n, chunk_len=8):
+  with store.Recording(path, N_PIX, N_SPECT, [400., 500., 600., 700.],
+                       chunk_len=chunk_len) as rec:
+    for i in range(n):
+      pix = np.full((N_PIX, 5), i, dtype=np.float32)
+      rec.append(_frame(i), pix, t=1000. +i, t_int_s=0.1, step=i % 2)
+
+def test_append_reopen(tmp_path):
+  path = str(tmp_path /"rec")
+  _create(path, 20)
+  rec = store.Recording(path, readonly=True)
+  assert len(rec) == 20 and rec.chunk_len == 8
+  assert np.array_equal(rec.wavelengths_nm, [400., 500., 600., 700.])
+  for i in (0, 7, 8, 19, -1):
+    assert np.array_equal(rec[i], _frame(i % 20))
+    assert np.all(rec.pix(i) == i % 20)
+  # Over chunk boundaries, restricted to pixels and channels
+  s = rec.slice(5, 18, pix=slice(1, 3), ch=[0, 3])
+  assert np.array_equal(s, np.array([_frame(i) for i in range(5, 18)])[:, 1:3][..., [0, 3]])
+  assert np.array_equal(rec.times, 1000. +np.arange(20))
+  assert list(rec.select(t0=1004, t1=1010, step=1)) == [5, 7, 9]
+  with pytest.raises(IOError):
+    rec.append(_frame(0))
+  with pytest.raises(IndexError):
+    rec[20]
+  rec.close()
+
+  # Appending to an existing store
+  with store.Recording(path) as rec:
+    assert rec.append(_frame(20)) == 20
+  rec = store.Recording(path, readonly=True)
+  assert len(rec) == 21 and np.array_equal(rec[20], _frame(20))
+  assert np.all(np.isnan(rec.pix(20)))
+
+def test_unindexed_frame(tmp_path):
+  # A frame that did not make it into the index (crash) is overwritten
+  path = str(tmp_path /"rec")
+  _create(path, 3)
+  fIndex = os.path.join(path, store.INDEX_FILE)
+  with open(fIndex) as f:
+    lines = f.readlines()
+  with open(fIndex, "w") as f:
+    f.writelines(lines[:2])
+  with store.Recording(path) as rec:
+    assert len(rec) == 2
+    assert rec.append(_frame(7)) == 2
+  rec = store.Recording(path, readonly=True)
+  assert len(rec) == 3 and np.array_equal(rec[2], _frame(7))
+
+def test_checks(tmp_path):
+  path = str(tmp_path /"rec")
+  with pytest.raises(FileNotFoundError):
+    store.Recording(path)
+  _create(path, 1)
+  with pytest.raises(ValueError):
+    store.Recording(path, N_PIX +1, N_SPECT)
+  with store.Recording(path) as rec:
+    with pytest.raises(ValueError):
+      rec.append(np.zeros((N_PIX, N_SPECT +1)))
+    # Other types are rounded and clipped
+    a = np.full((N_PIX, N_SPECT), 1.6)
+    a[0, 0] = -3
+    a[0, 1] = 1e6
+    rec.append(a)
+    assert rec[1][0, 0] == 0 and rec[1][0, 1] == 0xFFFF and rec[1][1, 1] == 2
+
+# ----------------------------------------------------------------------------
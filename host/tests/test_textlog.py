@@ -0,0 +1,60 @@
+# ----------------------------------------------------------------------------
+# test_textlog.py
+# Parsing of the text format of `SpectImg` by `scanhost.textlog`
+# ----------------------------------------------------------------------------
+import io
+import numpy as np
+from scanhost import textlog
+
+N_SPECT = 6
+
+# ----------------------------------------------------------------------------
+def _text(spectra):
+  # Lines as written by `SpectImg` for a scan of 3x2 pixels
+  lines = ["h,0|{'file_version': 2}",
+           "h,2|{'size_xy': [4, 2], 'step_xy_deg': [2, 2], 'n_spect': %u, "
+           "'t_int_s': 0.01}" % N_SPECT,
+           "w,0|{'wavelength_nm': %s}" % np.linspace(400., 700., N_SPECT).tolist()]
+  for i, s in enumerate(spectra):
+    d = {"xy": [2 -2 *(i % 3), 1 -2 *(i //3)], "head_deg": 10.5 +i,
+         "pitch_deg": -1.0, "roll_deg": None, "spect_au": s.tolist()}
+    lines.append("p,{0}|{1}".format(i, d))
+  return ("\r\n".join(lines) +"\r\n").encode()
+
+def _spectra():
+  return np.arange(6 *N_SPECT).reshape(6, N_SPECT) *1000
+
+def test_chunk_boundaries():
+  sp = _spectra()
+  data = _text(sp)
+  ref = textlog.parse_stream(io.BytesIO(data))
+  assert ref.n_received == 6
+  assert np.array_equal(ref.cube, sp)
+  assert ref.pix[4, 2] == 14.5 and np.isnan(ref.pix[4, 4])
+  # Lines split at every possible position give the same result
+  for size in (1, 7, 64, 333):
+    res = textlog.parse_stream(io.BytesIO(data), chunk_size=size)
+    assert np.array_equal(res.cube, ref.cube)
+    assert np.array_equal(res.pix, ref.pix, equal_nan=True)
+
+def test_clip():
+  # Values outside of `uint16` are clipped, in the fast (integer) and the
+  # slow (line by line) path
+  sp = _spectra()
+  sp[1, 0] = 70000
+  res = textlog.parse_stream(io.BytesIO(_text(sp)))
+  assert res.cube[1, 0] == 0xFFFF
+  sp = sp.astype(np.float64)
+  sp[2, 1] = -5
+  sp[3, 2] = 1.5
+  res = textlog.parse_stream(io.BytesIO(_text(sp)))
+  assert res.cube[1, 0] == 0xFFFF and res.cube[2, 1] == 0
+  assert res.cube[3, 2] == 2
+
+def test_no_header():
+  data = b"".join(ln +b"\n" for ln in _text(_spectra()).split(b"\r\n")[3:] if ln)
+  res = textlog.parse_stream(io.BytesIO(data), n_spect=N_SPECT, chunk_size=50)
+  assert res.header["n_pix"] == 6
+  assert np.array_equal(res.cube, _spectra())
+
+# ----------------------------------------------------------------------------
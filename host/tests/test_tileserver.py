@@ -0,0 +1,76 @@
+# ----------------------------------------------------------------------------
+# test_tileserver.py
+# HTTP access to pyramids via `scanhost.tileserver`
+# ----------------------------------------------------------------------------
+import json
+import threading
+import http.client
+import numpy as np
+import pytest
+from scanhost import pyramid, tileserver
+
+# ----------------------------------------------------------------------------
+@pytest.fixture
+def server(tmp_path):
+  # Yields `(get, pyr)`; `get(url, headers)` returns `(status, headers, body)`
+  cube = np.random.default_rng(0).integers(0, 4096, (20, 12, 8))
+  root = tmp_path /"root"
+  pyr = pyramid.build(cube, str(root /"rec" /"a"), tile=8)
+  # Not below the root
+  pyramid.build(cube, str(tmp_path /"outside"), tile=8)
+  srv = tileserver.make_server(str(root), port=0)
+  th = threading.Thread(target=srv.serve_forever, daemon=True)
+  th.start()
+
+  def get(url, headers=None):
+    c = http.client.HTTPConnection(*srv.server_address, timeout=5)
+    try:
+      c.request("GET", url, headers=headers or {})
+      r = c.getresponse()
+      return r.status, dict(r.getheaders()), r.read()
+    finally:
+      c.close()
+
+  yield get, pyr
+  srv.shutdown()
+  srv.server_close()
+  th.join(1)
+
+# ----------------------------------------------------------------------------
+def test_tiles(server):
+  get, pyr = server
+  st, _, body = get("/")
+  assert st == 200 and json.loads(body) == ["rec/a"]
+
+  st, hdr, body = get("/rec/a/0/1/1.png")
+  assert st == 200 and hdr["Content-Type"] == "image/png"
+  assert body == pyr.tile_png(0, 1, 1)
+  etag = hdr["ETag"]
+  assert pyr.id in etag
+  # Again, from the cache of the server, and revalidated by the browser
+  assert get("/rec/a/0/1/1.png")[2] == body
+  st, hdr, body = get("/rec/a/0/1/1.png", {"If-None-Match": etag})
+  assert st == 304 and hdr["ETag"] == etag and body == b""
+  st, _, _ = get("/rec/a/0/1/0.png", {"If-None-Match": etag})
+  assert st == 200
+
+def test_meta_spectrum(server):
+  get, pyr = server
+  st, hdr, body = get("/rec/a/meta.json")
+  d = json.loads(body)
+  assert st == 200 and "ETag" in hdr
+  assert d["id"] == pyr.id and d["n_tiles"] == [[3, 2], [2, 1], [1, 1]]
+  st, _, body = get("/rec/a/spectrum/1/3/2")
+  d = json.loads(body)
+  assert st == 200 and d["counts"] == pyr.spectrum(3, 2, 1).tolist()
+
+def test_not_found(server):
+  get, pyr = server
+  for url in ("/rec/a/3/0/0.png", "/rec/a/0/3/0.png", "/rec/a/0/0/2.png",
+              "/rec/b/0/0/0.png", "/rec/a/spectrum/0/20/0", "/rec/a/x.json",
+              # Outside of the root
+              "/../outside/meta.json", "/../outside/0/0/0.png",
+              "/rec/../../outside/meta.json"):
+    assert get(url)[0] == 404, url
+
+# ----------------------------------------------------------------------------